@@ -2,6 +2,7 @@
 Servicios y lógica de negocio.
 """
 
-from .services import PropertyService
+from .services import PropertyService, AsyncPropertyService
+from .cache import ResultCache
 
-__all__ = ['PropertyService']
\ No newline at end of file
+__all__ = ['PropertyService', 'AsyncPropertyService', 'ResultCache']
\ No newline at end of file
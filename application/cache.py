@@ -0,0 +1,164 @@
+"""
+Cache de resultados en memoria para la capa de aplicación.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import sys
+import threading
+import time
+
+
+class CacheEntry:
+    """Valor cacheado junto con su tamaño estimado, marcas de tiempo, datos de recarga y versión de origen."""
+
+    __slots__ = ('value', 'size', 'created_at', 'expires_at', 'stale_until', 'hits', 'refreshes', 'load_time',
+                 'version')
+
+    def __init__(self, value: Any, size: int, created_at: float, expires_at: float, stale_until: float,
+                 load_time: Optional[float] = None, refreshes: int = 0, version: Optional[Hashable] = None):
+        self.value = value
+        self.size = size
+        self.created_at = created_at
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.hits = 0
+        self.refreshes = refreshes
+        self.load_time = load_time
+        self.version = version
+
+
+class ResultCache:
+    """
+    Cache con expiración por TTL y desalojo LRU.
+    Está acotado por número de entradas y por el total de bytes estimados;
+    es seguro para uso concurrente desde varios hilos.
+    Con `stale_ttl` una entrada vencida se sigue entregando (marcada como obsoleta)
+    durante esa ventana, para que el llamador la recargue en segundo plano.
+    """
+
+    def __init__(self, ttl: float = 30, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024,
+                 stale_ttl: float = 0, sizeof: Callable[[Any], int] = sys.getsizeof,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._clock = clock
+
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0, 'stale_hits': 0, 'misses': 0,
+            'expirations': 0, 'evictions': 0, 'invalidations': 0
+        }
+
+    def lookup(self, key: Hashable) -> Tuple[Optional[Any], bool]:
+        """
+        Retorna (valor, vigente). El valor es None si la llave no existe o superó la ventana
+        de obsolescencia; `vigente` es False cuando el valor ya venció y debe recargarse.
+        """
+        value, fresh, _ = self.lookup_versioned(key)
+        return value, fresh
+
+    def lookup_versioned(self, key: Hashable) -> Tuple[Optional[Any], bool, Optional[Hashable]]:
+        """Igual que `lookup`, agregando la versión con que se guardó el valor."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.stale_until <= now:
+                self._remove(key)
+                self._stats['expirations'] += 1
+                entry = None
+
+            if entry is None:
+                self._stats['misses'] += 1
+                return None, False, None
+
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            fresh = entry.expires_at > now
+            self._stats['hits' if fresh else 'stale_hits'] += 1
+            return entry.value, fresh, entry.version
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retorna el valor vigente de la llave o None si no existe o expiró."""
+        value, fresh = self.lookup(key)
+        return value if fresh else None
+
+    def set(self, key: Hashable, value: Any, load_time: Optional[float] = None,
+            version: Optional[Hashable] = None) -> None:
+        """
+        Guarda un valor y desaloja las entradas menos usadas si se superan los límites.
+        `load_time` es lo que tardó en obtenerse el valor (se reporta en `describe`) y
+        `version` la versión de los datos de origen con que se obtuvo.
+        """
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            # Un valor más grande que todo el cache solo desplazaría al resto
+            return
+
+        now = self._clock()
+        with self._lock:
+            refreshes = 0
+            if key in self._entries:
+                refreshes = self._entries[key].refreshes + 1
+                self._remove(key)
+            self._entries[key] = CacheEntry(
+                value, size, now, now + self.ttl, now + self.ttl + self.stale_ttl, load_time, refreshes, version
+            )
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, key: Hashable = None) -> None:
+        """Elimina una llave o, sin argumentos, todo el contenido del cache."""
+        with self._lock:
+            if key is None:
+                self._stats['invalidations'] += len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+            elif key in self._entries:
+                self._remove(key)
+                self._stats['invalidations'] += 1
+
+    def describe(self, format_key: Callable[[Hashable], Any] = str) -> List[Dict[str, Any]]:
+        """Lista las entradas del cache (de la más a la menos usada) con su edad y datos de recarga."""
+        now = self._clock()
+        with self._lock:
+            entries = list(self._entries.items())
+
+        return [{
+            'key': format_key(key),
+            'age_seconds': round(now - entry.created_at, 3),
+            'expires_in_seconds': round(entry.expires_at - now, 3),
+            'stale': entry.expires_at <= now,
+            'hits': entry.hits,
+            'refreshes': entry.refreshes,
+            'last_load_ms': round(entry.load_time * 1000, 3) if entry.load_time is not None else None,
+            'size_bytes': entry.size,
+            'version': entry.version,
+        } for key, entry in reversed(entries)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna contadores de aciertos, fallos y ocupación del cache."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'stale_ttl': self.stale_ttl,
+            })
+        return stats
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
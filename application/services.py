@@ -2,11 +2,22 @@
 Servicios de aplicación para inmuebles.
 """
 
-from typing import List
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import fields
+from enum import Enum
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Union
+import asyncio
 import logging
+import sys
+import threading
+import time
 
-from domain import Property, PropertyFilter
-from infrastructure import PropertyRepositoryInterface
+from domain import Property, PropertyFilter, SORT_FIELDS
+from infrastructure import (
+    PropertyRepositoryInterface, AsyncPropertyRepositoryInterface, PropertyChangeFeedInterface, PropertyFacetsInterface,
+    PropertySearchInterface, tokenize
+)
+from .cache import ResultCache
 from datetime import datetime
 
 class PropertyService:
@@ -15,25 +26,295 @@ class PropertyService:
     Encapsula la lógica de negocio y coordina entre capas.
     """
     
-    def __init__(self, property_repository: PropertyRepositoryInterface):
+    # Tamaño máximo de página permitido en la paginación por llave
+    MAX_PAGE_SIZE = 1000
+    # Cantidad máxima de filtros en una consulta por lotes
+    MAX_BATCH_SIZE = 50
+    # Cantidad máxima de valores en un filtro de varios valores (IN)
+    MAX_FILTER_VALUES = 20
+    # Resultados de una búsqueda por palabras cuando no se indica limit, y longitud máxima del texto buscado
+    DEFAULT_SEARCH_LIMIT = 20
+    MAX_SEARCH_LENGTH = 200
+    
+    def __init__(self, property_repository: PropertyRepositoryInterface, result_cache: ResultCache = None,
+                 refresh_executor: Executor = None, change_feed: PropertyChangeFeedInterface = None,
+                 facets: PropertyFacetsInterface = None, search: PropertySearchInterface = None,
+                 version_ttl: float = 1.0):
         self.property_repository = property_repository
+        self.result_cache = result_cache
+        self.refresh_executor = refresh_executor
+        self.change_feed = change_feed
+        self.facets = facets
+        self.search = search
+        self.version_ttl = version_ttl
+        # (versión, instante en que vence) de la última lectura de la versión del catálogo
+        self._version: Optional[Tuple[Optional[Hashable], float]] = None
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._refresh_stats = {'scheduled': 0, 'completed': 0, 'failed': 0}
     
     def get_available_properties(self, filters: PropertyFilter) -> List[Property]:
         """
         Obtiene inmuebles disponibles aplicando filtros.
-        Valida filtros y maneja excepciones.
+        Valida filtros, consulta el cache de resultados y maneja excepciones.
+        """
+        return self.get_versioned_properties(filters)[0]
+    
+    def get_versioned_properties(self, filters: PropertyFilter, current_version: Hashable = None
+                                 ) -> Tuple[List[Property], Optional[Hashable]]:
+        """
+        Igual que `get_available_properties`, retornando además la versión del catálogo con que
+        se obtuvo el resultado. Un resultado cacheado de una versión distinta de `current_version`
+        se trata como obsoleto: se entrega con su propia versión y se agenda su recarga.
         """
         self._validate_filters(filters)
         
+        cached = self._get_cached(filters, current_version)
+        if cached is not None:
+            return cached
+        
         try:
-            properties = self.property_repository.find_available_properties(filters)
+            properties, version = self._load(filters, current_version)
             logging.info(f"Se encontraron {len(properties)} inmuebles")
-            return properties
+            return properties, version
             
         except Exception as e:
             logging.error(f"Error en servicio de inmuebles: {e}")
             raise
     
+    def get_catalog_version(self) -> Optional[Hashable]:
+        """
+        Versión actual de los datos del catálogo (None si el repositorio no la expone).
+        Se reutiliza durante `version_ttl` segundos para no consultar la base en cada request. Si la
+        consulta falla retorna None: el llamador sigue con el resultado cacheado y su propia versión.
+        """
+        memo = self._version
+        if memo is not None and time.monotonic() < memo[1]:
+            return memo[0]
+        try:
+            version = self.property_repository.get_catalog_version()
+        except RuntimeError as e:
+            logging.warning(f"No se pudo leer la versión del catálogo: {e}")
+            return None
+        self._version = (version, time.monotonic() + self.version_ttl)
+        return version
+    
+    def get_available_properties_batch(self, filters_list: List[PropertyFilter]
+                                       ) -> List[Union[List[Property], ValueError]]:
+        """
+        Resuelve un lote de filtros; retorna un resultado por filtro, en el mismo orden.
+        Cada filtro se valida por separado: la posición de uno inválido lleva su ValueError sin
+        impedir que se resuelvan los demás. Los que están en el cache se toman de ahí y el resto
+        se resuelve con una sola consulta al repositorio.
+        """
+        results, pending = self._prepare_batch(filters_list)
+        if pending:
+            started = time.perf_counter()
+            version = self.property_repository.get_catalog_version()
+            loaded = self.property_repository.find_available_properties_batch([filters_list[i] for i in pending])
+            self._finish_batch(filters_list, results, pending, loaded, time.perf_counter() - started, version)
+        return results
+    
+    def stream_available_properties(self, filters: PropertyFilter, batch_size: int = 500) -> Iterator[Property]:
+        """
+        Recorre los inmuebles disponibles en streaming, sin pasar por el cache.
+        Los filtros se validan antes de devolver el iterador.
+        """
+        self._validate_filters(filters)
+        return self.property_repository.iter_available_properties(filters, batch_size)
+    
+    def stream_changes(self, filters: PropertyFilter, since: Optional[Tuple] = None,
+                       batch_size: int = 500) -> Tuple[Tuple, Iterator[Tuple[int, Optional[Property]]]]:
+        """
+        Recorre los inmuebles que cambiaron desde la posición `since` (todos si es None).
+        Retorna la nueva posición, leída antes del recorrido para que la siguiente consulta
+        no pierda los cambios que ocurran mientras tanto, y el iterador de cambios.
+        """
+        if self.change_feed is None:
+            raise RuntimeError("El feed de cambios no está configurado")
+        self._validate_filters(filters)
+        if filters.limit is not None or filters.after_id is not None or not filters.is_id_order():
+            raise ValueError("El feed de cambios no admite limit, cursor ni sort")
+        position = self.change_feed.current_position()
+        return position, self.change_feed.iter_changes(filters, since, batch_size)
+    
+    def get_facets(self, filters: PropertyFilter) -> Dict[str, Any]:
+        """
+        Conteos por ciudad, estado y año de los inmuebles que cumplen el filtro, leídos del
+        agregado precalculado. El agregado no guarda precios, así que no admite rangos de precio.
+        """
+        if self.facets is None:
+            raise RuntimeError("Los conteos por dimensión no están configurados")
+        self._validate_filters(filters)
+        if filters.limit is not None or filters.after_id is not None or not filters.is_id_order():
+            raise ValueError("Los conteos no admiten limit, cursor ni sort")
+        if filters.min_price is not None or filters.max_price is not None:
+            raise ValueError("Los conteos no admiten rangos de precio")
+        return self.facets.counts(filters)
+    
+    def search_properties(self, query: str, filters: PropertyFilter) -> List[Tuple[Property, float]]:
+        """
+        Inmuebles cuya dirección o descripción contiene alguna de las palabras de `query`, con su
+        puntaje, del más relevante al menos relevante, combinados con el resto de filtros.
+        El orden es por relevancia, así que no admite cursor ni sort; sin limit se retornan
+        los primeros DEFAULT_SEARCH_LIMIT.
+        """
+        if self.search is None:
+            raise RuntimeError("La búsqueda por palabras no está configurada")
+        self._validate_filters(filters)
+        if filters.after_id is not None or not filters.is_id_order():
+            raise ValueError("La búsqueda no admite cursor ni sort")
+        if len(query) > self.MAX_SEARCH_LENGTH:
+            raise ValueError(f"La búsqueda admite hasta {self.MAX_SEARCH_LENGTH} caracteres")
+        terms = tokenize(query)
+        if not terms:
+            raise ValueError("La búsqueda debe tener al menos una palabra")
+        return self.search.search(terms, filters, filters.limit or self.DEFAULT_SEARCH_LIMIT)
+    
+    def warm_up(self, filters_list: Iterable[PropertyFilter]) -> None:
+        """Precarga en segundo plano el cache con los filtros más consultados."""
+        if self.result_cache is None:
+            return
+        for filters in filters_list:
+            self._validate_filters(filters)
+            self._schedule_refresh(filters.normalized(), filters)
+    
+    def invalidate_cache(self, filters: PropertyFilter = None) -> None:
+        """Invalida el resultado cacheado de un filtro o, sin argumentos, todo el cache."""
+        if self.result_cache is not None:
+            self.result_cache.invalidate(filters.normalized() if filters is not None else None)
+    
+    def get_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Retorna las estadísticas del cache de resultados, si está habilitado."""
+        if self.result_cache is None:
+            return None
+        stats = self.result_cache.get_stats()
+        with self._refresh_lock:
+            stats['background_refresh'] = dict(self._refresh_stats, in_progress=len(self._refreshing))
+        return stats
+    
+    def describe_cache(self) -> Optional[Dict[str, Any]]:
+        """Vista administrativa del cache: estadísticas y cada llave con su edad y tiempos de recarga."""
+        if self.result_cache is None:
+            return None
+        return {
+            'stats': self.get_cache_stats(),
+            'entries': self.result_cache.describe(format_key=self._describe_filter)
+        }
+    
+    def _prepare_batch(self, filters_list: List[PropertyFilter]
+                       ) -> Tuple[List[Union[List[Property], ValueError, None]], List[int]]:
+        """Valida el lote y resuelve lo que está en el cache; retorna los resultados y las posiciones pendientes."""
+        if not filters_list:
+            raise ValueError("El lote debe tener al menos un filtro")
+        if len(filters_list) > self.MAX_BATCH_SIZE:
+            raise ValueError(f"El lote admite como máximo {self.MAX_BATCH_SIZE} filtros")
+        
+        results, pending = [None] * len(filters_list), []
+        for index, filters in enumerate(filters_list):
+            try:
+                self._validate_filters(filters)
+            except ValueError as e:
+                results[index] = e
+                continue
+            cached = self._get_cached(filters)
+            if cached is not None:
+                results[index] = cached[0]
+            else:
+                pending.append(index)
+        return results, pending
+    
+    def _finish_batch(self, filters_list: List[PropertyFilter], results: List, pending: List[int],
+                      loaded: List[List[Property]], load_time: float, version: Hashable) -> None:
+        """Guarda en el cache y en `results` lo que resolvió el repositorio para las posiciones pendientes."""
+        for index, properties in zip(pending, loaded):
+            self._store(filters_list[index], properties, load_time, version)
+            results[index] = properties
+        logging.info(f"Lote de {len(filters_list)} filtros: {len(pending)} resueltos en una consulta")
+    
+    def _load(self, filters: PropertyFilter, version: Hashable = None) -> Tuple[List[Property], Optional[Hashable]]:
+        """
+        Consulta el repositorio y guarda el resultado en el cache junto con su tiempo de carga.
+        La versión se lee antes de la consulta: el resultado nunca es más antiguo que ella.
+        """
+        started = time.perf_counter()
+        if version is None:
+            version = self.property_repository.get_catalog_version()
+        properties = self.property_repository.find_available_properties(filters)
+        self._store(filters, properties, time.perf_counter() - started, version)
+        return properties, version
+    
+    def _get_cached(self, filters: PropertyFilter, current_version: Hashable = None
+                    ) -> Optional[Tuple[List[Property], Optional[Hashable]]]:
+        """Retorna el valor cacheado y su versión; si está obsoleto lo entrega igual y agenda su recarga."""
+        if self.result_cache is None:
+            return None
+        key = filters.normalized()
+        cached, fresh, version = self.result_cache.lookup_versioned(key)
+        if cached is None:
+            return None
+        if not fresh or (current_version is not None and version != current_version):
+            self._schedule_refresh(key, filters)
+        # Se entrega una copia para que el llamador no altere el valor compartido
+        return list(cached), version
+    
+    def _store(self, filters: PropertyFilter, properties: List[Property], load_time: float = None,
+               version: Hashable = None) -> None:
+        if self.result_cache is not None:
+            self.result_cache.set(filters.normalized(), tuple(properties), load_time, version)
+    
+    def _schedule_refresh(self, key: Hashable, filters: PropertyFilter) -> None:
+        """Agenda una única recarga en segundo plano por llave."""
+        if not self._claim_refresh(key):
+            return
+        if self.refresh_executor is None:
+            self.refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cache-refresh')
+        self.refresh_executor.submit(self._refresh, key, filters)
+    
+    def _refresh(self, key: Hashable, filters: PropertyFilter) -> None:
+        try:
+            self._load(filters)
+            self._finish_refresh(key, 'completed')
+        except Exception as e:
+            logging.warning(f"Error recargando cache de inmuebles: {e}")
+            self._finish_refresh(key, 'failed')
+    
+    def _claim_refresh(self, key: Hashable) -> bool:
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self._refresh_stats['scheduled'] += 1
+            return True
+    
+    def _finish_refresh(self, key: Hashable, outcome: str) -> None:
+        with self._refresh_lock:
+            self._refreshing.discard(key)
+            self._refresh_stats[outcome] += 1
+    
+    @staticmethod
+    def _describe_filter(filters: PropertyFilter) -> Dict[str, Any]:
+        """Representa un filtro como diccionario con solo los campos aplicados (distintos de su valor por defecto)."""
+        described = {}
+        for field in fields(filters):
+            value = getattr(filters, field.name)
+            if value is None or value == field.default:
+                continue
+            if isinstance(value, tuple):
+                value = [item.value if isinstance(item, Enum) else item for item in value]
+            described[field.name] = value.value if isinstance(value, Enum) else value
+        return described
+    
+    @staticmethod
+    def estimate_size(properties) -> int:
+        """Estima en bytes la memoria ocupada por una lista de inmuebles."""
+        size = sys.getsizeof(properties)
+        for prop in properties:
+            size += sys.getsizeof(prop) + sys.getsizeof(prop.address) + sys.getsizeof(prop.city)
+            if prop.description is not None:
+                size += sys.getsizeof(prop.description)
+        return size
+    
     def _validate_filters(self, filters: PropertyFilter) -> None:
         """Valida los filtros de entrada."""
         if filters.year is not None:
@@ -43,4 +324,128 @@ class PropertyService:
                 raise ValueError(f"El año debe estar entre 1800 y {current_year}")
             
         if filters.city is not None and len(filters.city.strip()) == 0:
-            raise ValueError("La ciudad no puede estar vacía")
\ No newline at end of file
+            raise ValueError("La ciudad no puede estar vacía")
+        
+        if filters.cities is not None:
+            if len(filters.cities) > self.MAX_FILTER_VALUES:
+                raise ValueError(f"Se admiten hasta {self.MAX_FILTER_VALUES} ciudades")
+            if any(len(city.strip()) == 0 for city in filters.cities):
+                raise ValueError("La ciudad no puede estar vacía")
+        
+        if filters.states is not None and len(filters.states) > self.MAX_FILTER_VALUES:
+            raise ValueError(f"Se admiten hasta {self.MAX_FILTER_VALUES} estados")
+        
+        current_year = datetime.now().year
+        for bound in (filters.min_year, filters.max_year):
+            if bound is not None and not 1800 <= bound <= current_year:
+                raise ValueError(f"El año debe estar entre 1800 y {current_year}")
+        
+        for bound in (filters.min_price, filters.max_price):
+            if bound is not None and bound < 0:
+                raise ValueError("El precio no puede ser negativo")
+        
+        if None not in (filters.min_year, filters.max_year) and filters.min_year > filters.max_year:
+            raise ValueError("min_year no puede ser mayor que max_year")
+        
+        if None not in (filters.min_price, filters.max_price) and filters.min_price > filters.max_price:
+            raise ValueError("min_price no puede ser mayor que max_price")
+        
+        if filters.limit is not None and not 1 <= filters.limit <= self.MAX_PAGE_SIZE:
+            raise ValueError(f"El límite debe estar entre 1 y {self.MAX_PAGE_SIZE}")
+        
+        if filters.after_id is not None and filters.after_id < 0:
+            raise ValueError("Cursor inválido")
+        
+        if filters.sort is not None and filters.sort not in SORT_FIELDS:
+            raise ValueError(f"Orden inválido. Órdenes válidos: {list(SORT_FIELDS)}")
+
+
+class AsyncPropertyService(PropertyService):
+    """
+    Variante asíncrona del servicio de inmuebles.
+    Reutiliza la validación de PropertyService sobre un repositorio asíncrono;
+    las recargas en segundo plano del cache se ejecutan como tareas del event loop.
+    """
+    
+    def __init__(self, property_repository: AsyncPropertyRepositoryInterface, result_cache: ResultCache = None,
+                 version_ttl: float = 1.0):
+        super().__init__(property_repository, result_cache, version_ttl=version_ttl)
+        self._tasks = set()
+    
+    async def get_available_properties(self, filters: PropertyFilter) -> List[Property]:
+        """
+        Obtiene inmuebles disponibles aplicando filtros.
+        Valida filtros, consulta el cache de resultados y maneja excepciones.
+        """
+        return (await self.get_versioned_properties(filters))[0]
+    
+    async def get_versioned_properties(self, filters: PropertyFilter, current_version: Hashable = None
+                                       ) -> Tuple[List[Property], Optional[Hashable]]:
+        """Variante asíncrona de PropertyService.get_versioned_properties."""
+        self._validate_filters(filters)
+        
+        cached = self._get_cached(filters, current_version)
+        if cached is not None:
+            return cached
+        
+        try:
+            properties, version = await self._load_async(filters, current_version)
+            logging.info(f"Se encontraron {len(properties)} inmuebles")
+            return properties, version
+            
+        except Exception as e:
+            logging.error(f"Error en servicio de inmuebles: {e}")
+            raise
+    
+    async def get_catalog_version(self) -> Optional[Hashable]:
+        """Variante asíncrona de PropertyService.get_catalog_version."""
+        memo = self._version
+        if memo is not None and time.monotonic() < memo[1]:
+            return memo[0]
+        try:
+            version = await self.property_repository.get_catalog_version()
+        except RuntimeError as e:
+            logging.warning(f"No se pudo leer la versión del catálogo: {e}")
+            return None
+        self._version = (version, time.monotonic() + self.version_ttl)
+        return version
+    
+    async def get_available_properties_batch(self, filters_list: List[PropertyFilter]
+                                             ) -> List[Union[List[Property], ValueError]]:
+        """Variante asíncrona de PropertyService.get_available_properties_batch."""
+        results, pending = self._prepare_batch(filters_list)
+        if pending:
+            started = time.perf_counter()
+            version = await self.property_repository.get_catalog_version()
+            loaded = await self.property_repository.find_available_properties_batch(
+                [filters_list[i] for i in pending]
+            )
+            self._finish_batch(filters_list, results, pending, loaded, time.perf_counter() - started, version)
+        return results
+    
+    async def _load_async(self, filters: PropertyFilter, version: Hashable = None
+                          ) -> Tuple[List[Property], Optional[Hashable]]:
+        started = time.perf_counter()
+        if version is None:
+            version = await self.property_repository.get_catalog_version()
+        properties = await self.property_repository.find_available_properties(filters)
+        self._store(filters, properties, time.perf_counter() - started, version)
+        return properties, version
+    
+    def _schedule_refresh(self, key: Hashable, filters: PropertyFilter) -> None:
+        """Agenda una única recarga por llave como tarea del event loop en ejecución."""
+        loop = asyncio.get_running_loop()
+        if not self._claim_refresh(key):
+            return
+        task = loop.create_task(self._refresh_async(key, filters))
+        # Se conserva la referencia para que la tarea no sea recolectada antes de terminar
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _refresh_async(self, key: Hashable, filters: PropertyFilter) -> None:
+        try:
+            await self._load_async(filters)
+            self._finish_refresh(key, 'completed')
+        except Exception as e:
+            logging.warning(f"Error recargando cache de inmuebles: {e}")
+            self._finish_refresh(key, 'failed')
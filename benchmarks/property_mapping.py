@@ -0,0 +1,93 @@
+'''
+Micro-benchmark del mapeo de filas a Property.
+Compara el mapeo anterior (cursor dictionary=True, PropertyState(...) por fila y dataclass sin slots)
+con el actual (filas posicionales, tabla de estados y mapeo por lotes con Property con __slots__).
+
+    python -m benchmarks.property_mapping
+'''
+
+from dataclasses import dataclass
+from typing import Optional
+import gc
+import sys
+import time
+import tracemalloc
+
+from domain import PropertyState
+from infrastructure import MySQLPropertyRepository
+
+ROWS = 100_000
+COLUMNS = ('id', 'address', 'city', 'price', 'description', 'year', 'status_name')
+
+
+@dataclass(frozen=True)
+class LegacyProperty:
+    '''Property tal como era antes: dataclass congelada sin __slots__.'''
+    id: int
+    address: str
+    city: str
+    price: int
+    state: PropertyState
+    description: Optional[str] = None
+    year: Optional[int] = None
+
+
+def legacy_map(rows):
+    '''Mapeo anterior: un diccionario por fila y PropertyState(...) por fila.'''
+    result = []
+    for row in rows:
+        status = PropertyState(row['status_name'])
+        result.append(LegacyProperty(
+            id=row['id'],
+            address=row['address'] or '',
+            city=row['city'] or '',
+            state=status,
+            price=row['price'] or 0,
+            description=row['description'],
+            year=row['year']
+        ))
+    return result
+
+
+def build_rows():
+    states = [state.value for state in PropertyState]
+    return [
+        (i, f'Calle {i % 500} # {i % 97}-{i % 13}', ('Bogotá', 'Medellín', 'Cali')[i % 3], 100_000_000 + i,
+         'Apartamento' if i % 2 else None, 2000 + i % 24, states[i % 3])
+        for i in range(ROWS)
+    ]
+
+
+def measure(name, rows, mapper):
+    gc.collect()
+    started = time.perf_counter()
+    mapper(rows)
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    properties = mapper(rows)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del properties
+
+    print(f'{name:<40} {elapsed / len(rows) * 1e9:8.0f} ns/fila   {current / 1024 / 1024:7.1f} MiB por {len(rows):,} inmuebles')
+
+
+def main():
+    tuples = build_rows()
+    dicts = [dict(zip(COLUMNS, row)) for row in tuples]
+    repository = MySQLPropertyRepository(None)
+
+    print(f'Mapeo de {ROWS:,} filas')
+    # Las filas del cursor dictionary=True ya vienen como diccionarios: se incluye su costo en memoria
+    measure('anterior (dict + Enum + sin slots)', dicts, legacy_map)
+    measure('actual (tuplas + tabla + slots)', tuples, repository._map_rows)
+    legacy = legacy_map(dicts[:1])[0]
+    current = repository._map_rows(tuples[:1])[0]
+    print(f'tamaño de una instancia: anterior {sys.getsizeof(legacy) + sys.getsizeof(legacy.__dict__)} B '
+          f'(objeto + __dict__), actual {sys.getsizeof(current)} B')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@
 Configuración del microservicio.
 '''
 import os
+import tempfile
 from dotenv import load_dotenv
 import logging
 load_dotenv()
@@ -14,14 +15,117 @@ class DatabaseConfig:
     PASSWORD = os.getenv('DB_PASSWORD')
     DATABASE = os.getenv('DB_DATABASE')
 
+    # Pool de conexiones
+    POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+    POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+    POOL_IDLE_TIMEOUT = float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300))
+    POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', 1800))
+    POOL_WAIT_TIMEOUT = float(os.getenv('DB_POOL_WAIT_TIMEOUT', 5))
+    POOL_HEALTH_CHECK = os.getenv('DB_POOL_HEALTH_CHECK', 'true').lower() == 'true'
+
+    # Sentencias preparadas del lado del servidor, reutilizadas por cada conexión del pool
+    PREPARED_STATEMENTS = os.getenv('DB_PREPARED_STATEMENTS', 'true').lower() == 'true'
+    # Sentencias preparadas que conserva cada conexión (LRU); la menos usada se cierra al superarlo
+    MAX_PREPARED_STATEMENTS = int(os.getenv('DB_MAX_PREPARED_STATEMENTS', 32))
+
+    # Aplica al iniciar la migración de columnas e índices del catálogo. Apagado por defecto: la migración
+    # es un paso del despliegue (python main.py migrate) y al iniciar solo se verifica el esquema
+    AUTO_MIGRATE = os.getenv('DB_AUTO_MIGRATE', 'false').lower() == 'true'
+
 
 class ServerConfig:
     '''Configuración del servidor HTTP.'''
     HOST =  os.getenv('SERVER_HOST')
     PORT =  int(os.getenv('SERVER_PORT'))
+
+    # Modo de servicio: 'threaded' (pool de workers), 'prefork' (varios procesos con pool de workers),
+    # 'asyncio' (event loop con consultas en executor) o 'single' (un solo hilo)
+    MODE = os.getenv('SERVER_MODE', 'threaded')
+    WORKERS = int(os.getenv('SERVER_WORKERS', 8))
+    ACCEPT_QUEUE_SIZE = int(os.getenv('SERVER_ACCEPT_QUEUE_SIZE', 64))
+    LISTEN_BACKLOG = int(os.getenv('SERVER_LISTEN_BACKLOG', 128))
+
+    # Conexiones persistentes HTTP/1.1 (cada conexión abierta ocupa un worker mientras espera, por eso
+    # como máximo KEEP_ALIVE_CONNECTIONS, siempre menos que WORKERS; las demás se cierran tras responder)
+    KEEP_ALIVE_TIMEOUT = float(os.getenv('SERVER_KEEP_ALIVE_TIMEOUT', 5))
+    KEEP_ALIVE_MAX_REQUESTS = int(os.getenv('SERVER_KEEP_ALIVE_MAX_REQUESTS', 100))
+    KEEP_ALIVE_CONNECTIONS = int(os.getenv('SERVER_KEEP_ALIVE_CONNECTIONS', WORKERS - 1))
+
+    # Tamaño máximo del cuerpo de los requests POST (POST /properties/batch)
+    MAX_BODY_SIZE = int(os.getenv('SERVER_MAX_BODY_SIZE', 64 * 1024))
+
+    # Modo prefork
+    PROCESSES = int(os.getenv('SERVER_PROCESSES', os.cpu_count() or 1))
+    REUSE_PORT = os.getenv('SERVER_REUSE_PORT', 'true').lower() == 'true'
+    # Espera de los requests en curso al detenerse; aplica también al pool de workers del modo threaded
+    GRACEFUL_TIMEOUT = float(os.getenv('SERVER_GRACEFUL_TIMEOUT', 30))
     
 
 
+class CacheConfig:
+    '''Configuración del cache de resultados de /properties.'''
+    ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
+    TTL = float(os.getenv('CACHE_TTL', 30))
+    MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 256))
+    MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+    # Stale-while-revalidate: segundos adicionales en que un resultado vencido se sigue entregando
+    # mientras una tarea en segundo plano lo recarga
+    STALE_TTL = float(os.getenv('CACHE_STALE_TTL', 60))
+    REFRESH_WORKERS = int(os.getenv('CACHE_REFRESH_WORKERS', 2))
+    # Filtros calientes a precargar al iniciar, separados por ';' (ej: 'city=bogota&state=en_venta;state=pre_venta')
+    HOT_FILTERS = os.getenv('CACHE_HOT_FILTERS', '')
+    # Cache-Control de /properties: segundos que clientes y CDNs pueden reutilizar una respuesta
+    # antes de revalidarla con If-None-Match
+    HTTP_MAX_AGE = int(os.getenv('CACHE_HTTP_MAX_AGE', 5))
+    # Segundos en que se reutiliza la versión del catálogo leída para los GET condicionales
+    VERSION_TTL = float(os.getenv('CACHE_VERSION_TTL', 1))
+
+
+class RepositoryConfig:
+    '''Configuración de la fuente de datos de /properties.'''
+    # 'mysql' (ROW_NUMBER() sobre status_history en cada consulta),
+    # 'projection' (tabla property_latest_status mantenida de forma incremental) o
+    # 'snapshot' (catálogo completo en memoria con índices) o
+    # 'mmap' (catálogo en un archivo binario compartido entre procesos)
+    BACKEND = os.getenv('REPOSITORY_BACKEND', 'mysql')
+    # Segundos máximos entre actualizaciones incrementales de la proyección
+    PROJECTION_REFRESH_INTERVAL = float(os.getenv('PROJECTION_REFRESH_INTERVAL', 5))
+    # Segundos hacia atrás que se vuelven a revisar en cada actualización (filas confirmadas fuera de orden)
+    PROJECTION_RESCAN_WINDOW = float(os.getenv('PROJECTION_RESCAN_WINDOW', 30))
+    # Catálogo en memoria: actualización incremental y recarga completa (recoge cambios de precio/dirección)
+    SNAPSHOT_REFRESH_INTERVAL = float(os.getenv('SNAPSHOT_REFRESH_INTERVAL', 2))
+    SNAPSHOT_FULL_RELOAD_INTERVAL = float(os.getenv('SNAPSHOT_FULL_RELOAD_INTERVAL', 300))
+    # Archivo de catálogo compartido por los procesos con REPOSITORY_BACKEND=mmap
+    # (en Linux conviene ubicarlo en /dev/shm) y cada cuánto revisan si fue reemplazado
+    SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', os.path.join(tempfile.gettempdir(), 'habi_catalog.snapshot'))
+    SNAPSHOT_CHECK_INTERVAL = float(os.getenv('SNAPSHOT_CHECK_INTERVAL', 1))
+
+
+class CompressionConfig:
+    '''Configuración de la compresión gzip/deflate de /properties.'''
+    ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    # Las respuestas más pequeñas van sin comprimir: el ahorro no compensa el costo de CPU
+    MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    # Nivel de zlib, de 1 (más rápido) a 9 (más compacto)
+    LEVEL = int(os.getenv('COMPRESSION_LEVEL', 6))
+    CACHE_MAX_BYTES = int(os.getenv('COMPRESSION_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+
+
+class FacetConfig:
+    '''Configuración de los conteos por dimensión de /properties/facets.'''
+    # Se actualizan con el catálogo en memoria (SNAPSHOT_REFRESH_INTERVAL y SNAPSHOT_FULL_RELOAD_INTERVAL).
+    # Apagado por defecto: cada proceso carga el catálogo completo en memoria y consulta MySQL periódicamente
+    ENABLED = os.getenv('FACETS_ENABLED', 'false').lower() == 'true'
+
+
+class SearchConfig:
+    '''Configuración de la búsqueda por palabras de /properties/search.'''
+    # Se actualiza con el catálogo en memoria (SNAPSHOT_REFRESH_INTERVAL y SNAPSHOT_FULL_RELOAD_INTERVAL).
+    # Apagado por defecto, igual que los conteos
+    ENABLED = os.getenv('SEARCH_ENABLED', 'false').lower() == 'true'
+
+
 def setup_logging():
     '''Configura el sistema de logging.'''
     logging.basicConfig(
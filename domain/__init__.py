@@ -1,6 +1,6 @@
 '''Definicion del folder como paquete y abreviacion de la importacion de las clases'''
 
-from .entities import Property
-from .value_objects import PropertyState, PropertyFilter
+from .entities import Property, SERIALIZED_FIELDS
+from .value_objects import PropertyState, PropertyFilter, STATE_BY_NAME, SORT_FIELDS, city_key
 '''Exportacion de las clases'''
-__all__ = ['Property', 'PropertyState', 'PropertyFilter']
\ No newline at end of file
+__all__ = ['Property', 'PropertyState', 'PropertyFilter', 'STATE_BY_NAME', 'SERIALIZED_FIELDS', 'SORT_FIELDS', 'city_key']
\ No newline at end of file
@@ -5,13 +5,18 @@ Entidades del dominio de inmuebles.
 """
 
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 from .value_objects import PropertyState
 
 
-@dataclass(frozen=True)
+# Campos que emite Property.serializer, en el orden de la respuesta; son los valores validos de ?fields=
+SERIALIZED_FIELDS = ('id', 'address', 'city', 'state', 'price', 'description', 'year')
+
+
+@dataclass(frozen=True, slots=True)
 class Property:
-    '''entidad inmutable que representa una propiedad de la base de datos, es inmutable para garantizar la integiradad de los datos'''
+    '''entidad inmutable que representa una propiedad de la base de datos, es inmutable para garantizar la integiradad de los datos
+    usa __slots__ para no reservar un __dict__ por instancia (el catalogo completo puede estar en memoria)'''
     id: int
     address : str
     city : str
@@ -22,9 +27,31 @@ class Property:
     
     
     
-    def serializer(self) -> Dict[str,any]:
-        '''Serializa los datos de la entidad (los convierte a Diccionarios o Json)'''
-        return {
+    @classmethod
+    def from_values(cls, rows: Iterable[Tuple]) -> List['Property']:
+        '''Construye un lote de inmuebles a partir de tuplas en el orden de los campos (id, address, city, price, state, description, year).
+        Asigna los slots directamente: el __init__ de una dataclass congelada pasa por object.__setattr__ campo por campo'''
+        new = object.__new__
+        set_id, set_address, set_city, set_price, set_state, set_description, set_year = (
+            cls.__dict__[name].__set__ for name in cls.__slots__
+        )
+        properties = []
+        for prop_id, address, city, price, state, description, year in rows:
+            prop = new(cls)
+            set_id(prop, prop_id)
+            set_address(prop, address)
+            set_city(prop, city)
+            set_price(prop, price)
+            set_state(prop, state)
+            set_description(prop, description)
+            set_year(prop, year)
+            properties.append(prop)
+        return properties
+    
+    def serializer(self, fields: Optional[Tuple[str, ...]] = None) -> Dict[str,any]:
+        '''Serializa los datos de la entidad (los convierte a Diccionarios o Json)
+        con `fields` solo se emiten esas llaves, en el orden en que vienen'''
+        data = {
             'id': self.id,
             'address': self.address,
             'city': self.city,
@@ -33,6 +60,9 @@ class Property:
             'description': self.description,
             'year': self.year
         }
+        if fields is None:
+            return data
+        return {name: data[name] for name in fields}
         
         
         
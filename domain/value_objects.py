@@ -1,8 +1,8 @@
 '''Value Object para los filtros de los usuarios'''
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from enum import Enum
-from typing import Optional
+from typing import FrozenSet, Optional, Tuple
 
 
 class PropertyState(Enum):
@@ -10,17 +10,134 @@ class PropertyState(Enum):
     PRE_VENTA = 'pre_venta'
     VENTA = 'en_venta'
     VENDIDO = 'vendido'
+
+
+# Tabla precalculada nombre de estado -> PropertyState, evita construir el Enum por cada fila
+STATE_BY_NAME = {state.value: state for state in PropertyState}
+
+# Campos por los que se puede ordenar (?sort=); el id desempata siempre en la misma direccion
+SORT_FIELDS = ('id', 'price', 'year')
+
+
+def city_key(city: str) -> str:
+    '''Forma canonica de una ciudad, igual a la columna generada `city_key` (LOWER(TRIM(city))): la usan
+    los filtros, la consulta SQL y los indices en memoria para que todos los backends coincidan'''
+    return city.strip().lower()
     
 
-@dataclass
+@dataclass(frozen=True)
 class PropertyFilter:
-    '''Entidad que representa los filtros'''
+    '''Entidad que representa los filtros, es inmutable para poder usarse como llave de cache'''
     year : Optional [int] = None
     city : Optional [str] = None
     state : Optional [PropertyState] = None 
+    # Paginacion por llave (keyset): tamaño de pagina y ultimo id ya entregado
+    limit : Optional [int] = None
+    after_id : Optional [int] = None
+    # Proyeccion: campos a retornar en el orden de la respuesta (None = todos)
+    fields : Optional [Tuple[str, ...]] = None
+    # Varios valores (IN) y rangos inclusivos; se combinan con AND con los filtros exactos
+    cities : Optional [Tuple[str, ...]] = None
+    states : Optional [Tuple[PropertyState, ...]] = None
+    min_price : Optional [int] = None
+    max_price : Optional [int] = None
+    min_year : Optional [int] = None
+    max_year : Optional [int] = None
+    # Orden (None = por id ascendente) y valor del campo de orden del ultimo inmueble entregado (cursor)
+    sort : Optional [str] = None
+    descending : bool = False
+    after_value : Optional [int] = None
     
     def has_filter(self) -> bool:
         '''Describe si hay o no filtros aplicados'''
         return any([self.state is not None, self.city is not None, self.state is not None])
+    
+    def city_keys(self) -> Optional[FrozenSet[str]]:
+        '''Ciudades aceptadas en forma canonica (city y cities se intersectan); None si no se filtra por ciudad'''
+        keys = None
+        if self.city is not None:
+            keys = frozenset((city_key(self.city),))
+        if self.cities is not None:
+            values = frozenset(city_key(city) for city in self.cities)
+            keys = values if keys is None else keys & values
+        return keys
+    
+    def state_values(self) -> Optional[FrozenSet[PropertyState]]:
+        '''Estados aceptados (state y states se intersectan); None si no se filtra por estado'''
+        values = None
+        if self.state is not None:
+            values = frozenset((self.state,))
+        if self.states is not None:
+            values = frozenset(self.states) if values is None else values & frozenset(self.states)
+        return values
+    
+    def has_ranges(self) -> bool:
+        '''Describe si hay rangos de precio o año'''
+        return any(bound is not None for bound in (self.min_price, self.max_price, self.min_year, self.max_year))
+    
+    def in_ranges(self, price: Optional[int], year: Optional[int]) -> bool:
+        '''Evalua los rangos como SQL: un valor NULL no cumple ningun rango'''
+        if self.min_price is not None and (price is None or price < self.min_price):
+            return False
+        if self.max_price is not None and (price is None or price > self.max_price):
+            return False
+        if self.min_year is not None and (year is None or year < self.min_year):
+            return False
+        if self.max_year is not None and (year is None or year > self.max_year):
+            return False
+        return True
+    
+    def matches(self, prop) -> bool:
+        '''Evalua el filtro sobre un inmueble con la misma semantica que la consulta SQL (sin paginacion)'''
+        if self.year is not None and prop.year != self.year:
+            return False
+        city_keys = self.city_keys()
+        if city_keys is not None and city_key(prop.city) not in city_keys:
+            return False
+        state_values = self.state_values()
+        if state_values is not None and prop.state not in state_values:
+            return False
+        return self.in_ranges(prop.price, prop.year)
+    
+    def is_id_order(self) -> bool:
+        '''Describe si el orden es el de siempre (id ascendente), el unico en que el cursor es solo un id'''
+        return self.sort in (None, 'id') and not self.descending
+    
+    def sort_key(self, prop) -> Tuple:
+        '''Llave de orden ascendente de un inmueble, la misma que ORDER BY en SQL (ver `_sort_key`)'''
+        value = getattr(prop, self.sort) if self.sort in ('price', 'year') else None
+        return self._sort_key(value, prop.id)
+    
+    def cursor_key(self) -> Optional[Tuple]:
+        '''Llave de orden del ultimo inmueble entregado; None en la primera pagina'''
+        if self.after_id is None:
+            return None
+        return self._sort_key(self.after_value, self.after_id)
+    
+    def _sort_key(self, value: Optional[int], prop_id: int) -> Tuple:
+        '''(valor, id); un año NULL va antes que cualquier año, como en MySQL, y el precio NULL ya llega como 0'''
+        if self.sort == 'year':
+            return (value is not None, value if value is not None else 0, prop_id)
+        if self.sort == 'price':
+            return (value or 0, prop_id)
+        return (prop_id,)
+    
+    def normalized(self) -> 'PropertyFilter':
+        '''Retorna el filtro en forma canonica: ciudades sin espacios y en minusculas (igual que la columna city_key)
+        y las listas ordenadas y sin repetidos, para que el orden de los parametros no cambie la llave de cache'''
+        changes = {}
+        if self.city is not None:
+            changes['city'] = city_key(self.city)
+        if self.cities is not None:
+            changes['cities'] = tuple(sorted({city_key(city) for city in self.cities}))
+        if self.states is not None:
+            changes['states'] = tuple(sorted(set(self.states), key=lambda state: state.value))
+        if self.sort == 'id' and not self.descending:
+            changes['sort'] = None
+        if self.sort in (None, 'id') and self.after_value is not None:
+            changes['after_value'] = None
+        if not changes:
+            return self
+        return replace(self, **changes)
         
     
\ No newline at end of file
@@ -2,7 +2,28 @@
 Infrastructure Layer - Implementaciones concretas para acceso a datos.
 """
 
-from .database import DatabaseConnect
-from .repository import PropertyRepositoryInterface, MySQLPropertyRepository
+from .database import DatabaseConnect, ConnectionPool, PoolExhaustedError
+from .repository import (
+    PropertyRepositoryInterface, MySQLPropertyRepository,
+    AsyncPropertyRepositoryInterface, ExecutorPropertyRepository
+)
+from .coalescing import SingleFlight, CoalescingPropertyRepository
+from .projections import LatestStatusProjection, ProjectionPropertyRepository
+from .snapshot import (
+    CatalogSnapshot, MySQLCatalogSource, CatalogSync, CatalogNotLoadedError, SnapshotPropertyRepository
+)
+from .catalog_file import write_catalog_file, MappedCatalog, MappedPropertyRepository, CatalogFilePublisher
+from .changes import PropertyChangeFeedInterface, MySQLChangeFeed
+from .schema import CatalogSchemaMigration
+from .facets import PropertyFacetsInterface, FacetCounts, CatalogFacets
+from .search import PropertySearchInterface, SearchIndex, CatalogSearch, tokenize
 
-__all__ = ['DatabaseConnect', 'PropertyRepositoryInterface', 'MySQLPropertyRepository']
\ No newline at end of file
+__all__ = ['DatabaseConnect', 'ConnectionPool', 'PoolExhaustedError', 'PropertyRepositoryInterface', 'MySQLPropertyRepository',
+           'AsyncPropertyRepositoryInterface', 'ExecutorPropertyRepository',
+           'SingleFlight', 'CoalescingPropertyRepository',
+           'LatestStatusProjection', 'ProjectionPropertyRepository',
+           'CatalogSnapshot', 'MySQLCatalogSource', 'CatalogSync', 'CatalogNotLoadedError', 'SnapshotPropertyRepository',
+           'write_catalog_file', 'MappedCatalog', 'MappedPropertyRepository', 'CatalogFilePublisher',
+           'PropertyChangeFeedInterface', 'MySQLChangeFeed', 'CatalogSchemaMigration',
+           'PropertyFacetsInterface', 'FacetCounts', 'CatalogFacets',
+           'PropertySearchInterface', 'SearchIndex', 'CatalogSearch', 'tokenize']
\ No newline at end of file
@@ -0,0 +1,305 @@
+'''Formato binario del catalogo para compartirlo entre procesos con mmap'''
+
+from bisect import bisect_right
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from domain import Property, PropertyFilter, PropertyState, city_key
+from .repository import PropertyRepositoryInterface
+from .snapshot import SnapshotPropertyRepository, select_sorted
+
+MAGIC = b'HABICAT\x00'
+# 2: el índice por ciudad usa `city_key` (sin espacios alrededor, igual que la columna de MySQL)
+FORMAT_VERSION = 2
+
+# Columnas de ancho fijo, tabla de strings e índices precalculados, en este orden
+SECTIONS = (
+    'ids', 'prices', 'years', 'states', 'addresses', 'cities', 'descriptions',
+    'string_offsets', 'strings', 'city_index', 'year_index', 'state_index',
+)
+# magic, versión, reservado, generación, cantidad de inmuebles, crc32 del cuerpo, (offset, largo) por sección
+HEADER = struct.Struct('<8sHHQII' + 'QQ' * len(SECTIONS))
+# Entrada de índice: llave, posición y largo de su lista de filas en la sección de postings
+INDEX_ENTRY = struct.Struct('<qII')
+
+STATES = tuple(PropertyState)
+NO_STRING = 0xFFFFFFFF
+NO_YEAR = -2 ** 31
+
+
+class _StringTable:
+    '''Tabla de strings deduplicados; las columnas guardan el índice del string.'''
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.blob = bytearray()
+        self.offsets = [0]
+
+    def add(self, value: str) -> int:
+        if value is None:
+            return NO_STRING
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.offsets) - 1
+            self.blob += value.encode('utf-8')
+            self.offsets.append(len(self.blob))
+        return string_id
+
+
+def _pack_index(index: Dict[int, List[int]]) -> bytes:
+    entries, postings = [], []
+    for key in sorted(index):
+        rows = index[key]
+        entries.append(INDEX_ENTRY.pack(key, len(postings), len(rows)))
+        postings.extend(rows)
+    return struct.pack('<I', len(entries)) + b''.join(entries) + struct.pack(f'<{len(postings)}I', *postings)
+
+
+def write_catalog_file(path: str, properties: Iterable[Property], generation: int) -> int:
+    '''
+    Escribe el catálogo en `path` y retorna su tamaño en bytes.
+    Se escribe a un archivo temporal y se reemplaza con os.replace: los procesos que tienen
+    mapeado el archivo anterior lo siguen leyendo sin ver una escritura a medias.
+    '''
+    rows = sorted(properties, key=lambda prop: prop.id)
+    strings = _StringTable()
+    addresses = [strings.add(prop.address) for prop in rows]
+    cities = [strings.add(prop.city) for prop in rows]
+    descriptions = [strings.add(prop.description) for prop in rows]
+
+    city_index, year_index, state_index = {}, {}, {}
+    for row, prop in enumerate(rows):
+        city_index.setdefault(strings.add(city_key(prop.city)), []).append(row)
+        year_index.setdefault(prop.year if prop.year is not None else NO_YEAR, []).append(row)
+        state_index.setdefault(STATES.index(prop.state), []).append(row)
+
+    count = len(rows)
+    sections = {
+        'ids': struct.pack(f'<{count}q', *(prop.id for prop in rows)),
+        'prices': struct.pack(f'<{count}q', *(int(prop.price) for prop in rows)),
+        'years': struct.pack(f'<{count}i', *(prop.year if prop.year is not None else NO_YEAR for prop in rows)),
+        'states': bytes(STATES.index(prop.state) for prop in rows),
+        'addresses': struct.pack(f'<{count}I', *addresses),
+        'cities': struct.pack(f'<{count}I', *cities),
+        'descriptions': struct.pack(f'<{count}I', *descriptions),
+        'string_offsets': struct.pack(f'<{len(strings.offsets)}I', *strings.offsets),
+        'strings': bytes(strings.blob),
+        'city_index': _pack_index(city_index),
+        'year_index': _pack_index(year_index),
+        'state_index': _pack_index(state_index),
+    }
+
+    # Cada sección queda alineada a 8 bytes para poder leerla con memoryview.cast sin copiar
+    body = bytearray()
+    layout = []
+    for name in SECTIONS:
+        body += b'\x00' * (-(HEADER.size + len(body)) % 8)
+        layout += [HEADER.size + len(body), len(sections[name])]
+        body += sections[name]
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, generation, count, zlib.crc32(body), *layout)
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(header)
+        file.write(body)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    return len(header) + len(body)
+
+
+class MappedCatalog:
+    '''
+    Catálogo de solo lectura sobre un archivo mapeado en memoria.
+    Las columnas se leen directamente de las páginas del archivo, que el sistema operativo
+    comparte entre todos los procesos que lo mapean; los inmuebles se materializan solo al consultarlos.
+    '''
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.identity = _file_identity(os.fstat(file.fileno()))
+
+        if len(self._map) < HEADER.size:
+            raise ValueError(f'Archivo de catálogo inválido: {path}')
+        magic, version, _, self.generation, self.count, checksum, *layout = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f'Archivo de catálogo inválido: {path}')
+        if version != FORMAT_VERSION:
+            raise ValueError(f'Versión de catálogo no soportada: {version}')
+        view = memoryview(self._map)
+        if zlib.crc32(view[HEADER.size:]) != checksum:
+            raise ValueError(f'Checksum inválido en el catálogo: {path}')
+
+        sections = {name: view[layout[2 * i]:layout[2 * i] + layout[2 * i + 1]] for i, name in enumerate(SECTIONS)}
+        self.ids = sections['ids'].cast('q')
+        self.prices = sections['prices'].cast('q')
+        self.years = sections['years'].cast('i')
+        self.states = sections['states']
+        self.addresses = sections['addresses'].cast('I')
+        self.cities = sections['cities'].cast('I')
+        self.descriptions = sections['descriptions'].cast('I')
+        self._string_offsets = sections['string_offsets'].cast('I')
+        self._strings = sections['strings']
+
+        city_index = self._unpack_index(sections['city_index'])
+        self.by_city = {self.string(key): rows for key, rows in city_index.items()}
+        self.by_year = self._unpack_index(sections['year_index'])
+        self.by_state = {STATES[key]: rows for key, rows in self._unpack_index(sections['state_index']).items()}
+
+    def string(self, string_id: int) -> str:
+        if string_id == NO_STRING:
+            return None
+        start, end = self._string_offsets[string_id], self._string_offsets[string_id + 1]
+        return str(self._strings[start:end], 'utf-8')
+
+    def property_at(self, row: int) -> Property:
+        year = self.years[row]
+        return Property(
+            id=self.ids[row],
+            address=self.string(self.addresses[row]),
+            city=self.string(self.cities[row]),
+            price=self.prices[row],
+            state=STATES[self.states[row]],
+            description=self.string(self.descriptions[row]),
+            year=year if year != NO_YEAR else None
+        )
+
+    def query(self, filters: PropertyFilter) -> List[Property]:
+        '''Misma semántica que CatalogSnapshot.query, resuelta sobre los índices del archivo.'''
+        postings = []
+        city_keys = filters.city_keys()
+        if city_keys is not None:
+            postings.append(self._rows_for(self.by_city, city_keys))
+        if filters.year is not None:
+            postings.append(self.by_year.get(filters.year, ()))
+        state_values = filters.state_values()
+        if state_values is not None:
+            postings.append(self._rows_for(self.by_state, state_values))
+
+        if not postings:
+            rows: Sequence[int] = range(self.count)
+        elif len(postings) == 1:
+            rows = postings[0]
+        else:
+            postings.sort(key=len)
+            others = [set(other) for other in postings[1:]]
+            rows = [row for row in postings[0] if all(row in other for other in others)]
+
+        # Las filas están ordenadas por id, así que en ese orden el cursor es una búsqueda binaria
+        id_order = filters.is_id_order()
+        if id_order and filters.after_id is not None:
+            rows = rows[bisect_right(rows, filters.after_id, key=self.ids.__getitem__):]
+        if filters.has_ranges():
+            prices, years = self.prices, self.years
+            rows = (row for row in rows
+                    if filters.in_ranges(prices[row], years[row] if years[row] != NO_YEAR else None))
+        if id_order:
+            return [self.property_at(row) for row in islice(rows, filters.limit)]
+        return select_sorted((self.property_at(row) for row in rows), filters)
+
+    @staticmethod
+    def _rows_for(index: Dict[Any, Sequence[int]], keys) -> Sequence[int]:
+        '''Filas de un índice para cualquiera de las llaves, en orden de fila (filtro de varios valores).'''
+        if len(keys) == 1:
+            (key,) = keys
+            return index.get(key, ())
+        return sorted(set().union(*(index.get(key, ()) for key in keys)))
+
+    @staticmethod
+    def _unpack_index(section: memoryview) -> Dict[int, memoryview]:
+        (entries,) = struct.unpack_from('<I', section)
+        postings = section[4 + entries * INDEX_ENTRY.size:].cast('I')
+        index = {}
+        for i in range(entries):
+            key, start, length = INDEX_ENTRY.unpack_from(section, 4 + i * INDEX_ENTRY.size)
+            index[key] = postings[start:start + length]
+        return index
+
+
+def _file_identity(stat: os.stat_result) -> Tuple[int, int, int]:
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class MappedPropertyRepository(PropertyRepositoryInterface):
+    '''
+    Repositorio que atiende las consultas desde el archivo de catálogo mapeado en memoria.
+    Cada `check_interval` segundos revisa si el archivo fue reemplazado y, si el nuevo es válido
+    (versión y checksum), lo mapea; las consultas en curso terminan sobre el anterior.
+    '''
+
+    def __init__(self, path: str, check_interval: float = 1, clock: Callable[[], float] = time.monotonic):
+        self.path = path
+        self.check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._catalog = MappedCatalog(path)
+        self._last_check = clock()
+        self._stats = {'reloads': 0, 'invalid_files': 0}
+
+    def find_available_properties(self, filters: PropertyFilter) -> List[Property]:
+        self._reload_if_changed()
+        return self._catalog.query(filters)
+
+    def get_catalog_version(self) -> str:
+        '''Generación del archivo mapeado; su mtime la distingue si el publicador vuelve a empezar desde 1.'''
+        self._reload_if_changed()
+        catalog = self._catalog
+        return f'{catalog.generation}-{catalog.identity[1]}'
+
+    def get_stats(self) -> Dict[str, Any]:
+        catalog = self._catalog
+        stats = dict(self._stats)
+        stats.update({'path': self.path, 'generation': catalog.generation, 'properties': catalog.count})
+        return stats
+
+    def _reload_if_changed(self) -> None:
+        if self._clock() - self._last_check < self.check_interval:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._last_check = self._clock()
+            try:
+                identity = _file_identity(os.stat(self.path))
+            except OSError:
+                return
+            if identity == self._catalog.identity:
+                return
+            try:
+                catalog = MappedCatalog(self.path)
+            except (OSError, ValueError) as e:
+                self._stats['invalid_files'] += 1
+                logging.warning(f'No se pudo cargar el catálogo {self.path}, se mantiene el anterior: {e}')
+                return
+            # El mapa anterior se libera cuando terminan las consultas que aún lo referencian
+            self._catalog = catalog
+            self._stats['reloads'] += 1
+        finally:
+            self._lock.release()
+
+
+class CatalogFilePublisher:
+    '''Escribe el catálogo en memoria a `path` cada vez que se publica una nueva foto.'''
+
+    def __init__(self, repository: SnapshotPropertyRepository, path: str):
+        self.repository = repository
+        self.path = path
+        self._published = None
+
+    def publish_if_changed(self) -> bool:
+        snapshot = self.repository.snapshot
+        if snapshot is None or snapshot is self._published:
+            return False
+        size = write_catalog_file(self.path, snapshot.properties.values(), snapshot.generation)
+        self._published = snapshot
+        logging.info(f'Catálogo publicado en {self.path}: {len(snapshot.properties)} inmuebles, {size} bytes '
+                     f'(generación {snapshot.generation})')
+        return True
@@ -0,0 +1,158 @@
+'''Feed incremental de cambios de inmuebles a partir de status_history y property.updated_at'''
+
+from abc import ABC, abstractmethod
+from typing import Iterator, List, Optional, Tuple
+import logging
+from mysql.connector import Error
+
+from domain import Property, PropertyFilter, STATE_BY_NAME
+from .database import DatabaseConnect
+from .predicates import placeholders, property_conditions, property_params
+
+# Posición de sincronización: (máximo update_date como 'YYYY-MM-DD HH:MM:SS' o None, último status_history.id,
+# máximo property.updated_at o None)
+ChangePosition = Tuple[Optional[str], int, Optional[str]]
+# Un cambio: (id del inmueble, inmueble vigente o None si salió del conjunto filtrado)
+PropertyChange = Tuple[int, Optional[Property]]
+
+
+class PropertyChangeFeedInterface(ABC):
+    '''Interfaz del feed de cambios de inmuebles (Dependency Inversion).'''
+
+    @abstractmethod
+    def current_position(self) -> ChangePosition:
+        '''Posición actual del historial; se lee antes de recorrer los cambios.'''
+        pass
+
+    @abstractmethod
+    def iter_changes(self, filters: PropertyFilter, since: Optional[ChangePosition],
+                     batch_size: int = 500) -> Iterator[PropertyChange]:
+        '''
+        Inmuebles con historial nuevo o modificados desde `since`, en orden de id. Sin `since`
+        recorre todos los disponibles (sincronización inicial).
+        '''
+        pass
+
+
+class MySQLChangeFeed(PropertyChangeFeedInterface):
+    '''
+    Feed de cambios sobre MySQL.
+    Un inmueble cambió si tiene filas de status_history con `update_date` posterior a la marca
+    o con `id` posterior (filas insertadas con fecha atrasada), o si su `property.updated_at` es
+    posterior a la marca (cambio de precio, ciudad, año...). Para cada uno se recalcula su último
+    estado: si sigue disponible y cumple el filtro se entrega completo; si no, como baja.
+    '''
+
+    AVAILABLE_STATES = ('pre_venta', 'en_venta', 'vendido')
+
+    def __init__(self, db_connection: DatabaseConnect):
+        self.db_connection = db_connection
+
+    def current_position(self) -> ChangePosition:
+        try:
+            with self.db_connection.get_connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute('SELECT MAX(update_date), COALESCE(MAX(id), 0), '
+                               '(SELECT MAX(updated_at) FROM property) FROM status_history')
+                update_date, history_id, updated_at = cursor.fetchone()
+                cursor.close()
+        except Error as e:
+            logging.error(f'Error al consultar la posición del historial: {e}')
+            raise RuntimeError(f'Error al consultar la posición del historial: {e}')
+        return ((str(update_date) if update_date is not None else None), int(history_id),
+                (str(updated_at) if updated_at is not None else None))
+
+    def iter_changes(self, filters: PropertyFilter, since: Optional[ChangePosition],
+                     batch_size: int = 500) -> Iterator[PropertyChange]:
+        query, params = self._build_query(filters, since)
+        try:
+            with self.db_connection.get_connection() as connection:
+                cursor = connection.cursor(buffered=False)
+                finished = False
+                try:
+                    cursor.execute(query, params)
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        yield from self._classify(rows, filters)
+                    finished = True
+                finally:
+                    if finished:
+                        cursor.close()
+                    else:
+                        # Quedan filas sin leer en el socket: la conexión se descarta
+                        connection.close()
+
+        except Error as e:
+            logging.error(f'Error al recorrer cambios de inmuebles: {e}')
+            raise RuntimeError(f'Error al recorrer cambios de inmuebles: {e}')
+
+    def _build_query(self, filters: PropertyFilter, since: Optional[ChangePosition]) -> Tuple[str, tuple]:
+        '''
+        Último estado de los inmuebles modificados. Con `since` los candidatos se eligen solo por las
+        marcas de cambio y el filtro completo se evalúa en `_classify`, así un inmueble que dejó de
+        cumplirlo (por estado, precio, ciudad o año) se entrega como baja. En la sincronización
+        inicial no hay bajas que informar y las condiciones sobre property se filtran en SQL.
+        '''
+        history_conditions, params = '', []
+        if since is not None:
+            since_date, since_id = since[0], since[1]
+            # Las posiciones anteriores a property.updated_at no tienen la tercera marca
+            since_updated = since[2] if len(since) > 2 else None
+            if since_date is not None:
+                changed = 'SELECT property_id FROM status_history WHERE update_date > %s OR id > %s'
+                params += [since_date, since_id]
+            else:
+                changed = 'SELECT property_id FROM status_history WHERE id > %s'
+                params.append(since_id)
+            if since_updated is not None:
+                changed += ' UNION SELECT id FROM property WHERE updated_at > %s'
+                params.append(since_updated)
+            history_conditions = f'WHERE property_id IN ({changed})'
+
+        query = f"""
+        SELECT
+            p.id,
+            p.address,
+            p.city,
+            p.price,
+            p.description,
+            p.year,
+            s.name as status_name
+        FROM property p
+        INNER JOIN (
+            SELECT
+                property_id,
+                status_id,
+                ROW_NUMBER() OVER (PARTITION BY property_id ORDER BY update_date DESC, id DESC) as rn
+            FROM status_history
+            {history_conditions}
+        ) latest_status ON p.id = latest_status.property_id AND latest_status.rn = 1
+        INNER JOIN status s ON latest_status.status_id = s.id
+        """
+
+        conditions = []
+        if since is None:
+            # Sincronización inicial: solo los disponibles, no hay bajas que informar
+            conditions.append(f's.name IN ({placeholders(len(self.AVAILABLE_STATES))})')
+            params += self.AVAILABLE_STATES
+            conditions += property_conditions(filters)
+            params += property_params(filters)
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY p.id'
+        return query, tuple(params)
+
+    @staticmethod
+    def _classify(rows: List[tuple], filters: PropertyFilter) -> Iterator[PropertyChange]:
+        for prop_id, address, city, price, description, year, status_name in rows:
+            state = STATE_BY_NAME.get(status_name)
+            prop = None
+            if state is not None:
+                prop = Property(id=prop_id, address=address or '', city=city or '', state=state,
+                                price=price or 0, description=description, year=year)
+            if prop is not None and filters.matches(prop):
+                yield prop_id, prop
+            else:
+                yield prop_id, None
@@ -0,0 +1,100 @@
+'''Coalescencia de consultas concurrentes identicas (single-flight)'''
+
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Sequence
+import threading
+
+from domain import Property, PropertyFilter
+from .repository import PropertyRepositoryInterface
+
+
+class _Call:
+    '''Consulta en curso compartida por todos los llamadores con la misma llave.'''
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    '''
+    Ejecuta una sola vez la funcion para cada llave en curso.
+    Los llamadores concurrentes con la misma llave esperan y reciben el mismo resultado (o excepcion).
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._stats = {'calls': 0, 'executions': 0, 'coalesced': 0, 'in_flight': 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._stats['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self._stats['coalesced'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._stats['executions'] += 1
+                self._stats['in_flight'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self._stats['in_flight'] -= 1
+            call.done.set()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+
+class CoalescingPropertyRepository(PropertyRepositoryInterface):
+    '''
+    Decorador de repositorio que agrupa consultas identicas concurrentes.
+    Si ya hay una consulta en curso para el mismo filtro normalizado, los demas llamadores
+    esperan su resultado en lugar de repetirla en la base de datos.
+    '''
+
+    def __init__(self, repository: PropertyRepositoryInterface):
+        self.repository = repository
+        self._flight = SingleFlight()
+
+    def find_available_properties(self, filters: PropertyFilter) -> List[Property]:
+        properties = self._flight.do(
+            filters.normalized(),
+            lambda: self.repository.find_available_properties(filters)
+        )
+        # Cada llamador recibe su propia lista para no compartir una instancia mutable
+        return list(properties)
+
+    def iter_available_properties(self, filters: PropertyFilter, batch_size: int = 500) -> Iterator[Property]:
+        '''Los recorridos en streaming no se agrupan: cada consumidor lee a su propio ritmo.'''
+        return self.repository.iter_available_properties(filters, batch_size)
+
+    def find_available_properties_batch(self, filters_list: Sequence[PropertyFilter]) -> List[List[Property]]:
+        '''Un lote ya es una sola consulta compartida: se delega sin agrupar.'''
+        return self.repository.find_available_properties_batch(filters_list)
+
+    def get_catalog_version(self):
+        return self.repository.get_catalog_version()
+
+    def get_stats(self) -> Dict[str, int]:
+        '''Retorna cuantas consultas se ejecutaron y cuantas se agruparon.'''
+        return self._flight.get_stats()
@@ -3,38 +3,302 @@
 import mysql.connector
 from mysql.connector import Error
 from contextlib import contextmanager
-import logging 
+from typing import Callable, Dict, Any, List
+import os
+import threading
+import time
+import logging
 from config import DatabaseConfig
 
+
+class PoolExhaustedError(Error):
+    '''Se lanza cuando no hay conexiones libres dentro del tiempo de espera del pool.'''
+
+
+class _PooledConnection:
+    '''Conexion fisica del pool junto con sus marcas de tiempo.'''
+
+    __slots__ = ('raw', 'created_at', 'last_used')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    '''
+    Pool acotado de conexiones reutilizables.
+    Mantiene entre `min_size` y `max_size` conexiones, descarta las que superan el tiempo
+    de inactividad o la vida maxima, valida cada conexion al entregarla y espera como maximo
+    `wait_timeout` segundos cuando todas estan ocupadas.
+    '''
+
+    def __init__(self, connection_factory: Callable[[], Any], min_size: int = 1, max_size: int = 10,
+                 idle_timeout: float = 300, max_lifetime: float = 1800, wait_timeout: float = 5,
+                 health_check: bool = True):
+        if max_size < 1:
+            raise ValueError('El tamaño máximo del pool debe ser mayor a 0')
+
+        self._connection_factory = connection_factory
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.wait_timeout = wait_timeout
+        self.health_check = health_check
+
+        self._idle: List[_PooledConnection] = []
+        self._size = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._stats = {
+            'created': 0,
+            'closed': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'failed_health_checks': 0,
+        }
+
+    def fill(self) -> None:
+        '''Abre conexiones hasta alcanzar el tamaño mínimo del pool.'''
+        while True:
+            with self._condition:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+
+            try:
+                pooled = self._create()
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+
+            with self._condition:
+                self._idle.append(pooled)
+                self._condition.notify()
+
+    def acquire(self) -> _PooledConnection:
+        '''Entrega una conexion sana del pool, creando una nueva si hay cupo.'''
+        deadline = time.monotonic() + self.wait_timeout
+
+        while True:
+            candidate = None
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise Error('El pool de conexiones está cerrado')
+
+                    if self._idle:
+                        candidate = self._idle.pop()
+                        break
+
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolExhaustedError(
+                            f'No hay conexiones disponibles después de {self.wait_timeout}s '
+                            f'(máximo {self.max_size})'
+                        )
+                    self._stats['waits'] += 1
+                    self._condition.wait(remaining)
+
+            # La creacion y validacion de conexiones se hace fuera del lock
+            if candidate is None:
+                try:
+                    candidate = self._create()
+                except Exception:
+                    self._discard_slot()
+                    raise
+            elif self._is_expired(candidate, time.monotonic()) or not self._is_healthy(candidate):
+                self._destroy(candidate)
+                continue
+
+            with self._condition:
+                self._stats['checkouts'] += 1
+            return candidate
+
+    def release(self, pooled: _PooledConnection, discard: bool = False) -> None:
+        '''Devuelve una conexion al pool o la descarta si quedó inutilizable.'''
+        if not discard:
+            try:
+                # Termina la transacción implícita para no conservar snapshots viejos de lectura
+                pooled.raw.rollback()
+            except Exception:
+                discard = True
+
+        now = time.monotonic()
+        if discard or self._closed or (self.max_lifetime and now - pooled.created_at >= self.max_lifetime):
+            self._destroy(pooled)
+            return
+
+        pooled.last_used = now
+        with self._condition:
+            self._idle.append(pooled)
+            expired = self._collect_idle_expired(now)
+            self._condition.notify()
+
+        for connection in expired:
+            self._destroy(connection)
+
+    @contextmanager
+    def connection(self):
+        '''Context manager que entrega una conexion y la devuelve al pool al terminar.'''
+        pooled = self.acquire()
+        discard = False
+        try:
+            yield pooled.raw
+        except Error:
+            discard = True
+            raise
+        finally:
+            self.release(pooled, discard=discard)
+
+    def close(self) -> None:
+        '''Cierra todas las conexiones libres; las ocupadas se cierran al devolverse.'''
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+
+        for pooled in idle:
+            self._destroy(pooled)
+
+    def get_stats(self) -> Dict[str, Any]:
+        '''Retorna las estadísticas actuales del pool.'''
+        with self._condition:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            })
+        return stats
+
+    def _create(self) -> _PooledConnection:
+        pooled = _PooledConnection(self._connection_factory())
+        with self._condition:
+            self._stats['created'] += 1
+        return pooled
+
+    def _destroy(self, pooled: _PooledConnection) -> None:
+        try:
+            pooled.raw.close()
+        except Exception as e:
+            logging.warning(f'Error cerrando conexión del pool: {e}')
+        with self._condition:
+            self._stats['closed'] += 1
+        self._discard_slot()
+
+    def _discard_slot(self) -> None:
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _is_expired(self, pooled: _PooledConnection, now: float) -> bool:
+        if self.max_lifetime and now - pooled.created_at >= self.max_lifetime:
+            return True
+        return bool(self.idle_timeout) and now - pooled.last_used >= self.idle_timeout
+
+    def _is_healthy(self, pooled: _PooledConnection) -> bool:
+        if not self.health_check:
+            return True
+        try:
+            healthy = pooled.raw.is_connected()
+        except Exception:
+            healthy = False
+        if not healthy:
+            with self._condition:
+                self._stats['failed_health_checks'] += 1
+        return healthy
+
+    def _collect_idle_expired(self, now: float) -> List[_PooledConnection]:
+        '''Retira (con el lock tomado) las conexiones inactivas que sobran por encima del mínimo.'''
+        expired = []
+        keep = []
+        surplus = self._size - self.min_size
+        # Las conexiones mas antiguas estan al inicio de la lista
+        for pooled in self._idle:
+            if surplus > 0 and self._is_expired(pooled, now):
+                expired.append(pooled)
+                surplus -= 1
+            else:
+                keep.append(pooled)
+        self._idle = keep
+        return expired
+
+
 class DatabaseConnect:
-    '''Entidad de conexion a la base de datos 
-    Implementar SinlgeTone para asegurarse de que solo se haga una conexion a la vez'''
-    
+    '''Entidad de conexion a la base de datos
+    Implementar SinlgeTone para compartir un unico pool de conexiones en todo el proceso'''
+
     _instance = None
-    
+    _lock = threading.Lock()
+
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
+        with cls._lock:
+            if cls._instance is None:
+                instance = super().__new__(cls)
+                instance.pool = ConnectionPool(
+                    connection_factory=cls._connect,
+                    min_size=DatabaseConfig.POOL_MIN_SIZE,
+                    max_size=DatabaseConfig.POOL_MAX_SIZE,
+                    idle_timeout=DatabaseConfig.POOL_IDLE_TIMEOUT,
+                    max_lifetime=DatabaseConfig.POOL_MAX_LIFETIME,
+                    wait_timeout=DatabaseConfig.POOL_WAIT_TIMEOUT,
+                    health_check=DatabaseConfig.POOL_HEALTH_CHECK
+                )
+                try:
+                    instance.pool.fill()
+                except Error as e:
+                    # El pool se llenará bajo demanda cuando la base de datos esté disponible
+                    logging.warning(f'No se pudo precargar el pool de conexiones: {e}')
+                cls._instance = instance
         return cls._instance
-    
+
+    @staticmethod
+    def _connect():
+        return mysql.connector.connect(
+            host=DatabaseConfig.HOST,
+            port=DatabaseConfig.PORT,
+            user=DatabaseConfig.USER,
+            password=DatabaseConfig.PASSWORD,
+            database=DatabaseConfig.DATABASE
+        )
+
     @contextmanager
     def get_connection(self):
-        '''Funcion de conexion con el decorador `@contextmanager` actúa como un envoltorio que gestiona automáticamente la apertura y cierre de recursos '''
-        connection = False
+        '''Funcion de conexion con el decorador `@contextmanager`: toma una conexion del pool y la devuelve automáticamente al terminar'''
         try:
-            connection = mysql.connector.connect(
-                host=DatabaseConfig.HOST,
-                port=DatabaseConfig.PORT,
-                user=DatabaseConfig.USER,
-                password=DatabaseConfig.PASSWORD,
-                database=DatabaseConfig.DATABASE
-            )
-            yield connection
+            with self.pool.connection() as connection:
+                yield connection
         except Error as e:
             logging.error(f"Error de conexión a la base de datos: {e}")
             raise
-        finally:
-            if connection and connection.is_connected():
-                connection.close()
-    
-        
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        '''Retorna las estadísticas del pool de conexiones.'''
+        return self.pool.get_stats()
+
+    def close(self) -> None:
+        '''Cierra el pool de conexiones.'''
+        self.pool.close()
+
+    @classmethod
+    def _reset_after_fork(cls) -> None:
+        '''Descarta el pool heredado del proceso padre: cada proceso hijo abre sus propias conexiones.'''
+        cls._lock = threading.Lock()
+        cls._instance = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=DatabaseConnect._reset_after_fork)
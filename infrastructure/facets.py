@@ -0,0 +1,116 @@
+'''Conteos por ciudad, estado y año precalculados y actualizados de forma incremental'''
+
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import threading
+
+from domain import Property, PropertyFilter, PropertyState, city_key
+from .snapshot import IncrementalCatalogView
+
+# Celda del agregado: (ciudad en forma canónica, estado, año)
+FacetCell = Tuple[str, PropertyState, Optional[int]]
+
+
+class PropertyFacetsInterface(ABC):
+    '''Interfaz de los conteos por dimensión de los inmuebles disponibles (Dependency Inversion).'''
+
+    @abstractmethod
+    def counts(self, filters: PropertyFilter) -> Dict[str, Any]:
+        '''
+        Total de inmuebles que cumplen el filtro y conteos por ciudad, estado y año. El conteo de
+        cada dimensión ignora el filtro de esa misma dimensión, para mostrar cuántos habría al
+        cambiar o agregar un valor.
+        '''
+        pass
+
+
+class FacetCounts:
+    '''
+    Agregado de inmuebles disponibles por celda (ciudad, estado, año).
+    Guarda la celda de cada inmueble para restarla cuando el inmueble cambia o deja de estar
+    disponible. Las consultas recorren las celdas, no los inmuebles: su costo depende de la
+    cantidad de combinaciones distintas, no del tamaño del catálogo.
+    '''
+
+    def __init__(self, properties: Iterable[Property] = ()):
+        self._cells: Dict[FacetCell, int] = defaultdict(int)
+        self._by_property: Dict[int, FacetCell] = {}
+        # Nombre de cada ciudad tal como viene en el catálogo (la primera escritura vista), por su forma canónica
+        self._city_names: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.apply(properties)
+
+    def __len__(self) -> int:
+        return len(self._by_property)
+
+    def apply(self, upserts: Iterable[Property], removed_ids: Iterable[int] = ()) -> None:
+        '''Aplica inmuebles nuevos o modificados y retira los que dejaron de estar disponibles.'''
+        with self._lock:
+            for prop_id in removed_ids:
+                self._discard(prop_id)
+            for prop in upserts:
+                self._discard(prop.id)
+                city = city_key(prop.city)
+                cell = (city, prop.state, prop.year)
+                self._cells[cell] += 1
+                self._by_property[prop.id] = cell
+                self._city_names.setdefault(city, prop.city)
+
+    def counts(self, filters: PropertyFilter) -> Dict[str, Any]:
+        with self._lock:
+            cells = list(self._cells.items())
+            city_names = dict(self._city_names)
+
+        city_keys = filters.city_keys()
+        state_values = filters.state_values()
+        total = 0
+        by_city, by_state, by_year = defaultdict(int), defaultdict(int), defaultdict(int)
+        for (city, state, year), count in cells:
+            city_ok = city_keys is None or city in city_keys
+            state_ok = state_values is None or state in state_values
+            year_ok = (filters.year is None or year == filters.year) and filters.in_ranges(None, year)
+            if city_ok and state_ok and year_ok:
+                total += count
+            if state_ok and year_ok:
+                by_city[city] += count
+            if city_ok and year_ok:
+                by_state[state] += count
+            if city_ok and state_ok:
+                by_year[year] += count
+
+        return {
+            'total': total,
+            'facets': {
+                'city': self._ranked({city_names[city]: count for city, count in by_city.items()}),
+                'state': self._ranked({state.value: count for state, count in by_state.items()}),
+                'year': self._ranked(by_year),
+            }
+        }
+
+    def _discard(self, prop_id: int) -> None:
+        cell = self._by_property.pop(prop_id, None)
+        if cell is None:
+            return
+        self._cells[cell] -= 1
+        if not self._cells[cell]:
+            del self._cells[cell]
+
+    @staticmethod
+    def _ranked(counts: Dict[Any, int]) -> List[Dict[str, Any]]:
+        '''Valores con al menos un inmueble, de mayor a menor conteo (desempate por valor).'''
+        return [{'value': value, 'count': count}
+                for value, count in sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+                if count]
+
+
+class CatalogFacets(IncrementalCatalogView, PropertyFacetsInterface):
+    '''Mantiene un FacetCounts sincronizado con MySQL (ver IncrementalCatalogView).'''
+
+    description = 'los conteos por dimensión'
+
+    def counts(self, filters: PropertyFilter) -> Dict[str, Any]:
+        return self._current().counts(filters)
+
+    def _build(self, properties: List[Property]) -> FacetCounts:
+        return FacetCounts(properties)
@@ -0,0 +1,116 @@
+'''Compilación de PropertyFilter a condiciones SQL sobre property y status'''
+
+from typing import Any, List
+
+from domain import PropertyFilter, city_key
+
+
+def placeholders(count: int) -> str:
+    '''Lista de marcadores `%s` para una cláusula IN.'''
+    return ', '.join(['%s'] * count)
+
+
+def property_conditions(filters: PropertyFilter, alias: str = 'p') -> List[str]:
+    '''
+    Condiciones sobre columnas de `property` (ver `property_params`). Se comparan columnas sin
+    funciones para que MySQL use sus índices; la ciudad se compara contra `city_key`.
+    '''
+    conditions = []
+
+    if filters.year is not None:
+        conditions.append(f'{alias}.year = %s')
+    if filters.min_year is not None:
+        conditions.append(f'{alias}.year >= %s')
+    if filters.max_year is not None:
+        conditions.append(f'{alias}.year <= %s')
+
+    if filters.min_price is not None:
+        conditions.append(f'{alias}.price >= %s')
+    if filters.max_price is not None:
+        conditions.append(f'{alias}.price <= %s')
+
+    if filters.city is not None:
+        conditions.append(f'{alias}.city_key = %s')
+    if filters.cities is not None:
+        conditions.append(f'{alias}.city_key IN ({placeholders(len(filters.cities))})')
+
+    return conditions
+
+
+def property_params(filters: PropertyFilter) -> List[Any]:
+    '''Parámetros de `property_conditions`, en el mismo orden.'''
+    params = [bound for bound in (filters.year, filters.min_year, filters.max_year,
+                                  filters.min_price, filters.max_price) if bound is not None]
+    if filters.city is not None:
+        params.append(city_key(filters.city))
+    if filters.cities is not None:
+        params.extend(city_key(city) for city in filters.cities)
+    return params
+
+
+def status_conditions(filters: PropertyFilter) -> List[str]:
+    '''Condiciones sobre el nombre del último estado (`s.name`).'''
+    conditions = []
+    if filters.state is not None:
+        conditions.append('s.name = %s')
+    if filters.states is not None:
+        conditions.append(f's.name IN ({placeholders(len(filters.states))})')
+    return conditions
+
+
+def status_params(filters: PropertyFilter) -> List[Any]:
+    '''Parámetros de `status_conditions`, en el mismo orden.'''
+    params = []
+    if filters.state is not None:
+        params.append(filters.state.value)
+    if filters.states is not None:
+        params.extend(state.value for state in filters.states)
+    return params
+
+
+# Columna de cada campo de orden, sin funciones para que el ORDER BY y el cursor recorran los índices
+# (ver CatalogSchemaMigration). El precio se ordena por la columna generada price_key = COALESCE(price, 0):
+# el precio NULL va como 0, igual que al mapear el inmueble
+SORT_EXPRESSIONS = {'id': '{alias}.id', 'price': '{alias}.price_key', 'year': '{alias}.year'}
+
+
+def order_by(filters: PropertyFilter, alias: str = 'p') -> str:
+    '''
+    ORDER BY del orden pedido con desempate por id en la misma dirección: el orden es total y
+    estable entre páginas. MySQL ordena los NULL antes que cualquier valor, igual que `sort_key`.
+    '''
+    direction = ' DESC' if filters.descending else ''
+    if filters.sort in (None, 'id'):
+        return f'{alias}.id{direction}'
+    expression = SORT_EXPRESSIONS[filters.sort].format(alias=alias)
+    return f'{expression}{direction}, {alias}.id{direction}'
+
+
+def keyset_condition(filters: PropertyFilter, alias: str = 'p') -> str:
+    '''
+    Condición de la paginación por llave: inmuebles posteriores a (after_value, after_id) en el
+    orden pedido (ver `keyset_params`). Solo el año puede ser NULL y los NULL van primero.
+    '''
+    after = '<' if filters.descending else '>'
+    if filters.sort in (None, 'id'):
+        return f'{alias}.id {after} %s'
+
+    expression = SORT_EXPRESSIONS[filters.sort].format(alias=alias)
+    if filters.sort == 'year' and filters.after_value is None:
+        # El último entregado no tenía año: en orden ascendente siguen los demás NULL y luego todos
+        # los que tienen año; en descendente los NULL son el final
+        if filters.descending:
+            return f'({expression} IS NULL AND {alias}.id < %s)'
+        return f'({expression} IS NOT NULL OR {alias}.id > %s)'
+
+    condition = f'{expression} {after} %s OR ({expression} = %s AND {alias}.id {after} %s)'
+    if filters.sort == 'year' and filters.descending:
+        condition += f' OR {expression} IS NULL'
+    return f'({condition})'
+
+
+def keyset_params(filters: PropertyFilter) -> List[Any]:
+    '''Parámetros de `keyset_condition`, en el mismo orden.'''
+    if filters.sort in (None, 'id') or (filters.sort == 'year' and filters.after_value is None):
+        return [filters.after_id]
+    return [filters.after_value, filters.after_value, filters.after_id]
@@ -0,0 +1,308 @@
+'''Proyeccion materializada del ultimo estado de cada inmueble'''
+
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Tuple
+import logging
+import threading
+import time
+from mysql.connector import Error
+
+from domain import PropertyFilter
+from .database import DatabaseConnect
+from .repository import MySQLPropertyRepository
+
+
+class LatestStatusProjection:
+    '''
+    Mantiene la tabla `property_latest_status` (property_id, status_id, update_date) con el
+    último estado de cada inmueble.
+    Se construye una vez y luego se actualiza de forma incremental: solo se recalculan los
+    inmuebles con filas nuevas en `status_history` desde la marca de agua (último `id` procesado).
+    Una transacción puede confirmar un `id` menor que otro ya visto (los ids se asignan al insertar,
+    no al confirmar): por eso cada actualización vuelve a revisar las filas posteriores a la marca
+    que estaba vigente hace `rescan_window` segundos, no solo las posteriores a la actual.
+    '''
+
+    NAME = 'property_latest_status'
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS property_latest_status (
+            property_id INT NOT NULL PRIMARY KEY,
+            status_id INT NOT NULL,
+            update_date DATETIME NULL,
+            KEY idx_property_latest_status_status (status_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS projection_state (
+            name VARCHAR(64) NOT NULL PRIMARY KEY,
+            high_water_mark BIGINT NOT NULL DEFAULT 0,
+            refreshed_at DATETIME NULL
+        )
+        """,
+    )
+
+    # El desempate por id hace determinista el último estado cuando dos cambios comparten update_date
+    LATEST_STATUS = """
+        SELECT property_id, status_id, update_date
+        FROM (
+            SELECT
+                property_id,
+                status_id,
+                update_date,
+                ROW_NUMBER() OVER (PARTITION BY property_id ORDER BY update_date DESC, id DESC) as rn
+            FROM status_history
+            {conditions}
+        ) latest
+        WHERE rn = 1
+    """
+
+    UPSERT = """
+        INSERT INTO property_latest_status (property_id, status_id, update_date)
+        {latest}
+        ON DUPLICATE KEY UPDATE status_id = VALUES(status_id), update_date = VALUES(update_date)
+    """
+
+    def __init__(self, db_connection: DatabaseConnect, refresh_interval: float = 5,
+                 rescan_window: float = 30, clock: Callable[[], float] = time.monotonic):
+        self.db_connection = db_connection
+        self.refresh_interval = refresh_interval
+        self.rescan_window = rescan_window
+        self._clock = clock
+        # Marcas de agua leídas en cada actualización (momento, marca), de la más antigua a la más reciente
+        self._observed_marks: Deque[Tuple[float, int]] = deque()
+        self._lock = threading.Lock()
+        self._last_refresh = None
+        self._stats = {'rebuilds': 0, 'refreshes': 0, 'refreshed_properties': 0, 'errors': 0,
+                       'high_water_mark': None}
+
+    def ensure_schema(self) -> None:
+        '''Crea las tablas de la proyección si no existen.'''
+        with self.db_connection.get_connection() as connection:
+            cursor = connection.cursor()
+            for statement in self.SCHEMA:
+                cursor.execute(statement)
+            cursor.close()
+
+    def ensure_built(self) -> None:
+        '''Crea las tablas si no existen y construye la proyección la primera vez.'''
+        self.ensure_schema()
+        with self.db_connection.get_connection() as connection:
+            cursor = connection.cursor()
+            built = self._read_high_water_mark(cursor) is not None
+            cursor.close()
+
+        if not built:
+            self.rebuild()
+
+    def rebuild(self) -> int:
+        '''Reconstruye la proyección completa desde `status_history`; retorna los inmuebles proyectados.'''
+        with self._lock, self.db_connection.get_connection() as connection:
+            cursor = connection.cursor()
+            high_water_mark = self._max_history_id(cursor)
+
+            cursor.execute('DELETE FROM property_latest_status')
+            cursor.execute(
+                self.UPSERT.format(latest=self.LATEST_STATUS.format(conditions='WHERE id <= %s')),
+                (high_water_mark,)
+            )
+            rows = cursor.rowcount
+            self._write_high_water_mark(cursor, high_water_mark, replace=True)
+            connection.commit()
+            cursor.close()
+            self._observed_marks.clear()
+
+        self._last_refresh = self._clock()
+        self._stats['rebuilds'] += 1
+        self._stats['high_water_mark'] = high_water_mark
+        logging.info(f'Proyección {self.NAME} reconstruida: {rows} inmuebles hasta status_history.id={high_water_mark}')
+        return rows
+
+    def refresh(self) -> int:
+        '''
+        Aplica los cambios de `status_history` posteriores a la marca de agua.
+        Retorna cuántos inmuebles se recalcularon.
+        '''
+        with self._lock:
+            return self._refresh()
+
+    def refresh_if_due(self) -> None:
+        '''
+        Actualiza la proyección si pasó `refresh_interval` desde la última vez.
+        Si otro hilo ya la está actualizando no espera; un error se registra y se sigue
+        sirviendo la proyección existente.
+        '''
+        if self._last_refresh is not None and self._clock() - self._last_refresh < self.refresh_interval:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._refresh()
+        except Error as e:
+            # Se espera un intervalo completo antes de reintentar para no repetir el error en cada request
+            self._last_refresh = self._clock()
+            self._stats['errors'] += 1
+            logging.error(f'Error al actualizar la proyección {self.NAME}: {e}')
+        finally:
+            self._lock.release()
+
+    def verify(self) -> Dict[str, Any]:
+        '''
+        Compara la proyección con el último estado calculado sobre `status_history`.
+        Se limita a la marca de agua para no reportar cambios que aún no se han aplicado.
+        '''
+        latest = self.LATEST_STATUS.format(conditions='WHERE id <= %s')
+        with self.db_connection.get_connection() as connection:
+            cursor = connection.cursor()
+            high_water_mark = self._read_high_water_mark(cursor)
+            if high_water_mark is None:
+                cursor.close()
+                raise RuntimeError(f'La proyección {self.NAME} no ha sido construida')
+
+            cursor.execute(f"""
+                SELECT
+                    COUNT(*),
+                    COALESCE(SUM(projected.property_id IS NULL), 0),
+                    COALESCE(SUM(projected.property_id IS NOT NULL AND (
+                        projected.status_id <> live.status_id
+                        OR NOT (projected.update_date <=> live.update_date)
+                    )), 0)
+                FROM ({latest}) live
+                LEFT JOIN property_latest_status projected ON projected.property_id = live.property_id
+            """, (high_water_mark,))
+            properties, missing, mismatched = cursor.fetchone()
+
+            cursor.execute("""
+                SELECT COUNT(*)
+                FROM property_latest_status projected
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM status_history sh
+                    WHERE sh.property_id = projected.property_id AND sh.id <= %s
+                )
+            """, (high_water_mark,))
+            orphaned = cursor.fetchone()[0]
+            cursor.close()
+
+        return {
+            'high_water_mark': high_water_mark,
+            'properties': int(properties),
+            'missing': int(missing),
+            'mismatched': int(mismatched),
+            'orphaned': int(orphaned),
+            'consistent': not (missing or mismatched or orphaned),
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats['seconds_since_refresh'] = (
+            round(self._clock() - self._last_refresh, 3) if self._last_refresh is not None else None
+        )
+        return stats
+
+    def _refresh(self) -> int:
+        with self.db_connection.get_connection() as connection:
+            cursor = connection.cursor()
+            previous = self._read_high_water_mark(cursor) or 0
+            high_water_mark = self._max_history_id(cursor)
+            since = self._rescan_from(previous)
+
+            refreshed = 0
+            if high_water_mark > since:
+                cursor.execute(
+                    'SELECT COUNT(DISTINCT property_id) FROM status_history WHERE id > %s AND id <= %s',
+                    (since, high_water_mark)
+                )
+                refreshed = int(cursor.fetchone()[0])
+                cursor.execute(
+                    self.UPSERT.format(latest=self.LATEST_STATUS.format(conditions="""
+                        WHERE property_id IN (
+                            SELECT property_id FROM status_history WHERE id > %s AND id <= %s
+                        )""")),
+                    (since, high_water_mark)
+                )
+                self._write_high_water_mark(cursor, high_water_mark)
+                connection.commit()
+            cursor.close()
+
+        self._last_refresh = self._clock()
+        self._stats['refreshes'] += 1
+        self._stats['refreshed_properties'] += refreshed
+        self._stats['high_water_mark'] = max(high_water_mark, previous)
+        return refreshed
+
+    def _rescan_from(self, previous: int) -> int:
+        '''
+        Registra la marca leída y retorna desde dónde revisar el historial: la marca vigente hace
+        `rescan_window` segundos (o la más antigua registrada). Las filas confirmadas fuera de orden
+        por transacciones de hasta `rescan_window - refresh_interval` segundos se recogen así en una
+        actualización posterior; recalcular un inmueble ya proyectado no cambia el resultado.
+        '''
+        now = self._clock()
+        marks = self._observed_marks
+        marks.append((now, previous))
+        # Se conserva la última observación anterior a la ventana: es la marca vigente al inicio de la ventana
+        while len(marks) > 1 and marks[1][0] <= now - self.rescan_window:
+            marks.popleft()
+        return min(previous, marks[0][1])
+
+    def _max_history_id(self, cursor) -> int:
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM status_history')
+        return int(cursor.fetchone()[0])
+
+    def _read_high_water_mark(self, cursor) -> int:
+        cursor.execute('SELECT high_water_mark FROM projection_state WHERE name = %s', (self.NAME,))
+        row = cursor.fetchone()
+        return int(row[0]) if row is not None else None
+
+    def _write_high_water_mark(self, cursor, high_water_mark: int, replace: bool = False) -> None:
+        # Varios procesos pueden actualizar a la vez: en una actualización incremental la marca nunca retrocede
+        update = 'VALUES(high_water_mark)' if replace else 'GREATEST(high_water_mark, VALUES(high_water_mark))'
+        cursor.execute(f"""
+            INSERT INTO projection_state (name, high_water_mark, refreshed_at)
+            VALUES (%s, %s, NOW())
+            ON DUPLICATE KEY UPDATE high_water_mark = {update}, refreshed_at = NOW()
+        """, (self.NAME, high_water_mark))
+
+
+class ProjectionPropertyRepository(MySQLPropertyRepository):
+    '''
+    Repositorio que lee el último estado desde `property_latest_status` en lugar de calcular
+    ROW_NUMBER() sobre todo `status_history` en cada consulta.
+    '''
+
+    def __init__(self, db_connection: DatabaseConnect, projection: LatestStatusProjection,
+                 prepared_statements: bool = True, max_statements: int = 32):
+        super().__init__(db_connection, prepared_statements, max_statements)
+        self.projection = projection
+
+    def find_available_properties(self, filters: PropertyFilter):
+        self.projection.refresh_if_due()
+        return super().find_available_properties(filters)
+
+    def iter_available_properties(self, filters: PropertyFilter, batch_size: int = 500):
+        self.projection.refresh_if_due()
+        return super().iter_available_properties(filters, batch_size)
+
+    def get_catalog_version(self):
+        # La proyección puede ir detrás de status_history: la versión es lo que ya tiene aplicado
+        self.projection.refresh_if_due()
+        return super().get_catalog_version()
+
+    def _catalog_version_query(self):
+        return ('SELECT (SELECT COALESCE(MAX(high_water_mark), 0) FROM projection_state WHERE name = %s), '
+                '(SELECT COALESCE(MAX(id), 0) FROM property), (SELECT MAX(updated_at) FROM property)',
+                (self.projection.NAME,))
+
+    def find_available_properties_batch(self, filters_list):
+        self.projection.refresh_if_due()
+        return super().find_available_properties_batch(filters_list)
+
+    def _latest_status_source(self) -> str:
+        return 'SELECT property_id, status_id FROM property_latest_status'
+
+    def _latest_status_join(self, filters: PropertyFilter) -> str:
+        return 'INNER JOIN property_latest_status latest_status ON p.id = latest_status.property_id'
+
+    def _latest_status_params(self, filters: PropertyFilter) -> List[Any]:
+        return []
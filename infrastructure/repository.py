@@ -1,12 +1,28 @@
 '''Repositorio de conexion a la base de datos'''
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from collections import OrderedDict
+from concurrent.futures import Executor
+from datetime import datetime
+from typing import List, Any, Dict, Iterator, Optional, Sequence, Tuple
+import asyncio
 import logging
+import threading
+import time
+import weakref
 from mysql.connector import Error
 
-from domain import Property, PropertyFilter, PropertyState
+from domain import Property, PropertyFilter, STATE_BY_NAME
 from .database import DatabaseConnect
+from .predicates import (
+    property_conditions, property_params, status_conditions, status_params, order_by, keyset_condition, keyset_params
+)
+
+
+def format_catalog_version(history_id: int, property_id: int, updated_at: Optional[datetime]) -> str:
+    '''Versión del catálogo a partir de sus marcas: últimos ids de status_history y property y último updated_at.'''
+    updated = updated_at.strftime('%Y%m%d%H%M%S%f') if updated_at is not None else '0'
+    return f'{history_id}-{property_id}-{updated}'
 
 
 class PropertyRepositoryInterface(ABC):
@@ -16,6 +32,69 @@ class PropertyRepositoryInterface(ABC):
     def find_available_properties(self, filters: PropertyFilter) -> List[Property]:
         '''Encuentra inmuebles disponibles aplicando filtros.'''
         pass
+    
+    def iter_available_properties(self, filters: PropertyFilter, batch_size: int = 500) -> Iterator[Property]:
+        '''
+        Recorre los inmuebles disponibles sin cargarlos todos en memoria.
+        Por defecto delega en `find_available_properties`; las implementaciones con
+        cursores del lado del servidor lo sobrescriben.
+        '''
+        yield from self.find_available_properties(filters)
+    
+    def find_available_properties_batch(self, filters_list: Sequence[PropertyFilter]) -> List[List[Property]]:
+        '''
+        Resuelve varios filtros a la vez; retorna un resultado por filtro, en el mismo orden.
+        Por defecto consulta uno por uno; MySQL los resuelve en una sola consulta.
+        '''
+        return [self.find_available_properties(filters) for filters in filters_list]
+    
+    def get_catalog_version(self) -> Optional[str]:
+        '''
+        Versión de los datos del catálogo: cambia cada vez que puede cambiar algún resultado.
+        Se lee antes de consultar, así un resultado nunca es más antiguo que la versión con que se
+        etiqueta. None si el repositorio no puede calcularla (sin GET condicional).
+        '''
+        return None
+
+
+class AsyncPropertyRepositoryInterface(ABC):
+    '''Interfaz asíncrona para el repositorio de inmuebles (Dependency Inversion).'''
+    
+    @abstractmethod
+    async def find_available_properties(self, filters: PropertyFilter) -> List[Property]:
+        '''Encuentra inmuebles disponibles aplicando filtros sin bloquear el event loop.'''
+        pass
+    
+    async def find_available_properties_batch(self, filters_list: Sequence[PropertyFilter]) -> List[List[Property]]:
+        '''Resuelve varios filtros a la vez (ver PropertyRepositoryInterface.find_available_properties_batch).'''
+        return [await self.find_available_properties(filters) for filters in filters_list]
+    
+    async def get_catalog_version(self) -> Optional[str]:
+        '''Versión de los datos del catálogo (ver PropertyRepositoryInterface.get_catalog_version).'''
+        return None
+
+
+class ExecutorPropertyRepository(AsyncPropertyRepositoryInterface):
+    '''
+    Adaptador asíncrono sobre un repositorio bloqueante.
+    Ejecuta las consultas en un executor hasta contar con un driver asíncrono nativo.
+    '''
+    
+    def __init__(self, repository: PropertyRepositoryInterface, executor: Executor = None):
+        self.repository = repository
+        self.executor = executor
+        
+    async def find_available_properties(self, filters: PropertyFilter) -> List[Property]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.repository.find_available_properties, filters)
+    
+    async def find_available_properties_batch(self, filters_list: Sequence[PropertyFilter]) -> List[List[Property]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.repository.find_available_properties_batch, filters_list)
+    
+    async def get_catalog_version(self) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.repository.get_catalog_version)
 
 
 class MySQLPropertyRepository(PropertyRepositoryInterface):
@@ -24,101 +103,462 @@ class MySQLPropertyRepository(PropertyRepositoryInterface):
     Responsabilidad única: acceso a datos de inmuebles.
     '''
     
-    def __init__(self, db_connection: DatabaseConnect):
+    # Columnas que se pueden omitir con `fields`; id y el estado siempre se leen (cursor y filtro de disponibilidad)
+    PROJECTABLE_COLUMNS = ('address', 'city', 'price', 'description', 'year')
+    # Formas de consulta con el SQL ya construido que se conservan (LRU)
+    MAX_QUERY_SHAPES = 256
+    
+    def __init__(self, db_connection: DatabaseConnect, prepared_statements: bool = True,
+                 max_statements: int = 32):
         self.db_connection = db_connection
+        self.prepared_statements = prepared_statements
+        # Sentencias preparadas que conserva cada conexión; cada una ocupa memoria en el servidor
+        # y cuenta para max_prepared_stmt_count
+        self.max_statements = max_statements
+        # SQL ya construido por forma de consulta (qué campos del filtro están presentes y la proyección)
+        self._query_cache: 'OrderedDict[Tuple, str]' = OrderedDict()
+        # Cursores preparados por conexión del pool y forma de consulta (LRU); se liberan junto con la conexión
+        self._statements: 'weakref.WeakKeyDictionary[Any, OrderedDict[Tuple, Any]]' = weakref.WeakKeyDictionary()
+        self._statements_lock = threading.Lock()
+        self._statement_stats = {'prepared': 0, 'prepare_execute_seconds': 0.0,
+                                 'reused': 0, 'execute_seconds': 0.0, 'evicted': 0}
         
     def find_available_properties(self, filters: PropertyFilter) -> List[Property]:
         '''
         Encuentra inmuebles disponibles con el último estado válido.
         Solo retorna inmuebles con estados: pre_venta, en_venta, vendido.
         '''
+        # Forma canónica: listas sin repetidos y ordenadas, así el SQL no depende de cómo llegaron
+        filters = filters.normalized()
+        query = self._build_query(filters)
+        params = self._build_params(filters)
+        
+        try:
+            with self.db_connection.get_connection() as connection:
+                if not self.prepared_statements:
+                    cursor = connection.cursor()
+                    cursor.execute(query, params)
+                    results = cursor.fetchall()
+                    cursor.close()
+                    return self._map_rows(results)
+                
+                return self._map_rows(self._execute_prepared(connection, self._query_shape(filters), query, params))
+                
+        except Error as e:
+            logging.error(f'Error al consultar inmuebles: {e}')
+            raise RuntimeError(f'Error al consultar inmuebles: {e}')
+    
+    def iter_available_properties(self, filters: PropertyFilter, batch_size: int = 500) -> Iterator[Property]:
+        '''
+        Recorre los inmuebles disponibles con un cursor sin buffer y `fetchmany`,
+        manteniendo en memoria solo un lote de filas a la vez.
+        '''
+        filters = filters.normalized()
         query = self._build_query(filters)
         params = self._build_params(filters)
         
+        try:
+            for rows in self._iter_batches(query, params, batch_size):
+                yield from self._map_rows(rows)
+                
+        except Error as e:
+            logging.error(f'Error al recorrer inmuebles: {e}')
+            raise RuntimeError(f'Error al recorrer inmuebles: {e}')
+    
+    def _iter_batches(self, query: str, params: tuple, batch_size: int) -> Iterator[List[tuple]]:
+        '''Ejecuta la consulta con un cursor sin buffer y entrega las filas en lotes de `fetchmany`.'''
+        with self.db_connection.get_connection() as connection:
+            cursor = connection.cursor(buffered=False)
+            finished = False
+            try:
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+                finished = True
+            finally:
+                if finished:
+                    cursor.close()
+                else:
+                    # Si el consumidor abandonó el recorrido quedan filas sin leer en el socket:
+                    # se cierra la conexión para que el pool la descarte en lugar de leerlas todas
+                    connection.close()
+    
+    def find_available_properties_batch(self, filters_list: Sequence[PropertyFilter]) -> List[List[Property]]:
+        '''
+        Resuelve todos los filtros en una sola consulta: el último estado se calcula una vez en un
+        CTE que MySQL materializa y comparten las ramas UNION ALL de cada filtro (cada una con su
+        cursor y su LIMIT). Las filas vienen marcadas con la posición del filtro que las produjo.
+        '''
+        if not filters_list:
+            return []
+        filters_list = [filters.normalized() for filters in filters_list]
+        query, params = self._build_batch_query(filters_list)
+        
+        try:
+            with self.db_connection.get_connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query, params)
+                results = cursor.fetchall()
+                cursor.close()
+                
+        except Error as e:
+            logging.error(f'Error al consultar el lote de inmuebles: {e}')
+            raise RuntimeError(f'Error al consultar el lote de inmuebles: {e}')
+        
+        groups = [[] for _ in filters_list]
+        for row in results:
+            groups[row[0]].append(row[1:])
+        properties = [self._map_rows(rows) for rows in groups]
+        # UNION ALL no conserva el orden de cada rama: se llega ordenado por id y se reordena
+        # con la misma llave de ORDER BY (solo la página de cada filtro)
+        for filters, group in zip(filters_list, properties):
+            if not filters.is_id_order():
+                group.sort(key=filters.sort_key, reverse=filters.descending)
+        return properties
+    
+    def _build_batch_query(self, filters_list: Sequence[PropertyFilter]) -> Tuple[str, tuple]:
+        '''Consulta y parámetros de `find_available_properties_batch`.'''
+        branches, params = [], []
+        for index, filters in enumerate(filters_list):
+            conditions = ["s.name IN ('pre_venta', 'en_venta', 'vendido')"] + self._filter_conditions(filters)
+            branch = f"""(
+            SELECT 
+                {index} as batch_index,
+                {self._select_list(PropertyFilter(sort=filters.sort))}
+            FROM property p
+            INNER JOIN latest_status ON p.id = latest_status.property_id
+            INNER JOIN status s ON latest_status.status_id = s.id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY {order_by(filters)}"""
+            params += self._filter_params(filters)
+            if filters.limit is not None:
+                branch += ' LIMIT %s'
+                params.append(filters.limit)
+            branches.append(branch + ')')
+        
+        query = f"""
+        WITH latest_status AS ({self._latest_status_source()})
+        {' UNION ALL '.join(branches)}
+        ORDER BY batch_index, id"""
+        return query, tuple(params)
+    
+    def _latest_status_source(self) -> str:
+        '''
+        SELECT con el último estado de cada inmueble (property_id, status_id), para usarlo como CTE.
+        Con el mismo desempate por id que la proyección, para que ambos backends elijan la misma fila
+        cuando dos cambios comparten update_date.
+        '''
+        return """
+            SELECT property_id, status_id
+            FROM (
+                SELECT 
+                    property_id,
+                    status_id,
+                    ROW_NUMBER() OVER (PARTITION BY property_id ORDER BY update_date DESC, id DESC) as rn
+                FROM status_history
+            ) ranked
+            WHERE rn = 1"""
+    
+    def get_catalog_version(self) -> Optional[str]:
+        '''
+        Último id de status_history y de property y última modificación de property: todo cambio de
+        estado o inmueble nuevo agrega filas y todo UPDATE de property mueve `updated_at`.
+        Son lecturas del máximo de un índice, no recorren las tablas.
+        '''
+        query, params = self._catalog_version_query()
+        try:
+            with self.db_connection.get_connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query, params)
+                history_id, property_id, updated_at = cursor.fetchone()
+                cursor.close()
+        except Error as e:
+            logging.error(f'Error al consultar la versión del catálogo: {e}')
+            raise RuntimeError(f'Error al consultar la versión del catálogo: {e}')
+        return format_catalog_version(history_id, property_id, updated_at)
+    
+    def _catalog_version_query(self) -> Tuple[str, tuple]:
+        '''Consulta de `get_catalog_version`: (marca de status_history, último property.id, último updated_at).'''
+        return ('SELECT (SELECT COALESCE(MAX(id), 0) FROM status_history), '
+                '(SELECT COALESCE(MAX(id), 0) FROM property), (SELECT MAX(updated_at) FROM property)', ())
+    
+    def get_statement_stats(self) -> Dict[str, Any]:
+        '''Formas de consulta cacheadas y tiempos de las ejecuciones que prepararon vs. reutilizaron la sentencia.'''
+        with self._statements_lock:
+            stats = dict(self._statement_stats)
+            connections = len(self._statements)
+        
+        prepare_seconds = stats.pop('prepare_execute_seconds')
+        execute_seconds = stats.pop('execute_seconds')
+        stats.update({
+            'enabled': self.prepared_statements,
+            'query_shapes': len(self._query_cache),
+            'connections': connections,
+            # La primera ejecución en cada conexión incluye el PREPARE (parseo y plan)
+            'prepare_execute_ms_avg': round(prepare_seconds * 1000 / stats['prepared'], 3) if stats['prepared'] else None,
+            'execute_ms_avg': round(execute_seconds * 1000 / stats['reused'], 3) if stats['reused'] else None,
+        })
+        return stats
+    
+    def _execute_prepared(self, connection: Any, shape: Tuple, query: str, params: tuple) -> List[tuple]:
+        '''
+        Ejecuta la consulta como sentencia preparada del lado del servidor.
+        Cada conexión conserva un cursor preparado por forma de consulta: el primer uso la prepara
+        (MySQL la parsea y planifica una vez) y los siguientes solo envían los parámetros.
+        '''
+        with self._statements_lock:
+            cursors = self._statements.get(connection)
+            if cursors is None:
+                cursors = self._statements[connection] = OrderedDict()
+        
+        # La conexión la usa un solo hilo a la vez: sus cursores no necesitan el lock
+        cursor = cursors.get(shape)
+        reused = cursor is not None
+        if reused:
+            cursors.move_to_end(shape)
+        else:
+            cursor = cursors[shape] = connection.cursor(prepared=True)
+            if len(cursors) > self.max_statements:
+                self._close_statement(cursors.popitem(last=False)[1])
+        
+        started = time.perf_counter()
+        try:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        except Error:
+            # La sentencia se vuelve a preparar si la conexión sigue en uso
+            cursors.pop(shape, None)
+            raise
+        elapsed = time.perf_counter() - started
+        
+        with self._statements_lock:
+            if reused:
+                self._statement_stats['reused'] += 1
+                self._statement_stats['execute_seconds'] += elapsed
+            else:
+                self._statement_stats['prepared'] += 1
+                self._statement_stats['prepare_execute_seconds'] += elapsed
+        return rows
+    
+    def _close_statement(self, cursor: Any) -> None:
+        '''Cierra el cursor de una sentencia desalojada; MySQL libera la sentencia preparada (DEALLOCATE).'''
+        with self._statements_lock:
+            self._statement_stats['evicted'] += 1
+        try:
+            cursor.close()
+        except Error as e:
+            logging.warning(f'No se pudo cerrar la sentencia preparada: {e}')
+    
+    def find_available_properties_by_ids(self, ids: Sequence[int]) -> List[Property]:
+        '''Retorna, de los ids dados, los inmuebles que están disponibles con su último estado.'''
+        if not ids:
+            return []
+        filters = PropertyFilter()
+        query = self._build_query(filters, ids)
+        params = self._build_params(filters, ids)
+        
         try:
             with self.db_connection.get_connection() as connection:
-                cursor = connection.cursor(dictionary=True)
+                cursor = connection.cursor()
                 cursor.execute(query, params)
                 results = cursor.fetchall()
                 cursor.close()
                 
-                return [self._map_to_property(row) for row in results]
+                return self._map_rows(results)
                 
         except Error as e:
-            logging.error(f'Error al consultar inmuebles: {e}')
-            raise RuntimeError(f'Error al consultar inmuebles: {e}')
+            logging.error(f'Error al consultar inmuebles por id: {e}')
+            raise RuntimeError(f'Error al consultar inmuebles por id: {e}')
+    
+    @classmethod
+    def _query_shape(cls, filters: PropertyFilter) -> Tuple:
+        '''
+        Forma de la consulta: qué campos del filtro están presentes y las columnas leídas (el SQL solo
+        depende de esto). Las columnas van en el orden de la tabla, no en el de `fields`.
+        '''
+        columns = tuple(name for name in cls.PROJECTABLE_COLUMNS
+                        if filters.fields is None or name in filters.fields or name == filters.sort)
+        return (filters.year is not None, filters.city is not None, filters.state is not None,
+                filters.after_id is not None, filters.limit is not None, columns,
+                filters.sort, filters.descending, filters.after_value is None,
+                filters.min_year is not None, filters.max_year is not None,
+                filters.min_price is not None, filters.max_price is not None,
+                len(filters.cities) if filters.cities is not None else None,
+                len(filters.states) if filters.states is not None else None)
+    
+    def _build_query(self, filters: PropertyFilter, ids: Sequence[int] = None) -> str:
+        '''Retorna la consulta SQL de la forma del filtro, construyéndola solo la primera vez.'''
+        if ids:
+            # Las listas de ids cambian de largo en cada llamada: no se cachean
+            return self._render_query(filters, ids)
+        shape = self._query_shape(filters)
+        with self._statements_lock:
+            query = self._query_cache.get(shape)
+            if query is not None:
+                self._query_cache.move_to_end(shape)
+                return query
+        
+        query = self._render_query(filters)
+        with self._statements_lock:
+            self._query_cache[shape] = query
+            if len(self._query_cache) > self.MAX_QUERY_SHAPES:
+                self._query_cache.popitem(last=False)
+        return query
     
-    def _build_query(self, filters: PropertyFilter) -> str:
+    def _render_query(self, filters: PropertyFilter, ids: Sequence[int] = None) -> str:
         '''Construye la consulta SQL con subconsulta para obtener el último estado.'''
-        base_query = """
+        base_query = f"""
         SELECT 
-            p.id,
-            p.address,
-            p.city,
-            p.price,
-            p.description,
-            p.year,
-            s.name as status_name
+            {self._select_list(filters)}
         FROM property p
-        INNER JOIN (
-            SELECT 
-                property_id,
-                status_id,
-                ROW_NUMBER() OVER (PARTITION BY property_id ORDER BY update_date DESC) as rn
-            FROM status_history
-        ) latest_status ON p.id = latest_status.property_id AND latest_status.rn = 1
+        {self._latest_status_join(filters)}
         INNER JOIN status s ON latest_status.status_id = s.id
         WHERE s.name IN ('pre_venta', 'en_venta', 'vendido')
         """
         
-        conditions = []
+        conditions = self._filter_conditions(filters)
         
-        if filters.year is not None:
-            conditions.append('p.year = %s')
-            
-        if filters.city is not None:
-            conditions.append('LOWER(p.city) = LOWER(%s)')
-            
-        if filters.state is not None:
-            conditions.append('s.name = %s')
+        if ids:
+            conditions.append(f'p.id IN ({", ".join(["%s"] * len(ids))})')
         
         if conditions:
             base_query += ' AND ' + ' AND '.join(conditions)
             
-        base_query += ' ORDER BY p.id'
+        base_query += f' ORDER BY {order_by(filters)}'
+        
+        if filters.limit is not None:
+            base_query += ' LIMIT %s'
         
         return base_query
     
-    def _build_params(self, filters: PropertyFilter) -> tuple:
+    def _select_list(self, filters: PropertyFilter) -> str:
+        '''
+        Columnas del SELECT en el orden posicional de `_map_rows`.
+        Las que no se pidieron en `fields` se reemplazan por NULL: no se leen ni se transfieren
+        y el mapeo sigue siendo el mismo. El campo de orden se lee siempre (cursor de la página).
+        '''
+        columns = ['p.id']
+        for name in self.PROJECTABLE_COLUMNS:
+            if filters.fields is None or name in filters.fields or name == filters.sort:
+                columns.append(f'p.{name}')
+            else:
+                columns.append(f'NULL as {name}')
+        columns.append('s.name as status_name')
+        return ',\n            '.join(columns)
+    
+    @staticmethod
+    def _filter_conditions(filters: PropertyFilter) -> List[str]:
+        '''Condiciones del WHERE para los campos presentes del filtro (ver `_filter_params`).'''
+        conditions = property_conditions(filters) + status_conditions(filters)
+        
+        if filters.after_id is not None:
+            conditions.append(keyset_condition(filters))
+        
+        return conditions
+    
+    def _latest_status_join(self, filters: PropertyFilter) -> str:
+        '''JOIN que expone el último estado de cada inmueble como `latest_status` (property_id, status_id).'''
+        if filters.limit is not None:
+            # Página con LIMIT: MySQL recorre property en el orden de un índice (id, year o price_key,
+            # con city_key adelante si se filtra por ciudad) y busca el último estado solo de cada
+            # candidato con un salto a idx_status_history_property_date; se detiene al completar la
+            # página en lugar de calcular la ventana sobre todo el historial y ordenar después
+            return """INNER JOIN LATERAL (
+            SELECT sh.property_id, sh.status_id
+            FROM status_history sh
+            WHERE sh.property_id = p.id
+            ORDER BY sh.update_date DESC, sh.id DESC
+            LIMIT 1
+        ) latest_status ON TRUE"""
+        # El cursor y las condiciones sobre property se aplican también dentro de la subconsulta:
+        # la ventana se calcula por inmueble, así que descartar antes los inmuebles que no
+        # cumplen el filtro no cambia el resultado y la ventana recorre solo su historial.
+        # El cursor solo se puede aplicar aquí cuando el orden es por id
+        history_conditions = []
+        if self._pushes_cursor(filters):
+            history_conditions.append(f'property_id {"<" if filters.descending else ">"} %s')
+        pushed_down = property_conditions(filters, alias='pf')
+        if pushed_down:
+            history_conditions.append(
+                f'property_id IN (SELECT pf.id FROM property pf WHERE {" AND ".join(pushed_down)})'
+            )
+        history_conditions = 'WHERE ' + ' AND '.join(history_conditions) if history_conditions else ''
+        return f"""INNER JOIN (
+            SELECT 
+                property_id,
+                status_id,
+                ROW_NUMBER() OVER (PARTITION BY property_id ORDER BY update_date DESC, id DESC) as rn
+            FROM status_history
+            {history_conditions}
+        ) latest_status ON p.id = latest_status.property_id AND latest_status.rn = 1"""
+    
+    def _latest_status_params(self, filters: PropertyFilter) -> List[Any]:
+        '''Parámetros de `_latest_status_join`.'''
+        if filters.limit is not None:
+            return []
+        params = [filters.after_id] if self._pushes_cursor(filters) else []
+        return params + property_params(filters)
+    
+    @staticmethod
+    def _pushes_cursor(filters: PropertyFilter) -> bool:
+        '''Describe si el cursor se aplica dentro de la subconsulta del último estado (orden por id).'''
+        return filters.after_id is not None and filters.sort in (None, 'id')
+    
+    def _build_params(self, filters: PropertyFilter, ids: Sequence[int] = None) -> tuple:
         '''Construye los parámetros para la consulta.'''
-        params = []
+        params = self._latest_status_params(filters) + self._filter_params(filters)
         
-        if filters.year is not None:
-            params.append(filters.year)
-            
-        if filters.city is not None:
-            params.append(filters.city)
-            
-        if filters.state is not None:
-            params.append(filters.state.value)
+        if ids:
+            params.extend(ids)
+        
+        if filters.limit is not None:
+            params.append(filters.limit)
             
         return tuple(params)
     
-    def _map_to_property(self, row: Dict[str, Any]) -> Property:
-        '''Mapea una fila de la BD a una entidad Property.'''
+    @staticmethod
+    def _filter_params(filters: PropertyFilter) -> List[Any]:
+        '''Parámetros de `_filter_conditions`, en el mismo orden.'''
+        params = property_params(filters) + status_params(filters)
+        
+        if filters.after_id is not None:
+            params.extend(keyset_params(filters))
+        
+        return params
+    
+    def _map_rows(self, rows: List[tuple]) -> List[Property]:
+        '''
+        Mapea un lote de filas posicionales (id, address, city, price, description, year, status_name)
+        a entidades Property, resolviendo el estado con la tabla precalculada.
+        '''
+        states = STATE_BY_NAME
         try:
-            status = PropertyState(row['status_name'])
-        except ValueError:
+            return Property.from_values(
+                (prop_id, address or '', city or '', price or 0, states[status_name], description, year)
+                for prop_id, address, city, price, description, year, status_name in rows
+            )
+        except KeyError:
+            # Solo en el caso excepcional se recorre fila a fila para reportar cuál es inconsistente
+            return [self._map_to_property(row) for row in rows]
+    
+    def _map_to_property(self, row: tuple) -> Property:
+        '''Mapea una fila de la BD a una entidad Property.'''
+        prop_id, address, city, price, description, year, status_name = row
+        status = STATE_BY_NAME.get(status_name)
+        if status is None:
             # Manejo de inconsistencias en los datos
-            logging.warning(f'Estado inválido encontrado: {row['status_name']} para propiedad {row['id']}')
-            raise ValueError(f'Estado inválido: {row['status_name']}')
+            logging.warning(f'Estado inválido encontrado: {status_name} para propiedad {prop_id}')
+            raise ValueError(f'Estado inválido: {status_name}')
             
         return Property(
-            id=row['id'],
-            address=row['address'] or '',
-            city=row['city'] or '',
+            id=prop_id,
+            address=address or '',
+            city=city or '',
             state=status,
-            price=row['price'] or 0,
-            description=row['description'],
-            year=row['year']
-        )
\ No newline at end of file
+            price=price or 0,
+            description=description,
+            year=year
+        )
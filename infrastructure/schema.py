@@ -0,0 +1,153 @@
+'''Migración de arranque: columnas e índices de apoyo de las consultas de inmuebles'''
+
+from typing import List
+import logging
+from mysql.connector import Error
+
+from .database import DatabaseConnect
+
+
+class CatalogSchemaMigration:
+    '''
+    Agrega al esquema existente lo que necesitan las consultas de /properties:
+    - `property.city_key`: columna generada LOWER(TRIM(city)) e indexada; la ciudad se compara
+      con ella en lugar de LOWER(p.city), que impide usar un índice.
+    - `property.updated_at`: marca de modificación que MySQL actualiza en cada UPDATE; la versión del
+      catálogo y los cambios incrementales detectan con ella los cambios de precio, dirección, etc.
+    - `property.price_key`: columna generada COALESCE(price, 0), la llave de `?sort=price`; se ordena
+      por ella en lugar de COALESCE(p.price, 0), que impide usar un índice.
+    - `status_history(property_id, update_date, id)`: la ventana del último estado recorre el
+      historial de cada inmueble en el orden del índice, sin ordenar, y la página ordenada lee el
+      último estado de cada inmueble con un solo salto al índice.
+    - `status_history(update_date)`: posiciones y cambios del feed de cambios.
+    - `property(price)`: filtros por rango de precio.
+    - `property(year, id)`, `property(price_key, id)` y las mismas con `city_key` adelante: filtros
+      exactos y por rango, y el orden de `?sort=` con su desempate por id, con o sin filtro de ciudad.
+    Cada paso se aplica solo si falta. Es un paso explícito del despliegue (`python main.py migrate`):
+    los ALTER TABLE reconstruyen la tabla y necesitan privilegios de DDL. Al iniciar, el servicio
+    solo verifica con `verify` que las columnas existan.
+    '''
+
+    # Columnas de property que usan las consultas
+    REQUIRED_COLUMNS = ('city_key', 'updated_at', 'price_key')
+
+    INDEXES = (
+        ('status_history', 'idx_status_history_property_date', '(property_id, update_date, id)'),
+        ('status_history', 'idx_status_history_update_date', '(update_date)'),
+        ('property', 'idx_property_price', '(price)'),
+        ('property', 'idx_property_updated_at', '(updated_at)'),
+        ('property', 'idx_property_year_id', '(year, id)'),
+        ('property', 'idx_property_price_key_id', '(price_key, id)'),
+        ('property', 'idx_property_city_year_id', '(city_key, year, id)'),
+        ('property', 'idx_property_city_price_key_id', '(city_key, price_key, id)'),
+    )
+
+    UPDATED_AT_STATEMENT = ('ALTER TABLE property ADD COLUMN updated_at TIMESTAMP(6) NOT NULL '
+                            'DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)')
+
+    # Largo de city_key cuando city no tiene largo máximo propio (TEXT)
+    DEFAULT_CITY_LENGTH = 255
+    # Tipo de price_key cuando no se puede leer el de property.price
+    DEFAULT_PRICE_TYPE = 'BIGINT'
+
+    def __init__(self, db_connection: DatabaseConnect):
+        self.db_connection = db_connection
+
+    def migrate(self) -> List[str]:
+        '''Aplica los pasos pendientes; retorna los nombres de los que se aplicaron.'''
+        applied = []
+        try:
+            with self.db_connection.get_connection() as connection:
+                cursor = connection.cursor()
+                if not self._column_exists(cursor, 'property', 'city_key'):
+                    cursor.execute(self._city_key_statement(cursor))
+                    applied.append('property.city_key')
+                if not self._column_exists(cursor, 'property', 'updated_at'):
+                    cursor.execute(self.UPDATED_AT_STATEMENT)
+                    applied.append('property.updated_at')
+                if not self._column_exists(cursor, 'property', 'price_key'):
+                    cursor.execute(self._price_key_statement(cursor))
+                    applied.append('property.price_key')
+                for table, name, columns in self.INDEXES:
+                    if not self._index_exists(cursor, table, name):
+                        cursor.execute(f'CREATE INDEX {name} ON {table} {columns}')
+                        applied.append(name)
+                cursor.close()
+
+        except Error as e:
+            logging.error(f'Error al migrar el esquema del catálogo: {e}')
+            raise RuntimeError(f'Error al migrar el esquema del catálogo: {e}')
+
+        if applied:
+            logging.info(f'Esquema del catálogo migrado: {", ".join(applied)}')
+        return applied
+
+    def verify(self) -> None:
+        '''
+        Verifica que existan las columnas que usan las consultas; sin ellas fallarían con "unknown
+        column". Los índices que falten solo se advierten: las consultas funcionan, más lentas.
+        '''
+        try:
+            with self.db_connection.get_connection() as connection:
+                cursor = connection.cursor()
+                missing = [column for column in self.REQUIRED_COLUMNS
+                           if not self._column_exists(cursor, 'property', column)]
+                missing_indexes = [name for table, name, _ in self.INDEXES
+                                   if not self._index_exists(cursor, table, name)]
+                cursor.close()
+
+        except Error as e:
+            logging.error(f'Error al verificar el esquema del catálogo: {e}')
+            raise RuntimeError(f'Error al verificar el esquema del catálogo: {e}')
+
+        if missing:
+            columns = ', '.join(f'property.{column}' for column in missing)
+            raise RuntimeError(f'Faltan columnas del esquema del catálogo ({columns}): '
+                               'ejecute `python main.py migrate` antes de iniciar el servicio')
+        if missing_indexes:
+            logging.warning(f'Faltan índices del catálogo ({", ".join(missing_indexes)}): '
+                            'ejecute `python main.py migrate`')
+
+    def _city_key_statement(self, cursor) -> str:
+        '''ALTER TABLE de la columna generada, con el mismo largo que `property.city`.'''
+        cursor.execute(
+            'SELECT CHARACTER_MAXIMUM_LENGTH FROM information_schema.columns '
+            'WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s',
+            ('property', 'city')
+        )
+        row = cursor.fetchone()
+        length = row[0] if row and row[0] and row[0] <= 768 else self.DEFAULT_CITY_LENGTH
+        return (f'ALTER TABLE property ADD COLUMN city_key VARCHAR({length}) '
+                'GENERATED ALWAYS AS (LOWER(TRIM(city))) STORED')
+
+    def _price_key_statement(self, cursor) -> str:
+        '''ALTER TABLE de la columna generada, con el mismo tipo que `property.price`.'''
+        cursor.execute(
+            'SELECT COLUMN_TYPE FROM information_schema.columns '
+            'WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s',
+            ('property', 'price')
+        )
+        row = cursor.fetchone()
+        column_type = row[0] if row and row[0] else self.DEFAULT_PRICE_TYPE
+        if isinstance(column_type, bytes):
+            column_type = column_type.decode()
+        return (f'ALTER TABLE property ADD COLUMN price_key {column_type} '
+                'GENERATED ALWAYS AS (COALESCE(price, 0)) STORED')
+
+    @staticmethod
+    def _column_exists(cursor, table: str, column: str) -> bool:
+        cursor.execute(
+            'SELECT COUNT(*) FROM information_schema.columns '
+            'WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s',
+            (table, column)
+        )
+        return cursor.fetchone()[0] > 0
+
+    @staticmethod
+    def _index_exists(cursor, table: str, name: str) -> bool:
+        cursor.execute(
+            'SELECT COUNT(*) FROM information_schema.statistics '
+            'WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s',
+            (table, name)
+        )
+        return cursor.fetchone()[0] > 0
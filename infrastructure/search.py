@@ -0,0 +1,131 @@
+'''Búsqueda por palabras sobre la dirección y la descripción con un índice invertido en memoria'''
+
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Dict, Iterable, List, Sequence, Tuple
+import heapq
+import math
+import re
+import threading
+import unicodedata
+
+from domain import Property, PropertyFilter
+from .snapshot import IncrementalCatalogView
+
+# Palabras demasiado frecuentes en español para aportar a la búsqueda
+STOPWORDS = frozenset((
+    'a', 'al', 'con', 'de', 'del', 'e', 'el', 'en', 'la', 'las', 'lo', 'los', 'o', 'para', 'por',
+    'que', 'se', 'su', 'sus', 'u', 'un', 'una', 'unas', 'unos', 'y',
+))
+
+_WORD = re.compile(r'\w+')
+
+
+def fold(text: str) -> str:
+    '''Texto sin tildes ni diéresis y en minúsculas ('Balcón' -> 'balcon', 'Año' -> 'ano').'''
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def tokenize(text: str) -> List[str]:
+    '''Palabras normalizadas con `fold`, sin las palabras vacías.'''
+    return [word for word in _WORD.findall(fold(text)) if word not in STOPWORDS]
+
+
+class PropertySearchInterface(ABC):
+    '''Interfaz de la búsqueda por palabras sobre los inmuebles disponibles (Dependency Inversion).'''
+
+    @abstractmethod
+    def search(self, terms: Sequence[str], filters: PropertyFilter, limit: int) -> List[Tuple[Property, float]]:
+        '''
+        Hasta `limit` inmuebles que contienen alguno de los términos (ya normalizados con
+        `tokenize`) y cumplen el filtro, con su puntaje, del más relevante al menos relevante.
+        '''
+        pass
+
+
+class SearchIndex:
+    '''
+    Índice invertido de la dirección y la descripción de los inmuebles disponibles.
+    Por cada término guarda los inmuebles que lo contienen y cuántas veces; los resultados se
+    ordenan con BM25, así que los términos raros y los documentos cortos pesan más. Guarda la
+    versión indexada de cada inmueble para retirar sus términos cuando cambia o deja de estar disponible.
+    '''
+
+    # Parámetros de BM25: saturación de la frecuencia del término y normalización por longitud
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, properties: Iterable[Property] = ()):
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._properties: Dict[int, Property] = {}
+        self._lengths: Dict[int, int] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+        self.apply(properties)
+
+    def __len__(self) -> int:
+        return len(self._properties)
+
+    def apply(self, upserts: Iterable[Property], removed_ids: Iterable[int] = ()) -> None:
+        '''Indexa inmuebles nuevos o modificados y retira los que dejaron de estar disponibles.'''
+        with self._lock:
+            for prop_id in removed_ids:
+                self._discard(prop_id)
+            for prop in upserts:
+                self._discard(prop.id)
+                words = tokenize(f'{prop.address} {prop.description or ""}')
+                for term, frequency in Counter(words).items():
+                    self._postings.setdefault(term, {})[prop.id] = frequency
+                self._properties[prop.id] = prop
+                self._lengths[prop.id] = len(words)
+                self._total_length += len(words)
+
+    def search(self, terms: Sequence[str], filters: PropertyFilter, limit: int) -> List[Tuple[Property, float]]:
+        '''
+        Suma el puntaje BM25 de cada término sobre los inmuebles que lo contienen, descarta los que
+        no cumplen el filtro y selecciona los `limit` mejores con un heap (desempate por id).
+        '''
+        with self._lock:
+            count = len(self._properties)
+            if not count:
+                return []
+            average_length = self._total_length / count or 1
+            scores: Dict[int, float] = {}
+            for term in dict.fromkeys(terms):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for prop_id, frequency in postings.items():
+                    norm = self.K1 * (1 - self.B + self.B * self._lengths[prop_id] / average_length)
+                    scores[prop_id] = scores.get(prop_id, 0.0) + idf * frequency * (self.K1 + 1) / (frequency + norm)
+            properties = self._properties
+            candidates = [(score, properties[prop_id]) for prop_id, score in scores.items()
+                          if filters.matches(properties[prop_id])]
+
+        best = heapq.nsmallest(limit, candidates, key=lambda item: (-item[0], item[1].id))
+        return [(prop, score) for score, prop in best]
+
+    def _discard(self, prop_id: int) -> None:
+        prop = self._properties.pop(prop_id, None)
+        if prop is None:
+            return
+        for term in set(tokenize(f'{prop.address} {prop.description or ""}')):
+            postings = self._postings[term]
+            del postings[prop_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(prop_id)
+
+
+class CatalogSearch(IncrementalCatalogView, PropertySearchInterface):
+    '''Mantiene un SearchIndex sincronizado con MySQL (ver IncrementalCatalogView).'''
+
+    description = 'el índice de búsqueda'
+
+    def search(self, terms: Sequence[str], filters: PropertyFilter, limit: int) -> List[Tuple[Property, float]]:
+        return self._current().search(terms, filters, limit)
+
+    def _build(self, properties: List[Property]) -> SearchIndex:
+        return SearchIndex(properties)
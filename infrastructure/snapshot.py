@@ -0,0 +1,428 @@
+'''Catalogo de inmuebles en memoria con indices secundarios y actualizacion incremental'''
+
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from itertools import islice
+import heapq
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Sequence, Tuple
+import logging
+import threading
+import time
+
+from domain import Property, PropertyFilter, city_key
+from .database import DatabaseConnect
+from .repository import PropertyRepositoryInterface, MySQLPropertyRepository, format_catalog_version
+
+# Marca de sincronización: (último status_history.id, último property.id, último property.updated_at)
+CatalogMarker = Tuple[int, int, Optional[datetime]]
+
+
+class CatalogSnapshot:
+    '''
+    Foto inmutable del catálogo de inmuebles disponibles.
+    Mantiene índices por ciudad (`city_key`), año y estado; las consultas intersectan los índices
+    de los filtros presentes empezando por el más pequeño. Nunca se modifica: cada actualización
+    construye una nueva foto reutilizando los índices que no cambiaron.
+    '''
+
+    __slots__ = ('generation', 'properties', 'ids', 'by_city', 'by_year', 'by_state')
+
+    def __init__(self, generation: int, properties: Dict[int, Property], ids: Tuple[int, ...],
+                 by_city: Dict[str, FrozenSet[int]], by_year: Dict[int, FrozenSet[int]],
+                 by_state: Dict[Any, FrozenSet[int]]):
+        self.generation = generation
+        self.properties = properties
+        self.ids = ids
+        self.by_city = by_city
+        self.by_year = by_year
+        self.by_state = by_state
+
+    @classmethod
+    def build(cls, properties: Iterable[Property], generation: int = 1) -> 'CatalogSnapshot':
+        '''Construye la foto y sus índices a partir de la lista completa de inmuebles.'''
+        catalog = {prop.id: prop for prop in properties}
+        indexes = {'city': {}, 'year': {}, 'state': {}}
+        for prop in catalog.values():
+            for name, key in _index_keys(prop):
+                indexes[name].setdefault(key, set()).add(prop.id)
+
+        return cls(
+            generation, catalog, tuple(sorted(catalog)),
+            *({key: frozenset(members) for key, members in indexes[name].items()}
+              for name in ('city', 'year', 'state'))
+        )
+
+    def apply(self, upserts: Iterable[Property], removed_ids: Iterable[int]) -> 'CatalogSnapshot':
+        '''
+        Retorna una nueva foto con los inmuebles insertados/actualizados y los eliminados.
+        Solo se recalculan las entradas de índice que tocan los inmuebles modificados. Si ninguno
+        cambia de verdad (bajas que no estaban, inmuebles iguales a los vigentes) retorna la misma
+        foto sin copiar el catálogo: es el caso de la mayoría de los lotes del historial.
+        '''
+        current = self.properties
+        removed_ids = [prop_id for prop_id in removed_ids if prop_id in current]
+        upserts = [prop for prop in upserts if current.get(prop.id) != prop]
+        if not removed_ids and not upserts:
+            return self
+
+        catalog = dict(current)
+        indexes = {'city': dict(self.by_city), 'year': dict(self.by_year), 'state': dict(self.by_state)}
+        changes: Dict[Tuple[str, Hashable], set] = {}
+
+        def track(prop: Property, add: bool) -> None:
+            for name, key in _index_keys(prop):
+                members = changes.get((name, key))
+                if members is None:
+                    members = changes[(name, key)] = set(indexes[name].get(key, ()))
+                if add:
+                    members.add(prop.id)
+                else:
+                    members.discard(prop.id)
+
+        for prop_id in removed_ids:
+            old = catalog.pop(prop_id, None)
+            if old is not None:
+                track(old, add=False)
+
+        for prop in upserts:
+            old = catalog.get(prop.id)
+            if old is not None:
+                track(old, add=False)
+            catalog[prop.id] = prop
+            track(prop, add=True)
+
+        for (name, key), members in changes.items():
+            if members:
+                indexes[name][key] = frozenset(members)
+            else:
+                indexes[name].pop(key, None)
+
+        ids = self.ids if catalog.keys() == self.properties.keys() else tuple(sorted(catalog))
+        return CatalogSnapshot(
+            self.generation + 1, catalog, ids, indexes['city'], indexes['year'], indexes['state']
+        )
+
+    def query(self, filters: PropertyFilter) -> List[Property]:
+        '''
+        Resuelve el filtro con los índices; el orden, la paginación y el desempate son los mismos que en SQL.
+        Los filtros de varios valores unen las listas de su índice y los rangos se evalúan sobre los candidatos.
+        '''
+        postings = []
+        city_keys = filters.city_keys()
+        if city_keys is not None:
+            postings.append(_union(self.by_city, city_keys))
+        if filters.year is not None:
+            postings.append(self.by_year.get(filters.year, frozenset()))
+        state_values = filters.state_values()
+        if state_values is not None:
+            postings.append(_union(self.by_state, state_values))
+
+        id_order = filters.is_id_order()
+        if postings:
+            postings.sort(key=len)
+            ids = postings[0].intersection(*postings[1:])
+            if id_order:
+                ids = sorted(prop_id for prop_id in ids
+                             if filters.after_id is None or prop_id > filters.after_id)
+        elif id_order:
+            start = bisect_right(self.ids, filters.after_id) if filters.after_id is not None else 0
+            ids = self.ids[start:]
+        else:
+            ids = self.ids
+
+        properties = self.properties
+        candidates = (properties[prop_id] for prop_id in ids)
+        if filters.has_ranges():
+            candidates = (prop for prop in candidates if filters.in_ranges(prop.price, prop.year))
+        if id_order:
+            return list(islice(candidates, filters.limit))
+        return select_sorted(candidates, filters)
+
+
+def select_sorted(candidates: Iterable[Property], filters: PropertyFilter) -> List[Property]:
+    '''
+    Orden y paginación por llave fuera de SQL, con la llave de `PropertyFilter.sort_key`.
+    Con límite se seleccionan los N primeros con un heap (O(n log N)) en lugar de ordenar todos.
+    '''
+    key = filters.sort_key
+    after = filters.cursor_key()
+    if after is not None:
+        if filters.descending:
+            candidates = (prop for prop in candidates if key(prop) < after)
+        else:
+            candidates = (prop for prop in candidates if key(prop) > after)
+    if filters.limit is None:
+        return sorted(candidates, key=key, reverse=filters.descending)
+    select = heapq.nlargest if filters.descending else heapq.nsmallest
+    return select(filters.limit, candidates, key=key)
+
+
+def _union(index: Dict[Hashable, FrozenSet[int]], keys: FrozenSet[Hashable]) -> FrozenSet[int]:
+    '''Ids de un índice para cualquiera de las llaves (filtro de varios valores).'''
+    if len(keys) == 1:
+        (key,) = keys
+        return index.get(key, frozenset())
+    return frozenset().union(*(index.get(key, frozenset()) for key in keys))
+
+
+def _index_keys(prop: Property) -> Tuple[Tuple[str, Hashable], ...]:
+    '''Entradas de índice de un inmueble: (índice, llave).'''
+    return ('city', city_key(prop.city)), ('year', prop.year), ('state', prop.state)
+
+
+class MySQLCatalogSource:
+    '''
+    Origen del catálogo en MySQL: carga completa y cambios desde una marca.
+    La marca es (último status_history.id, último property.id, último property.updated_at) ya
+    sincronizados. Un UPDATE de property que confirma después de otro más reciente ya sincronizado
+    queda por debajo de la marca; lo recoge la recarga completa.
+    '''
+
+    BATCH_SIZE = 1000
+
+    def __init__(self, db_connection: DatabaseConnect, repository: MySQLPropertyRepository = None):
+        self.db_connection = db_connection
+        self.repository = repository or MySQLPropertyRepository(db_connection)
+
+    def current_marker(self) -> CatalogMarker:
+        with self.db_connection.get_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM status_history')
+            history_id = int(cursor.fetchone()[0])
+            cursor.execute('SELECT COALESCE(MAX(id), 0), MAX(updated_at) FROM property')
+            property_id, updated_at = cursor.fetchone()
+            cursor.close()
+        return history_id, int(property_id), updated_at
+
+    def load_all(self) -> List[Property]:
+        return self.repository.find_available_properties(PropertyFilter())
+
+    def changed_ids(self, since: CatalogMarker, until: CatalogMarker) -> List[int]:
+        '''Inmuebles con historial nuevo, creados o modificados entre las dos marcas.'''
+        query = """
+            SELECT property_id FROM status_history WHERE id > %s AND id <= %s
+            UNION
+            SELECT id FROM property WHERE id > %s AND id <= %s
+        """
+        params: Tuple = (since[0], until[0], since[1], until[1])
+        if until[2] is not None:
+            query += ' UNION SELECT id FROM property WHERE updated_at > %s AND updated_at <= %s'
+            params += (since[2] or datetime.min, until[2])
+        with self.db_connection.get_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(query, params)
+            ids = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+        return ids
+
+    def load(self, ids: Sequence[int]) -> List[Property]:
+        '''Carga los inmuebles disponibles entre `ids`; los ausentes ya no están disponibles.'''
+        properties = []
+        for start in range(0, len(ids), self.BATCH_SIZE):
+            properties.extend(self.repository.find_available_properties_by_ids(ids[start:start + self.BATCH_SIZE]))
+        return properties
+
+
+class CatalogNotLoadedError(RuntimeError):
+    '''La estructura en memoria aún no tiene la carga inicial del catálogo.'''
+
+
+class IncrementalCatalogView(ABC):
+    '''
+    Estructura en memoria derivada del catálogo que mantiene al día un CatalogSync.
+    La sincronización le entrega el catálogo completo en `load` y luego solo los inmuebles
+    cambiados en `apply`; las consultas nunca esperan a MySQL.
+    Las subclases construyen la estructura en `_build`; esta debe ofrecer `apply(upserts, removed_ids)`
+    y `__len__`.
+    '''
+
+    # Nombre de la estructura para los mensajes de error
+    description = 'la vista del catálogo'
+
+    def __init__(self, sync: 'CatalogSync'):
+        self._view = None
+        self._stats = {'full_loads': 0, 'refreshes': 0, 'changed_properties': 0}
+        sync.subscribe(self)
+
+    def load(self, properties: List[Property]) -> None:
+        '''Reemplaza la estructura por la del catálogo completo.'''
+        self._view = self._build(properties)
+        self._stats['full_loads'] += 1
+
+    def apply(self, upserts: List[Property], removed_ids: List[int]) -> None:
+        '''Aplica los inmuebles cambiados desde la última sincronización.'''
+        self._view.apply(upserts, removed_ids)
+        self._stats['refreshes'] += 1
+        self._stats['changed_properties'] += len(upserts) + len(removed_ids)
+
+    def get_stats(self) -> Dict[str, Any]:
+        view = self._view
+        return dict(self._stats, properties=len(view) if view is not None else 0)
+
+    def _current(self) -> Any:
+        '''Estructura vigente.'''
+        view = self._view
+        if view is None:
+            raise CatalogNotLoadedError(f'El catálogo en memoria aún no ha sido cargado ({self.description})')
+        return view
+
+    @abstractmethod
+    def _build(self, properties: List[Property]) -> Any:
+        '''Construye la estructura a partir del catálogo completo.'''
+        pass
+
+
+class CatalogSync:
+    '''
+    Sincroniza con MySQL todas las estructuras en memoria derivadas del catálogo (la foto de
+    SnapshotPropertyRepository, los conteos y el índice de búsqueda) desde un solo hilo en segundo
+    plano: cada recarga completa y cada lote de cambios se lee una vez y se entrega a todas.
+    Cada `refresh_interval` segundos trae solo los inmuebles cuyo historial o fila de property cambió
+    desde la última marca; la recarga completa cada `full_reload_interval` segundos recoge lo que la
+    marca no ve (filas borradas, cambios confirmados fuera de orden).
+    Las vistas se suscriben antes de `start`. La carga inicial también se hace en segundo plano y se
+    reintenta hasta lograrla: el proceso inicia aunque MySQL no responda y, mientras tanto, las
+    vistas responden CatalogNotLoadedError.
+    '''
+
+    def __init__(self, source: MySQLCatalogSource, refresh_interval: float = 2,
+                 full_reload_interval: float = 300, clock: Callable[[], float] = time.monotonic):
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.full_reload_interval = full_reload_interval
+        self._clock = clock
+        self._views: List[Any] = []
+        self._marker = None
+        self._last_full_load = None
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {'full_loads': 0, 'refreshes': 0, 'changed_properties': 0, 'errors': 0}
+
+    @property
+    def marker(self) -> Optional[CatalogMarker]:
+        '''Marca de la última sincronización (None antes de la primera carga).'''
+        return self._marker
+
+    def subscribe(self, view: Any) -> None:
+        '''Agrega una vista con `load(properties)` y `apply(upserts, removed_ids)`.'''
+        self._views.append(view)
+
+    def start(self) -> None:
+        '''Arranca en segundo plano la carga inicial (si no se hizo con `reload`) y la actualización.'''
+        self._thread = threading.Thread(target=self._run, name='catalog-sync', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def reload(self) -> None:
+        '''Carga el catálogo completo una vez y lo entrega a todas las vistas.'''
+        with self._refresh_lock:
+            marker = self.source.current_marker()
+            properties = self.source.load_all()
+            for view in self._views:
+                view.load(properties)
+            # La marca se publica después de los datos: la versión nunca se adelanta a lo que se sirve
+            self._marker = marker
+            self._last_full_load = self._clock()
+            self._stats['full_loads'] += 1
+        logging.info(f'Catálogo en memoria cargado: {len(properties)} inmuebles')
+
+    def refresh(self) -> int:
+        '''Aplica a todas las vistas los cambios desde la última sincronización; retorna cuántos inmuebles cambiaron.'''
+        with self._refresh_lock:
+            marker = self.source.current_marker()
+            if marker == self._marker:
+                return 0
+
+            changed = self.source.changed_ids(self._marker, marker)
+            available = self.source.load(changed)
+            available_ids = {prop.id for prop in available}
+            removed = [prop_id for prop_id in changed if prop_id not in available_ids]
+
+            for view in self._views:
+                view.apply(available, removed)
+            self._marker = marker
+            self._stats['refreshes'] += 1
+            self._stats['changed_properties'] += len(changed)
+            return len(changed)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self._stats, marker=self._marker)
+
+    def _run(self) -> None:
+        delay = 0
+        while self._last_full_load is None and not self._stop.wait(delay):
+            try:
+                self.reload()
+            except Exception as e:
+                self._stats['errors'] += 1
+                logging.exception(f'Error en la carga inicial del catálogo en memoria: {e}')
+            delay = self.refresh_interval
+
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                if self._clock() - self._last_full_load >= self.full_reload_interval:
+                    self.reload()
+                else:
+                    self.refresh()
+            except Exception as e:
+                # Cualquier error (MySQL, una fila que no se puede mapear) se registra y se reintenta
+                # en el próximo ciclo: si el hilo terminara, las vistas servirían datos viejos para siempre
+                self._stats['errors'] += 1
+                logging.exception(f'Error al actualizar el catálogo en memoria: {e}')
+
+
+class SnapshotPropertyRepository(PropertyRepositoryInterface):
+    '''
+    Repositorio que atiende las consultas desde una foto del catálogo en memoria.
+    El CatalogSync publica una nueva foto con cada lote de cambios; los lectores toman la
+    referencia vigente sin bloquearse.
+    '''
+
+    def __init__(self, sync: CatalogSync):
+        self.sync = sync
+        self._snapshot: CatalogSnapshot = None
+        sync.subscribe(self)
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        '''Foto vigente del catálogo (None antes de la primera carga).'''
+        return self._snapshot
+
+    def load(self, properties: List[Property]) -> None:
+        '''Reemplaza la foto por la del catálogo completo.'''
+        generation = self._snapshot.generation + 1 if self._snapshot is not None else 1
+        self._snapshot = CatalogSnapshot.build(properties, generation)
+
+    def apply(self, upserts: List[Property], removed_ids: List[int]) -> None:
+        '''Publica una nueva foto con los inmuebles cambiados.'''
+        self._snapshot = self._snapshot.apply(upserts, removed_ids)
+
+    def find_available_properties(self, filters: PropertyFilter) -> List[Property]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise CatalogNotLoadedError('El catálogo en memoria aún no ha sido cargado')
+        return snapshot.query(filters)
+
+    def get_catalog_version(self) -> Optional[str]:
+        # La foto se publica antes que la marca: la versión nunca se adelanta a los datos que se sirven.
+        # Incluye la generación porque una recarga completa puede cambiar datos sin mover la marca.
+        marker = self.sync.marker
+        snapshot = self._snapshot
+        if marker is None:
+            return None
+        return f'{format_catalog_version(*marker)}-g{snapshot.generation}'
+
+    def get_stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        stats = self.sync.get_stats()
+        stats.update({
+            'generation': snapshot.generation if snapshot is not None else None,
+            'properties': len(snapshot.properties) if snapshot is not None else 0,
+        })
+        return stats
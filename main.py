@@ -1,10 +1,20 @@
 '''Punto de entrada del microservicio, funcion inicial que arranca todos los servicios
     python main - arranca microservicio
     python main test - ejecuta los test
+    python main projection rebuild|verify - reconstruye o verifica la proyeccion property_latest_status
+    python main migrate - crea las columnas e indices de apoyo de las consultas del catalogo
+    python main snapshot write|watch - publica el archivo de catalogo compartido (REPOSITORY_BACKEND=mmap)
 '''
+import json
 import sys 
-from config import setup_logging
-from presentation import PropertyMicroservice
+import time
+from config import setup_logging, ServerConfig, RepositoryConfig
+from infrastructure import (
+    DatabaseConnect, LatestStatusProjection, MySQLCatalogSource, CatalogSync, SnapshotPropertyRepository,
+    CatalogFilePublisher, CatalogSchemaMigration
+)
+from presentation import PropertyMicroservice, PreforkSupervisor, AsyncPropertyMicroservice
+from presentation.handlers import ensure_catalog_file, migrate_catalog_schema
 import unittest
 
 
@@ -30,13 +40,113 @@ def run_test():
     pass
 def run_microservice():
     setup_logging()
+    if ServerConfig.MODE == 'prefork':
+        run_prefork()
+        return
+    if ServerConfig.MODE == 'asyncio':
+        AsyncPropertyMicroservice().start()
+        return
     microservice = PropertyMicroservice()
     microservice.start()
 
+def run_prefork_worker(listen_socket):
+    '''Cada worker construye sus propias dependencias (pool de conexiones, caches) después del fork'''
+    microservice = PropertyMicroservice()
+    microservice.serve_worker(listen_socket)
+
+def run_prefork():
+    '''Arranca el supervisor de procesos del modo prefork'''
+    # El supervisor verifica (o migra, con DB_AUTO_MIGRATE) el esquema antes de crear los workers
+    db_connection = DatabaseConnect()
+    migrate_catalog_schema(db_connection)
+    if RepositoryConfig.BACKEND == 'mmap':
+        # El supervisor escribe el catalogo una sola vez y los workers solo lo mapean
+        ensure_catalog_file(db_connection)
+    db_connection.close()
+    print(f'🚀 Microservicio prefork con {ServerConfig.PROCESSES} procesos en http://{ServerConfig.HOST}:{ServerConfig.PORT}')
+    supervisor = PreforkSupervisor(
+        run_prefork_worker,
+        host=ServerConfig.HOST,
+        port=ServerConfig.PORT,
+        processes=ServerConfig.PROCESSES,
+        reuse_port=ServerConfig.REUSE_PORT,
+        graceful_timeout=ServerConfig.GRACEFUL_TIMEOUT,
+        backlog=ServerConfig.LISTEN_BACKLOG
+    )
+    supervisor.run()
+
+def run_projection(command):
+    '''Reconstruye o verifica la proyeccion del ultimo estado de cada inmueble'''
+    setup_logging()
+    db_connection = DatabaseConnect()
+    projection = LatestStatusProjection(db_connection)
+    try:
+        if command == 'rebuild':
+            projection.ensure_schema()
+            rows = projection.rebuild()
+            print(f'✅ Proyección reconstruida: {rows} inmuebles')
+        elif command == 'verify':
+            report = projection.verify()
+            print(json.dumps(report, indent=2))
+            if not report['consistent']:
+                print('❌ La proyección no coincide con status_history, ejecute: python main.py projection rebuild')
+                sys.exit(1)
+            print('✅ La proyección es consistente')
+        else:
+            print('Uso: python main.py projection rebuild|verify')
+            sys.exit(2)
+    finally:
+        db_connection.close()
+
+def run_migrate():
+    '''Aplica la migracion de columnas e indices del catalogo'''
+    setup_logging()
+    db_connection = DatabaseConnect()
+    try:
+        applied = CatalogSchemaMigration(db_connection).migrate()
+        print('✅ Esquema al día' + (f', aplicado: {", ".join(applied)}' if applied else ''))
+    finally:
+        db_connection.close()
+
+def run_snapshot(command):
+    '''Escribe el archivo de catalogo una vez (write) o lo mantiene actualizado (watch)'''
+    setup_logging()
+    if command not in ('write', 'watch'):
+        print('Uso: python main.py snapshot write|watch')
+        sys.exit(2)
+    db_connection = DatabaseConnect()
+    sync = CatalogSync(
+        MySQLCatalogSource(db_connection),
+        refresh_interval=RepositoryConfig.SNAPSHOT_REFRESH_INTERVAL,
+        full_reload_interval=RepositoryConfig.SNAPSHOT_FULL_RELOAD_INTERVAL
+    )
+    publisher = CatalogFilePublisher(SnapshotPropertyRepository(sync), RepositoryConfig.SNAPSHOT_PATH)
+    try:
+        if command == 'write':
+            sync.reload()
+            publisher.publish_if_changed()
+            print(f'✅ Catálogo escrito en {RepositoryConfig.SNAPSHOT_PATH}')
+            return
+        sync.start()
+        while True:
+            publisher.publish_if_changed()
+            time.sleep(RepositoryConfig.SNAPSHOT_REFRESH_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sync.stop()
+        db_connection.close()
+
 def main():
     '''funcion principal'''
     if len(sys.argv) > 1 and sys.argv[1] == 'test':
         run_test()
+    elif len(sys.argv) > 1 and sys.argv[1] == 'projection':
+        run_projection(sys.argv[2] if len(sys.argv) > 2 else None)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'migrate':
+        run_migrate()
+    elif len(sys.argv) > 1 and sys.argv[1] == 'snapshot':
+        run_snapshot(sys.argv[2] if len(sys.argv) > 2 else None)
     else:
         run_microservice()
 
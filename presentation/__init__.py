@@ -1,4 +1,8 @@
 from .controllers import PropertyController
 from .handlers import PropertyHTTPHandler, PropertyMicroservice
+from .servers import BoundedThreadPoolHTTPServer
+from .prefork import PreforkSupervisor
+from .async_server import AsyncPropertyMicroservice
 
-__all__ = ['PropertyController', 'PropertyHTTPHandler', 'PropertyMicroservice']
\ No newline at end of file
+__all__ = ['PropertyController', 'PropertyHTTPHandler', 'PropertyMicroservice', 'BoundedThreadPoolHTTPServer', 'PreforkSupervisor',
+           'AsyncPropertyMicroservice']
\ No newline at end of file
@@ -0,0 +1,335 @@
+'''
+Servidor HTTP asíncrono (asyncio) del microservicio.
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Dict, Any, Iterator, List, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+import asyncio
+import logging
+import os
+
+from .controllers import PropertyController
+from .compression import tag_with_encoding
+from .fragments import encode_json
+from .streaming import NDJSON_CONTENT_TYPE
+from .handlers import (
+    migrate_catalog_schema, create_latest_status_projection, create_catalog_sync, create_property_repository,
+    create_catalog_facets, create_catalog_search, create_result_cache,
+    create_response_compressor, parse_hot_filters, describe_cache, repository_metrics
+)
+from application import AsyncPropertyService, PropertyService
+from infrastructure import DatabaseConnect, ExecutorPropertyRepository, MySQLChangeFeed
+from config import ServerConfig, DatabaseConfig, CacheConfig
+
+
+class _BadRequest(Exception):
+    '''Request HTTP mal formado.'''
+
+
+class AsyncPropertyMicroservice:
+    '''
+    Alternativa asyncio a PropertyMicroservice.
+    Un solo proceso mantiene miles de conexiones lentas o inactivas mientras las consultas
+    bloqueantes a MySQL se ejecutan en un executor acotado al tamaño del pool.
+    '''
+
+    MAX_HEADER_SIZE = 64 * 1024
+
+    def __init__(self, host: str = None, port: int = None):
+        self.host = host or ServerConfig.HOST
+        self.port = port or ServerConfig.PORT
+        self.server = None
+        self.open_connections = 0
+
+        # Dependency Injection - Ensamblado de dependencias
+        self.executor = ThreadPoolExecutor(max_workers=DatabaseConfig.POOL_MAX_SIZE, thread_name_prefix='db')
+        self.db_connection = DatabaseConnect()
+        migrate_catalog_schema(self.db_connection)
+        self.projection = create_latest_status_projection(self.db_connection)
+        self.catalog_sync = create_catalog_sync(self.db_connection)
+        self.blocking_repository = create_property_repository(self.db_connection, self.projection, self.catalog_sync)
+        self.facets = create_catalog_facets(self.catalog_sync)
+        self.search = create_catalog_search(self.catalog_sync)
+        if self.catalog_sync is not None:
+            self.catalog_sync.start()
+        self.property_repository = ExecutorPropertyRepository(self.blocking_repository, self.executor)
+        self.result_cache = create_result_cache()
+        self.property_service = AsyncPropertyService(self.property_repository, self.result_cache,
+                                                     CacheConfig.VERSION_TTL)
+        self.property_controller = PropertyController(self.property_service)
+        # Streaming, feed de cambios, conteos y búsqueda recorren MySQL o el catálogo en memoria de
+        # forma bloqueante: se atienden con el servicio bloqueante dentro del executor
+        self.blocking_controller = PropertyController(
+            PropertyService(self.blocking_repository, change_feed=MySQLChangeFeed(self.db_connection),
+                            facets=self.facets, search=self.search),
+            self.property_controller.fragment_cache
+        )
+        self.response_compressor = create_response_compressor()
+
+    def start(self):
+        '''Inicia el servidor HTTP asíncrono.'''
+        print(f'🚀 Microservicio (asyncio) iniciado en http://{self.host}:{self.port}')
+        print('📋 Endpoints disponibles:')
+        print('  GET /properties - Consultar inmuebles')
+        print('  POST /properties/batch - Varios filtros de /properties en un solo request')
+        print('  GET /properties/changes - Cambios desde la última sincronización')
+        print('  GET /properties/facets - Conteos por ciudad, estado y año')
+        print('  GET /properties/search - Búsqueda por palabras')
+        print('  GET /health - Estado del servicio')
+        print('  GET /metrics - Métricas internas del servicio')
+        print('  GET /admin/cache - Llaves del cache de resultados')
+
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            print('\n🛑 Deteniendo servidor...')
+        finally:
+            self.stop()
+
+    async def serve(self):
+        '''Acepta conexiones hasta que se cancele la tarea.'''
+        self.server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port,
+            backlog=ServerConfig.LISTEN_BACKLOG, limit=self.MAX_HEADER_SIZE
+        )
+        self.property_service.warm_up(parse_hot_filters(self.property_controller))
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.open_connections += 1
+        try:
+            for requests_handled in range(1, ServerConfig.KEEP_ALIVE_MAX_REQUESTS + 1):
+                try:
+                    request = await asyncio.wait_for(
+                        self._read_request(reader), ServerConfig.KEEP_ALIVE_TIMEOUT
+                    )
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except (_BadRequest, asyncio.LimitOverrunError, ValueError):
+                    await self._write_response(writer, HTTPStatus.BAD_REQUEST, {
+                        'success': False, 'error': 'Request inválido'
+                    }, keep_alive=False)
+                    break
+
+                method, target, headers, body, keep_alive = request
+                keep_alive = keep_alive and requests_handled < ServerConfig.KEEP_ALIVE_MAX_REQUESTS
+                status, payload, extra_headers = await self._dispatch(method, target, headers, body)
+                if isinstance(payload, (bytes, dict)):
+                    await self._write_response(writer, status, payload, keep_alive, requests_handled, extra_headers)
+                else:
+                    chunked = headers.get(':version') == 'HTTP/1.1'
+                    keep_alive = await self._write_stream(writer, payload, chunked and keep_alive, chunked,
+                                                          requests_handled, extra_headers)
+
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.open_connections -= 1
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes, bool]:
+        '''
+        Lee el request completo; retorna método, ruta, headers (en minúsculas), cuerpo y si se
+        mantiene la conexión.
+        '''
+        head = await reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('iso-8859-1').split('\r\n')
+
+        parts = lines[0].split()
+        if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+            raise _BadRequest(lines[0])
+        method, target, version = parts
+
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+        content_length = int(headers.get('content-length', 0))
+        if content_length < 0 or content_length > ServerConfig.MAX_BODY_SIZE:
+            raise _BadRequest(f'Content-Length {content_length}')
+        body = await reader.readexactly(content_length) if content_length else b''
+
+        # Versión del request, para decidir si una respuesta en streaming puede ir en chunks
+        headers[':version'] = version
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.1':
+            keep_alive = connection != 'close'
+        else:
+            keep_alive = connection == 'keep-alive'
+        return method, target, headers, body, keep_alive
+
+    async def _dispatch(self, method: str, target: str, headers: Dict[str, str], body: bytes = b''
+                        ) -> Tuple[HTTPStatus, Union[Dict[str, Any], bytes], List[str]]:
+        '''Atiende el request; retorna status, cuerpo y headers adicionales de la respuesta.'''
+        parsed_url = urlparse(target)
+
+        if method == 'POST' and parsed_url.path == '/properties/batch':
+            return HTTPStatus.OK, await self.property_controller.get_properties_batch_async(body), []
+
+        if method != 'GET':
+            return HTTPStatus.NOT_IMPLEMENTED, {'success': False, 'error': 'Método no soportado'}, []
+
+        loop = asyncio.get_running_loop()
+        ndjson = NDJSON_CONTENT_TYPE in headers.get('accept', '')
+
+        if parsed_url.path == '/properties/facets':
+            data = await loop.run_in_executor(self.executor, self.blocking_controller.get_facets,
+                                              parse_qs(parsed_url.query))
+            return HTTPStatus(self.blocking_controller.status_code(data)), data, []
+
+        if parsed_url.path == '/properties/search':
+            data = await loop.run_in_executor(self.executor, self.blocking_controller.search_properties,
+                                              parse_qs(parsed_url.query))
+            return HTTPStatus(self.blocking_controller.status_code(data)), data, []
+
+        if parsed_url.path == '/properties/changes':
+            error, token, chunks = await loop.run_in_executor(
+                self.executor, self.blocking_controller.stream_changes, parse_qs(parsed_url.query), ndjson
+            )
+            if error is not None:
+                return HTTPStatus.OK, error, []
+            return HTTPStatus.OK, chunks, self._stream_headers(ndjson) + [f'X-Sync-Token: {token}']
+
+        if parsed_url.path == '/properties':
+            query_params = parse_qs(parsed_url.query)
+            if ndjson or query_params.get('stream', [''])[0].lower() == 'true':
+                error, chunks = await loop.run_in_executor(
+                    self.executor, self.blocking_controller.stream_properties, query_params, ndjson
+                )
+                if error is not None:
+                    return HTTPStatus.OK, error, []
+                return HTTPStatus.OK, chunks, self._stream_headers(ndjson)
+            etag, body = await self.property_controller.get_properties_conditional_async(
+                query_params, headers.get('if-none-match')
+            )
+            return self._properties_response(etag, body, headers)
+
+        if parsed_url.path == '/health':
+            return HTTPStatus.OK, {'status': 'healthy'}, []
+
+        if parsed_url.path == '/metrics':
+            return HTTPStatus.OK, self.get_metrics(), []
+
+        if parsed_url.path == '/admin/cache':
+            return HTTPStatus.OK, describe_cache(self.property_service), []
+
+        return HTTPStatus.NOT_FOUND, {'success': False, 'error': 'Endpoint no encontrado'}, []
+
+    def _properties_response(self, etag: str, body: bytes, headers: Dict[str, str]
+                             ) -> Tuple[HTTPStatus, bytes, List[str]]:
+        '''Respuesta de /properties: 304 si el cliente ya tiene el resultado vigente o el cuerpo comprimido.'''
+        extra_headers = ['Vary: Accept-Encoding'] if self.response_compressor is not None else []
+        if body is None:
+            return HTTPStatus.NOT_MODIFIED, b'', extra_headers + self._validator_headers(etag)
+
+        encoding = None
+        if self.response_compressor is not None:
+            body, encoding = self.response_compressor.compress(body, headers.get('accept-encoding', ''))
+        if encoding is not None:
+            extra_headers.append(f'Content-Encoding: {encoding}')
+        if etag is not None:
+            extra_headers += self._validator_headers(tag_with_encoding(etag, encoding))
+        return HTTPStatus.OK, body, extra_headers
+
+    @staticmethod
+    def _stream_headers(ndjson: bool) -> List[str]:
+        return [f'Content-Type: {NDJSON_CONTENT_TYPE if ndjson else "application/json"}']
+
+    @staticmethod
+    def _validator_headers(etag: str) -> List[str]:
+        return [f'ETag: {etag}', f'Cache-Control: public, max-age={CacheConfig.HTTP_MAX_AGE}']
+
+    async def _write_response(self, writer: asyncio.StreamWriter, status: HTTPStatus,
+                              data: Union[Dict[str, Any], bytes], keep_alive: bool, requests_handled: int = 0,
+                              extra_headers: List[str] = ()):
+        '''Envía respuesta JSON con Content-Length; `data` puede venir ya codificado.'''
+        body = data if isinstance(data, bytes) else encode_json(data)
+        headers = [f'HTTP/1.1 {status.value} {status.phrase}', 'Access-Control-Allow-Origin: *', *extra_headers]
+        if status != HTTPStatus.NOT_MODIFIED:
+            # Una respuesta 304 no lleva cuerpo
+            headers += ['Content-Type: application/json', f'Content-Length: {len(body)}']
+        if keep_alive:
+            remaining = ServerConfig.KEEP_ALIVE_MAX_REQUESTS - requests_handled
+            headers.append(f'Keep-Alive: timeout={int(ServerConfig.KEEP_ALIVE_TIMEOUT)}, max={remaining}')
+        else:
+            headers.append('Connection: close')
+
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    async def _write_stream(self, writer: asyncio.StreamWriter, chunks: Iterator[bytes], keep_alive: bool,
+                            chunked: bool, requests_handled: int, extra_headers: List[str]) -> bool:
+        '''
+        Envía los bloques de una respuesta en streaming a medida que se producen. Cada bloque se lee
+        en el executor (el iterador consulta MySQL); sin chunks (HTTP/1.0) el fin lo marca el cierre.
+        Retorna si la conexión se puede reutilizar.
+        '''
+        loop = asyncio.get_running_loop()
+        headers = ['HTTP/1.1 200 OK', 'Access-Control-Allow-Origin: *', *extra_headers]
+        if chunked:
+            headers.append('Transfer-Encoding: chunked')
+        if keep_alive:
+            remaining = ServerConfig.KEEP_ALIVE_MAX_REQUESTS - requests_handled
+            headers.append(f'Keep-Alive: timeout={int(ServerConfig.KEEP_ALIVE_TIMEOUT)}, max={remaining}')
+        else:
+            headers.append('Connection: close')
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1'))
+
+        try:
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+                if chunk is None:
+                    break
+                if not chunk:
+                    continue
+                writer.write(b'%X\r\n%s\r\n' % (len(chunk), chunk) if chunked else chunk)
+                await writer.drain()
+            if chunked:
+                writer.write(b'0\r\n\r\n')
+                await writer.drain()
+        except Exception as e:
+            # Los headers ya se enviaron: se corta la respuesta para que el cliente no la tome por completa
+            logging.error(f'Error durante el streaming: {e}')
+            keep_alive = False
+        finally:
+            await loop.run_in_executor(self.executor, chunks.close)
+        return keep_alive
+
+    def get_metrics(self) -> Dict[str, Any]:
+        '''Retorna las métricas internas del microservicio.'''
+        metrics = {
+            'database_pool': self.db_connection.get_pool_stats(),
+            'open_connections': self.open_connections,
+            'pid': os.getpid()
+        }
+        if self.result_cache is not None:
+            metrics['result_cache'] = self.property_service.get_cache_stats()
+        metrics.update(repository_metrics(self.blocking_repository))
+        metrics['json_fragments'] = self.property_controller.fragment_cache.get_stats()
+        if self.response_compressor is not None:
+            metrics['compression'] = self.response_compressor.get_stats()
+        if self.projection is not None:
+            metrics['latest_status_projection'] = self.projection.get_stats()
+        if self.catalog_sync is not None:
+            metrics['catalog_sync'] = self.catalog_sync.get_stats()
+        if self.facets is not None:
+            metrics['facets'] = self.facets.get_stats()
+        if self.search is not None:
+            metrics['search'] = self.search.get_stats()
+        return metrics
+
+    def stop(self):
+        '''Detiene el servidor y libera recursos.'''
+        if self.server:
+            self.server.close()
+        self.executor.shutdown(wait=True)
+        if self.catalog_sync is not None:
+            self.catalog_sync.stop()
+        self.db_connection.close()
@@ -0,0 +1,138 @@
+'''
+Compresión gzip/deflate de las respuestas, negociada con el header Accept-Encoding.
+'''
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import gzip
+import hashlib
+import threading
+import zlib
+
+# Codificaciones soportadas, en orden de preferencia cuando el cliente les da el mismo peso
+SUPPORTED_ENCODINGS = ('gzip', 'deflate')
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    '''
+    Elige la codificación soportada con mayor peso (q) en Accept-Encoding.
+    Retorna None si el cliente no acepta ninguna y la respuesta debe ir sin comprimir.
+    '''
+    weights = {}
+    for item in (accept_encoding or '').split(','):
+        name, *params = item.split(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key.lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def tag_with_encoding(etag: str, encoding: Optional[str]) -> str:
+    '''
+    ETag de la representación comprimida: el sufijo de la codificación va dentro de las comillas,
+    así gzip, deflate y sin comprimir tienen ETags fuertes distintos.
+    '''
+    if encoding is None:
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def strip_encoding(etag: str) -> str:
+    '''Quita el sufijo de `tag_with_encoding` para comparar contra el ETag del contenido.'''
+    for encoding in SUPPORTED_ENCODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def compress(body: bytes, encoding: str, level: int = 6) -> bytes:
+    '''Comprime el cuerpo; gzip con mtime fijo para que el mismo cuerpo produzca los mismos bytes.'''
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    if encoding == 'deflate':
+        # "deflate" en HTTP es el formato zlib (RFC 1950), no deflate crudo
+        return zlib.compress(body, level)
+    raise ValueError(f'Codificación no soportada: {encoding}')
+
+
+class ResponseCompressor:
+    '''
+    Comprime las respuestas que superan `min_size` según lo que acepte el cliente.
+    Los resultados comprimidos se guardan por codificación y huella del cuerpo: una respuesta
+    servida desde el cache de resultados produce el mismo cuerpo, así que solo se comprime
+    la primera vez. Cuando el resultado cambia, la huella cambia y la entrada anterior sale
+    por LRU; el cache está acotado por el total de bytes comprimidos.
+    '''
+
+    def __init__(self, min_size: int = 1024, level: int = 6, cache_max_bytes: int = 16 * 1024 * 1024):
+        self.min_size = min_size
+        self.level = level
+        self.cache_max_bytes = cache_max_bytes
+        self._entries: 'OrderedDict[Tuple[str, bytes], bytes]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'compressed': 0, 'hits': 0, 'skipped_small': 0, 'not_accepted': 0,
+                       'evictions': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+    def compress(self, body: bytes, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+        '''Retorna (cuerpo, codificación); la codificación es None si el cuerpo va sin comprimir.'''
+        if len(body) < self.min_size:
+            self._count('skipped_small')
+            return body, None
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is None:
+            self._count('not_accepted')
+            return body, None
+
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                self._stats['bytes_in'] += len(body)
+                self._stats['bytes_out'] += len(compressed)
+                return compressed, encoding
+
+        # La compresión se hace fuera del lock: zlib libera el GIL y los hilos comprimen en paralelo
+        compressed = compress(body, encoding, self.level)
+
+        with self._lock:
+            self._stats['compressed'] += 1
+            self._stats['bytes_in'] += len(body)
+            self._stats['bytes_out'] += len(compressed)
+            if len(compressed) <= self.cache_max_bytes and key not in self._entries:
+                self._entries[key] = compressed
+                self._bytes += len(compressed)
+                while self._bytes > self.cache_max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= len(evicted)
+                    self._stats['evictions'] += 1
+        return compressed, encoding
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), bytes=self._bytes,
+                         min_size=self.min_size, level=self.level)
+        stats['ratio'] = round(stats['bytes_out'] / stats['bytes_in'], 3) if stats['bytes_in'] else None
+        return stats
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
@@ -2,11 +2,21 @@
 Controladores HTTP para manejo de requests.
 '''
 
-from typing import Dict, List, Any
+from datetime import datetime
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+from urllib.parse import parse_qs
+import base64
+import binascii
+import hashlib
+import json
 import logging
 
-from domain import PropertyFilter, PropertyState
+from domain import Property, PropertyFilter, PropertyState, SERIALIZED_FIELDS, SORT_FIELDS
 from application import PropertyService
+from infrastructure import CatalogNotLoadedError
+from .compression import strip_encoding
+from .fragments import PropertyFragmentCache, assemble_envelope, encode_json
+from .streaming import encode_json_envelope, encode_ndjson
 
 
 class PropertyController:
@@ -15,34 +25,380 @@ class PropertyController:
     Responsabilidad única: manejo de la capa de presentación.
     '''
     
-    def __init__(self, property_service: PropertyService):
+    def __init__(self, property_service: PropertyService, fragment_cache: PropertyFragmentCache = None):
         self.property_service = property_service
+        self.fragment_cache = fragment_cache or PropertyFragmentCache()
     
     def get_properties(self, query_params: Dict[str, List[str]]) -> Dict[str, Any]:
         '''Maneja GET /properties con parámetros de consulta.'''
         try:
             filters = self._parse_filters(query_params)
             properties = self.property_service.get_available_properties(filters)
+            return self._build_response(properties, filters)
             
+        except Exception as e:
+            return self._build_error_response(e)
+    
+    def get_properties_body(self, query_params: Dict[str, List[str]]) -> bytes:
+        '''
+        Igual que `get_properties` pero retorna el JSON ya codificado, armado con los
+        fragmentos precodificados de cada inmueble.
+        '''
+        try:
+            filters = self._parse_filters(query_params)
+            properties = self.property_service.get_available_properties(filters)
+            return self._build_response_body(properties, filters)
+            
+        except Exception as e:
+            return encode_json(self._build_error_response(e))
+    
+    def get_properties_conditional(self, query_params: Dict[str, List[str]], if_none_match: str = None
+                                   ) -> Tuple[Optional[str], Optional[bytes]]:
+        '''
+        Maneja GET /properties con GET condicional; retorna (etag, cuerpo).
+        El ETag se deriva de la versión del catálogo y del filtro. Si coincide con If-None-Match
+        el cuerpo es None (304 Not Modified) y no se ejecuta la consulta ni se serializa nada.
+        La versión solo se consulta cuando hay If-None-Match; sin él, o si no se pudo leer, un
+        resultado cacheado se entrega con el ETag de su propia versión.
+        '''
+        try:
+            filters = self._parse_filters(query_params)
+            version = self.property_service.get_catalog_version() if if_none_match else None
+            matched = self._match_etag(if_none_match, version, filters)
+            if matched is not None:
+                return matched, None
+            
+            properties, version = self.property_service.get_versioned_properties(filters, version)
+            return self._conditional_body(properties, filters, version, if_none_match)
+            
+        except Exception as e:
+            return None, encode_json(self._build_error_response(e))
+    
+    async def get_properties_conditional_async(self, query_params: Dict[str, List[str]], if_none_match: str = None
+                                               ) -> Tuple[Optional[str], Optional[bytes]]:
+        '''Variante de `get_properties_conditional` para AsyncPropertyService.'''
+        try:
+            filters = self._parse_filters(query_params)
+            version = await self.property_service.get_catalog_version() if if_none_match else None
+            matched = self._match_etag(if_none_match, version, filters)
+            if matched is not None:
+                return matched, None
+            
+            properties, version = await self.property_service.get_versioned_properties(filters, version)
+            return self._conditional_body(properties, filters, version, if_none_match)
+            
+        except Exception as e:
+            return None, encode_json(self._build_error_response(e))
+    
+    async def get_properties_async(self, query_params: Dict[str, List[str]]) -> Dict[str, Any]:
+        '''Maneja GET /properties cuando el servicio es asíncrono (AsyncPropertyService).'''
+        try:
+            filters = self._parse_filters(query_params)
+            properties = await self.property_service.get_available_properties(filters)
+            return self._build_response(properties, filters)
+            
+        except Exception as e:
+            return self._build_error_response(e)
+    
+    def stream_properties(self, query_params: Dict[str, List[str]], ndjson: bool = False
+                          ) -> Tuple[Optional[Dict[str, Any]], Iterator[bytes]]:
+        '''
+        Maneja GET /properties en streaming; retorna (error, bloques de bytes).
+        Los filtros se validan y se lee el primer bloque antes de retornar, así los errores
+        de validación o de conexión se reportan como una respuesta normal y no a mitad del cuerpo.
+        '''
+        try:
+            filters = self._parse_filters(query_params)
+            properties = self.property_service.stream_available_properties(filters)
+            position = {'count': 0, 'last': None}
+            
+            def items():
+                for prop in properties:
+                    position['count'] += 1
+                    position['last'] = prop
+                    yield self.fragment_cache.fragment(prop, filters.fields, store=False)
+            
+            def trailer():
+                if filters.limit is None:
+                    return {}
+                if position['count'] < filters.limit:
+                    return {'next_cursor': None}
+                return {'next_cursor': self._cursor_after(position['last'], filters)}
+            
+            chunks = encode_ndjson(items()) if ndjson else encode_json_envelope(items(), trailer=trailer)
+            first = next(chunks, b'')
+        
+        except Exception as e:
+            return self._build_error_response(e), iter(())
+        
+        def primed():
+            yield first
+            yield from chunks
+        
+        return None, primed()
+    
+    def get_properties_batch(self, body: bytes) -> Dict[str, Any]:
+        '''
+        Maneja POST /properties/batch con {"filters": [{"city": "bogota", "limit": 10}, ...]}.
+        Cada filtro tiene los mismos campos que los parámetros de GET /properties; la respuesta
+        trae en `results` el resultado (o el error) de cada uno, por su posición en la lista.
+        '''
+        try:
+            parsed = self._parse_batch(body)
+            filters_list = [item for item in parsed if isinstance(item, PropertyFilter)]
+            resolved = self.property_service.get_available_properties_batch(filters_list) if filters_list else []
+            return self._build_batch_response(parsed, resolved)
+            
+        except Exception as e:
+            return self._build_error_response(e)
+    
+    async def get_properties_batch_async(self, body: bytes) -> Dict[str, Any]:
+        '''Variante de `get_properties_batch` para AsyncPropertyService.'''
+        try:
+            parsed = self._parse_batch(body)
+            filters_list = [item for item in parsed if isinstance(item, PropertyFilter)]
+            resolved = await self.property_service.get_available_properties_batch(filters_list) if filters_list else []
+            return self._build_batch_response(parsed, resolved)
+            
+        except Exception as e:
+            return self._build_error_response(e)
+    
+    def get_facets(self, query_params: Dict[str, List[str]]) -> Dict[str, Any]:
+        '''Maneja GET /properties/facets: total y conteos por ciudad, estado y año con los filtros de /properties.'''
+        try:
+            filters = self._parse_filters(query_params)
+            return {'success': True, **self.property_service.get_facets(filters)}
+            
+        except Exception as e:
+            return self._build_error_response(e)
+    
+    def search_properties(self, query_params: Dict[str, List[str]]) -> Dict[str, Any]:
+        '''
+        Maneja GET /properties/search?q=apartamento+balcón con los filtros de /properties.
+        Cada inmueble lleva su `score` de relevancia; los resultados van del más al menos relevante.
+        '''
+        try:
+            query = query_params['q'][0] if query_params.get('q') else ''
+            filters = self._parse_filters(query_params)
+            results = self.property_service.search_properties(query, filters)
             return {
                 'success': True,
-                'data': [prop.serializer() for prop in properties],
-                'count': len(properties)
+                'data': [dict(prop.serializer(filters.fields), score=round(score, 4)) for prop, score in results],
+                'count': len(results)
             }
             
-        except ValueError as e:
+        except Exception as e:
+            return self._build_error_response(e)
+    
+    def stream_changes(self, query_params: Dict[str, List[str]], ndjson: bool = False
+                       ) -> Tuple[Optional[Dict[str, Any]], Optional[str], Iterator[bytes]]:
+        '''
+        Maneja GET /properties/changes?since=<token>; retorna (error, token siguiente, bloques de bytes).
+        Los inmuebles vigentes se entregan serializados y los que salieron del filtro como
+        {"id": ..., "removed": true}. Sin `since` se entrega la sincronización inicial completa.
+        '''
+        try:
+            filters = self._parse_filters(query_params)
+            since = None
+            if 'since' in query_params and query_params['since']:
+                since = self._decode_sync_token(query_params['since'][0].strip())
+            position, changes = self.property_service.stream_changes(filters, since)
+            token = self._encode_cursor({'date': position[0], 'history_id': position[1], 'updated_at': position[2]})
+            
+            def items():
+                for prop_id, prop in changes:
+                    if prop is None:
+                        yield encode_json({'id': prop_id, 'removed': True})
+                    else:
+                        yield self.fragment_cache.fragment(prop, filters.fields, store=False)
+            
+            if ndjson:
+                chunks = encode_ndjson(items())
+            else:
+                chunks = encode_json_envelope(items(), trailer=lambda: {'next_token': token})
+            first = next(chunks, b'')
+        
+        except Exception as e:
+            return self._build_error_response(e), None, iter(())
+        
+        def primed():
+            yield first
+            yield from chunks
+        
+        return None, token, primed()
+    
+    async def get_properties_body_async(self, query_params: Dict[str, List[str]]) -> bytes:
+        '''Variante de `get_properties_body` para AsyncPropertyService.'''
+        try:
+            filters = self._parse_filters(query_params)
+            properties = await self.property_service.get_available_properties(filters)
+            return self._build_response_body(properties, filters)
+            
+        except Exception as e:
+            return encode_json(self._build_error_response(e))
+    
+    def _build_response(self, properties: List[Property], filters: PropertyFilter) -> Dict[str, Any]:
+        '''Construye la respuesta exitosa con los inmuebles serializados.'''
+        response = {
+            'success': True,
+            'data': [prop.serializer(filters.fields) for prop in properties],
+            'count': len(properties)
+        }
+        if filters.limit is not None:
+            response['next_cursor'] = self._next_cursor(properties, filters)
+        return response
+    
+    def _build_response_body(self, properties: List[Property], filters: PropertyFilter) -> bytes:
+        '''Codifica la misma respuesta que `_build_response` concatenando fragmentos.'''
+        trailer = {'next_cursor': self._next_cursor(properties, filters)} if filters.limit is not None else None
+        return assemble_envelope(self.fragment_cache.fragments(properties, filters.fields), trailer)
+    
+    def _conditional_body(self, properties: List[Property], filters: PropertyFilter, version: Any,
+                          if_none_match: Optional[str]) -> Tuple[Optional[str], Optional[bytes]]:
+        '''
+        (etag, cuerpo) del resultado obtenido. Un resultado cacheado de una versión anterior lleva
+        el ETag de su propia versión, que puede ser justo el que ya tiene el cliente.
+        '''
+        matched = self._match_etag(if_none_match, version, filters)
+        if matched is not None:
+            return matched, None
+        etag = self._etag(version, filters) if version is not None else None
+        return etag, self._build_response_body(properties, filters)
+    
+    @staticmethod
+    def _etag(version: Any, filters: PropertyFilter) -> str:
+        '''ETag fuerte del resultado de `filters` con la versión `version` del catálogo.'''
+        raw = repr((version, filters.normalized())).encode('utf-8')
+        return f'"{hashlib.blake2b(raw, digest_size=16).hexdigest()}"'
+    
+    def _match_etag(self, if_none_match: Optional[str], version: Any, filters: PropertyFilter) -> Optional[str]:
+        '''
+        Retorna el ETag de If-None-Match que corresponde al resultado actual o None si ninguno.
+        La comparación es débil (ignora W/) y no distingue la codificación de la representación.
+        '''
+        if not if_none_match or version is None:
+            return None
+        etag = self._etag(version, filters)
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag == '*':
+                return etag
+            if strip_encoding(tag[2:] if tag.startswith('W/') else tag) == etag:
+                return tag
+        return None
+    
+    def _build_batch_response(self, parsed: List[Any], resolved: List[Any]) -> Dict[str, Any]:
+        '''Combina los errores de parseo y los resultados del servicio en la respuesta del lote, por índice.'''
+        resolved = iter(resolved)
+        results = {}
+        for index, item in enumerate(parsed):
+            result = next(resolved) if isinstance(item, PropertyFilter) else item
+            if isinstance(result, Exception):
+                results[str(index)] = self._build_error_response(result)
+            else:
+                results[str(index)] = self._build_response(result, item)
+        return {'success': True, 'results': results}
+    
+    def _next_cursor(self, properties: List[Property], filters: PropertyFilter) -> Optional[str]:
+        '''Cursor de la siguiente página; None cuando la página no se llenó.'''
+        if len(properties) < filters.limit:
+            return None
+        return self._cursor_after(properties[-1], filters)
+    
+    def _cursor_after(self, prop: Property, filters: PropertyFilter) -> str:
+        '''
+        Cursor que apunta después del inmueble. En el orden por defecto es solo su id; con `sort`
+        lleva además el orden y el valor del campo de orden, para retomar por (valor, id).
+        '''
+        position = {'id': prop.id}
+        if not filters.is_id_order():
+            position['sort'] = filters.sort or 'id'
+            position['desc'] = filters.descending
+            if filters.sort != 'id':
+                position['value'] = getattr(prop, filters.sort)
+        return self._encode_cursor(position)
+    
+    @staticmethod
+    def _encode_cursor(position: Dict[str, Any]) -> str:
+        '''Codifica la posición de paginación como un token opaco.'''
+        raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+    
+    @classmethod
+    def _decode_cursor(cls, cursor: str) -> Dict[str, Any]:
+        '''Decodifica un cursor generado por `_encode_cursor`.'''
+        try:
+            position = cls._decode_opaque(cursor)
+        except ValueError:
+            raise ValueError('Cursor inválido')
+        if not isinstance(position.get('id'), int):
+            raise ValueError('Cursor inválido')
+        if not (position.get('value') is None or isinstance(position['value'], int)):
+            raise ValueError('Cursor inválido')
+        return position
+    
+    @staticmethod
+    def _decode_opaque(token: str) -> Dict[str, Any]:
+        '''Decodifica un token de `_encode_cursor` a su diccionario; ValueError si está mal formado.'''
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        except (binascii.Error, UnicodeError, ValueError):
+            raise ValueError('Token mal formado')
+        if not isinstance(position, dict):
+            raise ValueError('Token mal formado')
+        return position
+    
+    @classmethod
+    def _decode_sync_token(cls, token: str) -> Tuple[Optional[str], int, Optional[str]]:
+        '''
+        Decodifica el token de /properties/changes a la posición (fecha, último id de historial,
+        última modificación de property). Los tokens emitidos antes de `updated_at` no la traen.
+        '''
+        try:
+            position = cls._decode_opaque(token)
+            date, history_id, updated_at = position['date'], position['history_id'], position.get('updated_at')
+            for value in (date, updated_at):
+                if value is not None:
+                    datetime.fromisoformat(value)
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise ValueError('Token de sincronización inválido')
+        if not isinstance(history_id, int):
+            raise ValueError('Token de sincronización inválido')
+        return date, history_id, updated_at
+    
+    def _build_error_response(self, error: Exception) -> Dict[str, Any]:
+        '''Traduce una excepción a la respuesta de error correspondiente.'''
+        if isinstance(error, ValueError):
             return {
                 'success': False,
-                'error': str(e),
+                'error': str(error),
                 'code': 'VALIDATION_ERROR'
             }
-        except Exception as e:
-            logging.error(f'Error en controlador: {e}')
+        
+        if isinstance(error, CatalogNotLoadedError):
+            # Temporal: la carga inicial sigue en curso o MySQL aún no responde
             return {
                 'success': False,
-                'error': 'Error interno del servidor',
-                'code': 'INTERNAL_ERROR'
+                'error': str(error),
+                'code': 'CATALOG_NOT_LOADED'
             }
+        
+        logging.error(f'Error en controlador: {error}')
+        return {
+            'success': False,
+            'error': 'Error interno del servidor',
+            'code': 'INTERNAL_ERROR'
+        }
+    
+    @staticmethod
+    def status_code(response: Dict[str, Any]) -> int:
+        '''Código HTTP de una respuesta: 503 mientras el catálogo en memoria no está cargado, si no 200.'''
+        return 503 if response.get('code') == 'CATALOG_NOT_LOADED' else 200
+    
+    def parse_query_string(self, query: str) -> PropertyFilter:
+        '''Parsea un query string (ej: 'city=bogota&state=en_venta') a filtros.'''
+        return self._parse_filters(parse_qs(query))
     
     def _parse_filters(self, query_params: Dict[str, List[str]]) -> PropertyFilter:
         '''Parsea los parámetros de consulta a filtros.'''
@@ -53,17 +409,135 @@ class PropertyController:
             except ValueError:
                 raise ValueError('El año debe ser un número entero')
         
-        city = None
-        if 'city' in query_params and query_params['city']:
-            city = query_params['city'][0].strip()
+        # Varios valores (?city=bogota,cali o ?city=bogota&city=cali) se filtran con IN
+        city = cities = None
+        city_values = self._parse_values(query_params, 'city')
+        if len(city_values) == 1:
+            city = city_values[0]
+        elif city_values:
+            cities = tuple(city_values)
         
-        state = None
-        if 'state' in query_params and query_params['state']:
-            state_value = query_params['state'][0].strip()
+        state = states = None
+        state_values = []
+        for state_value in self._parse_values(query_params, 'state'):
             try:
-                state = PropertyState(state_value)
+                state_values.append(PropertyState(state_value))
             except ValueError:
                 valid_states = [s.value for s in PropertyState]
                 raise ValueError(f'Estado inválido. Estados válidos: {valid_states}')
+        if len(state_values) == 1:
+            state = state_values[0]
+        elif state_values:
+            states = tuple(state_values)
+        
+        min_price, max_price = self._parse_int(query_params, 'min_price'), self._parse_int(query_params, 'max_price')
+        min_year, max_year = self._parse_int(query_params, 'min_year'), self._parse_int(query_params, 'max_year')
+        
+        limit = None
+        if 'limit' in query_params and query_params['limit']:
+            try:
+                limit = int(query_params['limit'][0])
+            except ValueError:
+                raise ValueError('El límite debe ser un número entero')
+        
+        sort, descending = None, False
+        if 'sort' in query_params and query_params['sort']:
+            sort, descending = self._parse_sort(query_params['sort'][0])
+        
+        after_id = after_value = None
+        if 'cursor' in query_params and query_params['cursor']:
+            position = self._decode_cursor(query_params['cursor'][0].strip())
+            # Un cursor solo sirve para el mismo orden con el que se generó
+            if (position.get('sort'), position.get('desc', False)) != ((sort, descending) if sort else (None, False)):
+                raise ValueError('El cursor no corresponde al orden solicitado')
+            after_id, after_value = position['id'], position.get('value')
         
-        return PropertyFilter(year=year, city=city, state=state)
\ No newline at end of file
+        fields = None
+        if 'fields' in query_params and query_params['fields']:
+            fields = self._parse_fields(query_params['fields'][0])
+        
+        return PropertyFilter(year=year, city=city, state=state, limit=limit, after_id=after_id, fields=fields,
+                              cities=cities, states=states, min_price=min_price, max_price=max_price,
+                              min_year=min_year, max_year=max_year,
+                              sort=sort, descending=descending, after_value=after_value)
+    
+    @staticmethod
+    def _parse_sort(value: str) -> Tuple[Optional[str], bool]:
+        '''?sort=price (ascendente) o ?sort=-price (descendente); el orden por id ascendente es el por defecto (None).'''
+        value = value.strip()
+        descending = value.startswith('-')
+        name = value[1:] if descending else value
+        if name not in SORT_FIELDS:
+            valid_sorts = [prefix + field for field in SORT_FIELDS for prefix in ('', '-')]
+            raise ValueError(f'Orden inválido. Órdenes válidos: {valid_sorts}')
+        if name == 'id' and not descending:
+            return None, False
+        return name, descending
+    
+    @staticmethod
+    def _parse_values(query_params: Dict[str, List[str]], name: str) -> List[str]:
+        '''Valores de un parámetro repetido o separado por comas, sin espacios alrededor.'''
+        return [value.strip() for raw in query_params.get(name, []) for value in raw.split(',')]
+    
+    @staticmethod
+    def _parse_int(query_params: Dict[str, List[str]], name: str) -> Optional[int]:
+        '''Parámetro entero opcional (límites de los rangos).'''
+        if not query_params.get(name):
+            return None
+        try:
+            return int(query_params[name][0])
+        except ValueError:
+            raise ValueError(f'El parámetro {name} debe ser un número entero')
+    
+    # Campos admitidos en cada filtro de POST /properties/batch
+    BATCH_FILTER_KEYS = ('year', 'city', 'state', 'limit', 'cursor', 'fields',
+                         'min_price', 'max_price', 'min_year', 'max_year', 'sort')
+    
+    def _parse_batch(self, body: bytes) -> List[Any]:
+        '''Parsea el cuerpo del lote; cada posición queda con su PropertyFilter o el ValueError que la invalida.'''
+        try:
+            payload = json.loads(body or b'null')
+        except (UnicodeDecodeError, ValueError):
+            raise ValueError('El cuerpo debe ser un JSON válido')
+        items = payload.get('filters') if isinstance(payload, dict) else None
+        if not isinstance(items, list):
+            raise ValueError('El cuerpo debe tener una lista "filters"')
+        
+        parsed = []
+        for item in items:
+            try:
+                parsed.append(self._parse_filters(self._batch_item_params(item)))
+            except ValueError as e:
+                parsed.append(e)
+        return parsed
+    
+    def _batch_item_params(self, item: Any) -> Dict[str, List[str]]:
+        '''Convierte un filtro del lote al formato de parámetros de consulta que espera `_parse_filters`.'''
+        if not isinstance(item, dict):
+            raise ValueError('Cada filtro del lote debe ser un objeto')
+        unknown = sorted(set(item).difference(self.BATCH_FILTER_KEYS))
+        if unknown:
+            raise ValueError(f'Campos de filtro desconocidos: {unknown}')
+        
+        query_params = {}
+        for key, value in item.items():
+            if value is None:
+                continue
+            if isinstance(value, list):
+                value = ','.join(str(element) for element in value)
+            query_params[key] = [str(value)]
+        return query_params
+    
+    @staticmethod
+    def _parse_fields(value: str) -> Optional[Tuple[str, ...]]:
+        '''
+        Parsea `fields` (ej: 'id,price,city') a la tupla de campos en el orden de la respuesta,
+        así el mismo conjunto de campos comparte llave de cache y sentencia SQL.
+        '''
+        requested = {name.strip() for name in value.split(',') if name.strip()}
+        if not requested:
+            return None
+        invalid = sorted(requested.difference(SERIALIZED_FIELDS))
+        if invalid:
+            raise ValueError(f'Campos inválidos: {invalid}. Campos válidos: {list(SERIALIZED_FIELDS)}')
+        return tuple(name for name in SERIALIZED_FIELDS if name in requested)
\ No newline at end of file
@@ -0,0 +1,111 @@
+'''
+Fragmentos JSON precodificados por inmueble y armado de la respuesta a nivel de bytes.
+'''
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json
+import threading
+
+from domain import Property
+
+ENVELOPE_PREFIX = b'{"success": true, "data": ['
+FRAGMENT_SEPARATOR = b', '
+
+
+def encode_json(data: Any) -> bytes:
+    '''Codifica igual que la respuesta JSON del servidor (UTF-8, sin escapar acentos).'''
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+def envelope_suffix(count: int, trailer: Dict[str, Any] = None) -> bytes:
+    '''Cierre del sobre: `count` y los campos adicionales (ej: next_cursor) en el orden de la respuesta.'''
+    suffix = [b'], "count": ', str(count).encode('ascii')]
+    for key, value in (trailer or {}).items():
+        suffix += [FRAGMENT_SEPARATOR, encode_json(key), b': ', encode_json(value)]
+    suffix.append(b'}')
+    return b''.join(suffix)
+
+
+def assemble_envelope(fragments: List[bytes], trailer: Dict[str, Any] = None) -> bytes:
+    '''
+    Arma {'success', 'data', 'count', ...} concatenando fragmentos ya codificados en un solo buffer.
+    El resultado es idéntico byte a byte a `encode_json` sobre el diccionario equivalente.
+    '''
+    return b''.join((ENVELOPE_PREFIX, FRAGMENT_SEPARATOR.join(fragments), envelope_suffix(len(fragments), trailer)))
+
+
+class PropertyFragmentCache:
+    '''
+    Cache del JSON codificado de cada inmueble, por id y proyección (`fields`).
+    Una entrada solo se reutiliza si el inmueble es igual al que se codificó (mismo estado,
+    precio, etc.); si cambió se vuelve a codificar. Acotado por número de entradas (LRU).
+    '''
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple[int, Optional[Tuple[str, ...]]], tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0, 'uncached': 0}
+
+    def fragment(self, prop: Property, fields: Optional[Tuple[str, ...]] = None, store: bool = True) -> bytes:
+        return self.fragments((prop,), fields, store)[0]
+
+    def fragments(self, properties: Iterable[Property], fields: Optional[Tuple[str, ...]] = None,
+                  store: bool = True) -> List[bytes]:
+        '''
+        Retorna el fragmento de cada inmueble, codificando solo los nuevos o modificados.
+        La codificación se hace fuera del lock para no serializar a los hilos que arman respuestas.
+        Con `store=False` (exportaciones en streaming) se aprovechan los fragmentos ya cacheados pero
+        los que faltan no se guardan: un recorrido completo no desaloja los de las páginas frecuentes
+        y su memoria no crece con el catálogo.
+        '''
+        properties = list(properties)
+        result: List[bytes] = [None] * len(properties)
+        pending = []
+        with self._lock:
+            entries = self._entries
+            for position, prop in enumerate(properties):
+                entry = entries.get((prop.id, fields))
+                if entry is not None and (entry[0] is prop or entry[0] == prop):
+                    entries.move_to_end((prop.id, fields))
+                    result[position] = entry[1]
+                else:
+                    pending.append(position)
+            self._stats['hits'] += len(properties) - len(pending)
+
+        if not pending:
+            return result
+
+        for position in pending:
+            result[position] = encode_json(properties[position].serializer(fields))
+
+        if not store:
+            with self._lock:
+                self._stats['uncached'] += len(pending)
+            return result
+
+        with self._lock:
+            entries = self._entries
+            for position in pending:
+                key = (properties[position].id, fields)
+                self._stats['invalidations' if key in entries else 'misses'] += 1
+                entries[key] = (properties[position], result[position])
+                entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        return result
+
+    def invalidate(self, property_id: int = None) -> None:
+        '''Elimina los fragmentos de un inmueble (todas sus proyecciones) o, sin argumentos, todos.'''
+        with self._lock:
+            if property_id is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == property_id]:
+                    del self._entries[key]
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), max_entries=self.max_entries)
@@ -2,42 +2,229 @@
 Handlers HTTP y servidor del microservicio.
 '''
 
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import parse_qs, urlparse
 from http.server import HTTPServer, BaseHTTPRequestHandler
-from typing import Dict, Any
-import json
+from typing import Dict, Any, Iterator, List
+import logging
+import os
+import signal
+import socket
+import threading
+import time
 
 from .controllers import PropertyController
-from application import PropertyService
-from infrastructure import DatabaseConnect, MySQLPropertyRepository
-from config import ServerConfig
+from .servers import BoundedThreadPoolHTTPServer
+from .fragments import encode_json
+from .compression import ResponseCompressor, tag_with_encoding
+from .streaming import NDJSON_CONTENT_TYPE
+from domain import PropertyFilter
+from application import PropertyService, ResultCache
+from infrastructure import (
+    DatabaseConnect, MySQLPropertyRepository, PropertyRepositoryInterface, CoalescingPropertyRepository,
+    LatestStatusProjection, ProjectionPropertyRepository, MySQLCatalogSource, CatalogSync, SnapshotPropertyRepository,
+    MappedCatalog, MappedPropertyRepository, MySQLChangeFeed, CatalogSchemaMigration, CatalogFacets, CatalogSearch,
+    write_catalog_file
+)
+from config import ServerConfig, DatabaseConfig, CacheConfig, RepositoryConfig, CompressionConfig, FacetConfig, SearchConfig
 
 
 class PropertyHTTPHandler(BaseHTTPRequestHandler):
     '''Handler HTTP que delega al controlador apropiado.'''
     
+    # HTTP/1.1 habilita conexiones persistentes (keep-alive)
+    protocol_version = 'HTTP/1.1'
+    # Tiempo máximo de inactividad de una conexión persistente
+    timeout = ServerConfig.KEEP_ALIVE_TIMEOUT
+    # Evita el retraso de Nagle entre los headers y el cuerpo de la respuesta
+    disable_nagle_algorithm = True
+    
+    def setup(self):
+        super().setup()
+        self.requests_handled = 0
+        self.keep_alive_slot = False
+    
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            if self.keep_alive_slot:
+                self.server.release_keep_alive()
+                self.keep_alive_slot = False
+    
     def do_GET(self):
         '''Maneja requests GET.'''
         parsed_url = urlparse(self.path)
         
-        if parsed_url.path == '/properties':
+        controller = self.server.property_controller
+        if parsed_url.path == '/properties/facets':
+            response = controller.get_facets(parse_qs(parsed_url.query))
+            self._send_json_response(response, controller.status_code(response))
+        
+        elif parsed_url.path == '/properties/search':
+            response = controller.search_properties(parse_qs(parsed_url.query))
+            self._send_json_response(response, controller.status_code(response))
+        
+        elif parsed_url.path == '/properties/changes':
+            self._stream_changes(parse_qs(parsed_url.query), NDJSON_CONTENT_TYPE in self.headers.get('Accept', ''))
+        
+        elif parsed_url.path == '/properties':
             query_params = parse_qs(parsed_url.query)
-            response = self.server.property_controller.get_properties(query_params)
-            self._send_json_response(response)
+            ndjson = NDJSON_CONTENT_TYPE in self.headers.get('Accept', '')
+            if ndjson or query_params.get('stream', [''])[0].lower() == 'true':
+                self._stream_properties(query_params, ndjson)
+            else:
+                etag, body = self.server.property_controller.get_properties_conditional(
+                    query_params, self.headers.get('If-None-Match')
+                )
+                if body is None:
+                    self._send_not_modified(etag)
+                else:
+                    self._send_json_body(body, negotiate=True, etag=etag)
         
         elif parsed_url.path == '/health':
             self._send_json_response({'status': 'healthy'})
         
+        elif parsed_url.path == '/metrics':
+            self._send_json_response(self.server.get_metrics())
+        
+        elif parsed_url.path == '/admin/cache':
+            self._send_json_response(describe_cache(self.server.property_controller.property_service))
+        
+        else:
+            self._send_error_response(404, 'Endpoint no encontrado')
+    
+    def do_POST(self):
+        '''Maneja requests POST.'''
+        parsed_url = urlparse(self.path)
+        
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            content_length = -1
+        if content_length < 0 or content_length > ServerConfig.MAX_BODY_SIZE:
+            # El cuerpo no se lee: la conexión se cierra para no desalinear el siguiente request
+            self.close_connection = True
+            self._send_error_response(413 if content_length > 0 else 400, 'Cuerpo del request inválido o demasiado grande')
+            return
+        body = self.rfile.read(content_length) if content_length else b''
+        
+        if parsed_url.path == '/properties/batch':
+            self._send_json_response(self.server.property_controller.get_properties_batch(body))
+        
         else:
             self._send_error_response(404, 'Endpoint no encontrado')
     
     def _send_json_response(self, data: Dict[str, Any], status_code: int = 200):
         '''Envía respuesta JSON.'''
+        self._send_json_body(encode_json(data), status_code)
+    
+    def _send_json_body(self, body: bytes, status_code: int = 200, negotiate: bool = False, etag: str = None):
+        '''
+        Envía un cuerpo JSON ya codificado; con `negotiate` se comprime según Accept-Encoding.
+        Con `etag` la respuesta se puede revalidar con If-None-Match y cachear según Cache-Control.
+        '''
+        encoding = None
+        compressor = getattr(self.server, 'response_compressor', None) if negotiate else None
+        if compressor is not None:
+            body, encoding = compressor.compress(body, self.headers.get('Accept-Encoding', ''))
+        
         self.send_response(status_code)
         self.send_header('Content-Type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
+        if compressor is not None:
+            self.send_header('Vary', 'Accept-Encoding')
+        if encoding is not None:
+            self.send_header('Content-Encoding', encoding)
+        if etag is not None:
+            self._send_validator_headers(tag_with_encoding(etag, encoding))
+        self.send_header('Content-Length', str(len(body)))
+        self._send_connection_headers()
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _send_not_modified(self, etag: str):
+        '''Responde 304 Not Modified: el cliente ya tiene la versión vigente del resultado.'''
+        self.send_response(304)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if getattr(self.server, 'response_compressor', None) is not None:
+            self.send_header('Vary', 'Accept-Encoding')
+        self._send_validator_headers(etag)
+        self._send_connection_headers()
+        self.end_headers()
+    
+    def _send_validator_headers(self, etag: str):
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', f'public, max-age={CacheConfig.HTTP_MAX_AGE}')
+    
+    def _stream_properties(self, query_params: Dict[str, List[str]], ndjson: bool):
+        '''Envía /properties a medida que se leen las filas.'''
+        error, chunks = self.server.property_controller.stream_properties(query_params, ndjson)
+        if error is not None:
+            self._send_json_response(error)
+            return
+        self._send_chunks(chunks, ndjson)
+    
+    def _stream_changes(self, query_params: Dict[str, List[str]], ndjson: bool):
+        '''Envía /properties/changes en streaming; el token de la siguiente consulta va también en un header.'''
+        error, token, chunks = self.server.property_controller.stream_changes(query_params, ndjson)
+        if error is not None:
+            self._send_json_response(error)
+            return
+        self._send_chunks(chunks, ndjson, {'X-Sync-Token': token})
+    
+    def _send_chunks(self, chunks: Iterator[bytes], ndjson: bool, headers: Dict[str, str] = None):
+        '''
+        Envía los bloques con Transfer-Encoding: chunked.
+        Para clientes HTTP/1.0 el cuerpo va sin chunks y el fin de la respuesta lo marca el cierre de la conexión.
+        '''
+        chunked = self.request_version == 'HTTP/1.1'
+        self.send_response(200)
+        self.send_header('Content-Type', NDJSON_CONTENT_TYPE if ndjson else 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.close_connection = True
+        self._send_connection_headers()
         self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                if chunked:
+                    self.wfile.write(b'%X\r\n%s\r\n' % (len(chunk), chunk))
+                else:
+                    self.wfile.write(chunk)
+            if chunked:
+                self.wfile.write(b'0\r\n\r\n')
+        except Exception as e:
+            # Los headers ya se enviaron: se corta la respuesta para que el cliente no la tome por completa
+            logging.error(f'Error durante el streaming de {self.path}: {e}')
+            self.close_connection = True
+        finally:
+            chunks.close()
+    
+    def _send_connection_headers(self):
+        '''Indica si la conexión se mantiene abierta, respetando el máximo de requests por conexión.'''
+        self.requests_handled += 1
+        if self.requests_handled >= ServerConfig.KEEP_ALIVE_MAX_REQUESTS:
+            self.close_connection = True
+        
+        # En el pool de workers la conexión queda abierta solo si hay lugar (ver BoundedThreadPoolHTTPServer)
+        acquire_keep_alive = getattr(self.server, 'acquire_keep_alive', None)
+        if not self.close_connection and not self.keep_alive_slot and acquire_keep_alive is not None:
+            self.keep_alive_slot = acquire_keep_alive()
+            self.close_connection = not self.keep_alive_slot
+        
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        else:
+            remaining = ServerConfig.KEEP_ALIVE_MAX_REQUESTS - self.requests_handled
+            self.send_header('Keep-Alive', f'timeout={int(self.timeout)}, max={remaining}')
     
     def _send_error_response(self, status_code: int, message: str):
         '''Envía respuesta de error.'''
@@ -51,6 +238,160 @@ class PropertyHTTPHandler(BaseHTTPRequestHandler):
         pass
 
 
+def migrate_catalog_schema(db_connection: DatabaseConnect) -> None:
+    '''
+    Aplica la migración de columnas e índices del catálogo si DB_AUTO_MIGRATE está activo; si no,
+    solo verifica que el esquema ya esté migrado (RuntimeError con el paso a ejecutar).
+    '''
+    migration = CatalogSchemaMigration(db_connection)
+    if DatabaseConfig.AUTO_MIGRATE:
+        migration.migrate()
+    else:
+        migration.verify()
+
+
+def create_latest_status_projection(db_connection: DatabaseConnect) -> LatestStatusProjection:
+    '''Crea (y construye si hace falta) la proyección de último estado; None si el backend no la usa.'''
+    if RepositoryConfig.BACKEND != 'projection':
+        return None
+    projection = LatestStatusProjection(db_connection, RepositoryConfig.PROJECTION_REFRESH_INTERVAL,
+                                        RepositoryConfig.PROJECTION_RESCAN_WINDOW)
+    projection.ensure_built()
+    return projection
+
+
+def create_catalog_sync(db_connection: DatabaseConnect) -> CatalogSync:
+    '''
+    Crea la sincronización compartida de las estructuras en memoria (catálogo en memoria, conteos y
+    búsqueda); None si ninguna está en uso. Se inicia con `start` después de suscribirlas.
+    '''
+    if RepositoryConfig.BACKEND != 'snapshot' and not FacetConfig.ENABLED and not SearchConfig.ENABLED:
+        return None
+    return CatalogSync(
+        MySQLCatalogSource(db_connection),
+        refresh_interval=RepositoryConfig.SNAPSHOT_REFRESH_INTERVAL,
+        full_reload_interval=RepositoryConfig.SNAPSHOT_FULL_RELOAD_INTERVAL
+    )
+
+
+def create_property_repository(db_connection: DatabaseConnect, projection: LatestStatusProjection = None,
+                               catalog_sync: CatalogSync = None) -> PropertyRepositoryInterface:
+    '''
+    Crea el repositorio de inmuebles según REPOSITORY_BACKEND.
+    Sobre MySQL las consultas idénticas concurrentes se agrupan en una sola; el catálogo en
+    memoria no lo necesita.
+    '''
+    if RepositoryConfig.BACKEND == 'mmap':
+        ensure_catalog_file(db_connection)
+        return MappedPropertyRepository(RepositoryConfig.SNAPSHOT_PATH, RepositoryConfig.SNAPSHOT_CHECK_INTERVAL)
+    if RepositoryConfig.BACKEND == 'snapshot':
+        return SnapshotPropertyRepository(catalog_sync)
+    if projection is not None:
+        return CoalescingPropertyRepository(ProjectionPropertyRepository(
+            db_connection, projection, prepared_statements=DatabaseConfig.PREPARED_STATEMENTS,
+            max_statements=DatabaseConfig.MAX_PREPARED_STATEMENTS
+        ))
+    return CoalescingPropertyRepository(MySQLPropertyRepository(
+        db_connection, prepared_statements=DatabaseConfig.PREPARED_STATEMENTS,
+        max_statements=DatabaseConfig.MAX_PREPARED_STATEMENTS
+    ))
+
+
+def create_catalog_facets(catalog_sync: CatalogSync) -> CatalogFacets:
+    '''Crea los conteos por dimensión según la configuración (None si están deshabilitados).'''
+    if not FacetConfig.ENABLED:
+        return None
+    return CatalogFacets(catalog_sync)
+
+
+def create_catalog_search(catalog_sync: CatalogSync) -> CatalogSearch:
+    '''Crea el índice de búsqueda por palabras según la configuración (None si está deshabilitado).'''
+    if not SearchConfig.ENABLED:
+        return None
+    return CatalogSearch(catalog_sync)
+
+
+def create_result_cache() -> ResultCache:
+    '''Crea el cache de resultados según la configuración (None si está deshabilitado).'''
+    if not CacheConfig.ENABLED:
+        return None
+    return ResultCache(
+        ttl=CacheConfig.TTL,
+        max_entries=CacheConfig.MAX_ENTRIES,
+        max_bytes=CacheConfig.MAX_BYTES,
+        stale_ttl=CacheConfig.STALE_TTL,
+        sizeof=PropertyService.estimate_size
+    )
+
+
+def parse_hot_filters(controller: PropertyController) -> List[PropertyFilter]:
+    '''Convierte CACHE_HOT_FILTERS en la lista de filtros a precargar, descartando los inválidos.'''
+    hot_filters = []
+    for query in CacheConfig.HOT_FILTERS.split(';'):
+        if not query.strip():
+            continue
+        try:
+            hot_filters.append(controller.parse_query_string(query.strip()))
+        except ValueError as e:
+            logging.warning(f'Filtro caliente inválido "{query}": {e}')
+    return hot_filters
+
+
+def ensure_catalog_file(db_connection: DatabaseConnect) -> None:
+    '''
+    Escribe el archivo de catálogo desde MySQL si todavía no existe o no se puede leer (p. ej. formato
+    anterior). El servicio no lo vuelve a escribir: lo mantiene al día `python main.py snapshot watch`,
+    así que al iniciar se advierte su antigüedad.
+    '''
+    path = RepositoryConfig.SNAPSHOT_PATH
+    if os.path.exists(path):
+        try:
+            catalog = MappedCatalog(path)
+        except ValueError as e:
+            logging.warning(f'Se reescribe el archivo de catálogo: {e}')
+        else:
+            age = time.time() - os.path.getmtime(path)
+            log = logging.warning if age > RepositoryConfig.SNAPSHOT_FULL_RELOAD_INTERVAL else logging.info
+            log(f'Se sirve el archivo de catálogo {path} (generación {catalog.generation}, escrito hace '
+                f'{age:.0f} s); se actualiza solo mientras corre `python main.py snapshot watch`')
+            return
+    properties = MySQLCatalogSource(db_connection).load_all()
+    write_catalog_file(path, properties, generation=1)
+    logging.warning(f'Catálogo escrito en {path}: {len(properties)} inmuebles; no se actualizará '
+                    f'hasta que corra `python main.py snapshot watch`')
+
+
+def repository_metrics(repository: PropertyRepositoryInterface) -> Dict[str, Any]:
+    '''Métricas propias del repositorio configurado.'''
+    if isinstance(repository, SnapshotPropertyRepository):
+        return {'catalog_snapshot': repository.get_stats()}
+    if isinstance(repository, MappedPropertyRepository):
+        return {'catalog_file': repository.get_stats()}
+    return {
+        'query_coalescing': repository.get_stats(),
+        'sql_statements': repository.repository.get_statement_stats()
+    }
+
+
+def create_response_compressor() -> ResponseCompressor:
+    '''Crea el compresor de respuestas según la configuración (None si está deshabilitado).'''
+    if not CompressionConfig.ENABLED:
+        return None
+    return ResponseCompressor(
+        min_size=CompressionConfig.MIN_SIZE,
+        level=CompressionConfig.LEVEL,
+        cache_max_bytes=CompressionConfig.CACHE_MAX_BYTES
+    )
+
+
+def describe_cache(property_service: PropertyService) -> Dict[str, Any]:
+    '''Respuesta de GET /admin/cache: llaves cacheadas con su edad y tiempos de recarga.'''
+    description = property_service.describe_cache()
+    if description is None:
+        return {'success': True, 'enabled': False}
+    return {'success': True, 'enabled': True, **description}
+
+
 class PropertyMicroservice:
     '''
     Clase principal del microservicio.
@@ -64,20 +405,43 @@ class PropertyMicroservice:
         
         # Dependency Injection - Ensamblado de dependencias
         self.db_connection = DatabaseConnect()
-        self.property_repository = MySQLPropertyRepository(self.db_connection)
-        self.property_service = PropertyService(self.property_repository)
+        migrate_catalog_schema(self.db_connection)
+        self.projection = create_latest_status_projection(self.db_connection)
+        self.catalog_sync = create_catalog_sync(self.db_connection)
+        self.property_repository = create_property_repository(self.db_connection, self.projection, self.catalog_sync)
+        self.result_cache = create_result_cache()
+        self.facets = create_catalog_facets(self.catalog_sync)
+        self.search = create_catalog_search(self.catalog_sync)
+        if self.catalog_sync is not None:
+            self.catalog_sync.start()
+        self.property_service = PropertyService(
+            self.property_repository,
+            self.result_cache,
+            ThreadPoolExecutor(max_workers=CacheConfig.REFRESH_WORKERS, thread_name_prefix='cache-refresh'),
+            change_feed=MySQLChangeFeed(self.db_connection),
+            facets=self.facets,
+            search=self.search,
+            version_ttl=CacheConfig.VERSION_TTL
+        )
         self.property_controller = PropertyController(self.property_service)
+        self.response_compressor = create_response_compressor()
+        self.property_service.warm_up(parse_hot_filters(self.property_controller))
     
     def start(self):
         '''Inicia el servidor HTTP.'''
-        self.server = HTTPServer((self.host, self.port), PropertyHTTPHandler)
-        self.server.property_controller = self.property_controller
+        self.server = self._create_server()
         
         print(f'🚀 Microservicio iniciado en http://{self.host}:{self.port}')
         print('📋 Endpoints disponibles:')
-        print(f'  GET /properties - Consultar inmuebles')
-        print(f'  GET /health - Estado del servicio')
-        print('📖 Filtros disponibles: ?year=2020&city=bogota&state=en_venta')
+        print(f'  GET /properties - Consultar inmuebles (?stream=true o Accept: {NDJSON_CONTENT_TYPE} para streaming)')
+        print('  POST /properties/batch - Varios filtros de /properties en un solo request')
+        print('  GET /properties/changes?since=<token> - Cambios desde la última sincronización (streaming)')
+        print('  GET /properties/facets - Conteos por ciudad, estado y año con los mismos filtros')
+        print('  GET /properties/search?q=<palabras> - Búsqueda por dirección y descripción, por relevancia')
+        print('  GET /health - Estado del servicio')
+        print('  GET /metrics - Métricas internas del servicio')
+        print('  GET /admin/cache - Llaves del cache de resultados')
+        print('📖 Filtros disponibles: ?year=2020&city=bogota,cali&state=en_venta&min_price=&max_price=&min_year=&max_year=&sort=-price&limit=20&cursor=<next_cursor>')
         
         try:
             self.server.serve_forever()
@@ -85,8 +449,81 @@ class PropertyMicroservice:
             print('\n🛑 Deteniendo servidor...')
             self.stop()
     
+    def serve_worker(self, listen_socket: socket.socket = None):
+        '''
+        Atiende requests como proceso worker del modo prefork.
+        Usa el socket heredado del supervisor o abre uno propio con SO_REUSEPORT.
+        Al recibir SIGTERM deja de aceptar conexiones y termina las que están en curso.
+        '''
+        self.server = self._create_server(listen_socket, reuse_port=listen_socket is None)
+        
+        # shutdown() bloquea hasta que serve_forever termina, por eso se ejecuta en otro hilo
+        signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(
+            target=self.server.shutdown, daemon=True).start())
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        
+        try:
+            self.server.serve_forever()
+        finally:
+            self.stop()
+    
+    def _create_server(self, listen_socket: socket.socket = None, reuse_port: bool = False) -> HTTPServer:
+        '''Crea el servidor HTTP según el modo configurado.'''
+        if ServerConfig.MODE == 'single':
+            server = HTTPServer((self.host, self.port), PropertyHTTPHandler)
+        else:
+            if ServerConfig.WORKERS > DatabaseConfig.POOL_MAX_SIZE:
+                logging.warning(
+                    f'Hay {ServerConfig.WORKERS} workers HTTP y solo {DatabaseConfig.POOL_MAX_SIZE} '
+                    f'conexiones en el pool: las consultas concurrentes esperarán por conexión'
+                )
+            
+            server = BoundedThreadPoolHTTPServer(
+                (self.host, self.port),
+                PropertyHTTPHandler,
+                workers=ServerConfig.WORKERS,
+                queue_size=ServerConfig.ACCEPT_QUEUE_SIZE,
+                backlog=ServerConfig.LISTEN_BACKLOG,
+                reuse_port=reuse_port,
+                listen_socket=listen_socket,
+                keep_alive_connections=ServerConfig.KEEP_ALIVE_CONNECTIONS,
+                graceful_timeout=ServerConfig.GRACEFUL_TIMEOUT
+            )
+        
+        server.property_controller = self.property_controller
+        server.response_compressor = self.response_compressor
+        server.get_metrics = self.get_metrics
+        return server
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        '''Retorna las métricas internas del microservicio.'''
+        metrics = {
+            'database_pool': self.db_connection.get_pool_stats()
+        }
+        if isinstance(self.server, BoundedThreadPoolHTTPServer):
+            metrics['http_workers'] = self.server.get_stats()
+        if self.result_cache is not None:
+            metrics['result_cache'] = self.property_service.get_cache_stats()
+        metrics.update(repository_metrics(self.property_repository))
+        metrics['json_fragments'] = self.property_controller.fragment_cache.get_stats()
+        if self.response_compressor is not None:
+            metrics['compression'] = self.response_compressor.get_stats()
+        if self.projection is not None:
+            metrics['latest_status_projection'] = self.projection.get_stats()
+        if self.catalog_sync is not None:
+            metrics['catalog_sync'] = self.catalog_sync.get_stats()
+        if self.facets is not None:
+            metrics['facets'] = self.facets.get_stats()
+        if self.search is not None:
+            metrics['search'] = self.search.get_stats()
+        metrics['pid'] = os.getpid()
+        return metrics
+    
     def stop(self):
         '''Detiene el servidor.'''
         if self.server:
             self.server.shutdown()
-            self.server.server_close()
\ No newline at end of file
+            self.server.server_close()
+        if self.catalog_sync is not None:
+            self.catalog_sync.stop()
+        self.db_connection.close()
\ No newline at end of file
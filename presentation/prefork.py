@@ -0,0 +1,136 @@
+'''
+Modo prefork: varios procesos worker comparten el puerto de escucha.
+'''
+
+from typing import Callable, Dict
+import logging
+import os
+import signal
+import socket
+import time
+
+
+class PreforkSupervisor:
+    '''
+    Supervisor de procesos worker.
+    Cada worker es un proceso independiente (con su propio pool de conexiones y caches) que
+    escucha en el mismo puerto mediante SO_REUSEPORT o un socket heredado del supervisor.
+    Reinicia los workers que terminan inesperadamente y, al recibir SIGTERM o SIGINT,
+    les pide que terminen los requests en curso antes de salir.
+    '''
+
+    # Evita reinicios en bucle cuando un worker falla apenas arranca
+    RESTART_BACKOFF = 1.0
+
+    def __init__(self, worker_target: Callable[[socket.socket], None], host: str, port: int,
+                 processes: int, reuse_port: bool = True, graceful_timeout: float = 30,
+                 backlog: int = 128):
+        if not hasattr(os, 'fork'):
+            raise RuntimeError('El modo prefork requiere un sistema operativo con fork()')
+        if processes < 1:
+            raise ValueError('El número de procesos debe ser mayor a 0')
+
+        self.worker_target = worker_target
+        self.host = host
+        self.port = port
+        self.processes = processes
+        self.reuse_port = reuse_port and hasattr(socket, 'SO_REUSEPORT')
+        self.graceful_timeout = graceful_timeout
+        self.backlog = backlog
+
+        self._listen_socket = None
+        self._children: Dict[int, float] = {}
+        self._stopping = False
+
+    def run(self) -> None:
+        '''Arranca los workers y los supervisa hasta recibir la señal de parada.'''
+        if not self.reuse_port:
+            self._listen_socket = socket.create_server((self.host, self.port), backlog=self.backlog)
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        for _ in range(self.processes):
+            self._spawn()
+
+        logging.info(
+            f'Supervisor {os.getpid()} con {self.processes} workers en {self.host}:{self.port} '
+            f'({"SO_REUSEPORT" if self.reuse_port else "socket heredado"})'
+        )
+
+        try:
+            self._supervise()
+        finally:
+            if self._listen_socket is not None:
+                self._listen_socket.close()
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_IGN)
+                self.worker_target(self._listen_socket)
+            except Exception:
+                logging.exception(f'Worker {os.getpid()} terminó con error')
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+
+        self._children[pid] = time.monotonic()
+
+    def _supervise(self) -> None:
+        while self._children and not self._stopping:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+
+            started_at = self._children.pop(pid, None)
+            if started_at is None or self._stopping:
+                continue
+
+            logging.warning(f'Worker {pid} terminó inesperadamente (estado {status}), reiniciando')
+            if time.monotonic() - started_at < self.RESTART_BACKOFF:
+                time.sleep(self.RESTART_BACKOFF)
+            if not self._stopping:
+                self._spawn()
+
+        self._wait_for_children()
+
+    def _handle_stop(self, signum, frame) -> None:
+        if self._stopping:
+            return
+        self._stopping = True
+        logging.info('Deteniendo workers...')
+        for pid in list(self._children):
+            self._signal_child(pid, signal.SIGTERM)
+
+    def _wait_for_children(self) -> None:
+        '''Espera a que los workers drenen sus requests; los que exceden el plazo se matan.'''
+        deadline = time.monotonic() + self.graceful_timeout
+        while self._children:
+            for pid in list(self._children):
+                try:
+                    finished, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    finished = pid
+                if finished:
+                    self._children.pop(pid, None)
+
+            if self._children and time.monotonic() >= deadline:
+                for pid in list(self._children):
+                    logging.warning(f'Worker {pid} no terminó a tiempo, forzando salida')
+                    self._signal_child(pid, signal.SIGKILL)
+                deadline = float('inf')
+            time.sleep(0.05)
+
+    @staticmethod
+    def _signal_child(pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
@@ -0,0 +1,160 @@
+'''
+Servidores HTTP concurrentes del microservicio.
+'''
+
+from http.server import HTTPServer
+from typing import Dict, Any
+import json
+import queue
+import socket
+import threading
+
+
+class BoundedThreadPoolHTTPServer(HTTPServer):
+    '''
+    Servidor HTTP con un pool fijo de hilos trabajadores y una cola de aceptación acotada.
+    Cuando la cola está llena responde 503 de inmediato en lugar de acumular latencia.
+    Una conexión persistente ocupa su worker mientras espera el siguiente request, así que solo
+    `keep_alive_connections` (menos que `workers`) pueden quedar abiertas a la vez; el resto se
+    cierra después de su respuesta y siempre queda un worker para las conexiones nuevas.
+    '''
+
+    def __init__(self, server_address, handler_class, workers: int = 16, queue_size: int = 64,
+                 backlog: int = 128, reuse_port: bool = False, listen_socket: socket.socket = None,
+                 keep_alive_connections: int = None, graceful_timeout: float = 30):
+        if workers < 1:
+            raise ValueError('El número de workers debe ser mayor a 0')
+
+        # `request_queue_size` es el backlog que socketserver pasa a listen()
+        self.request_queue_size = backlog
+        # Con SO_REUSEPORT varios procesos pueden escuchar en el mismo puerto
+        self.allow_reuse_port = reuse_port
+        super().__init__(server_address, handler_class, bind_and_activate=listen_socket is None)
+
+        if listen_socket is not None:
+            # Socket ya enlazado y en escucha, heredado del proceso supervisor
+            self.socket.close()
+            self.socket = listen_socket
+            self.server_address = listen_socket.getsockname()
+            self.server_name, self.server_port = self.server_address[:2]
+
+        self.workers = workers
+        self.queue_size = queue_size
+        # Segundos que `server_close` espera a que terminen los requests en curso
+        self.graceful_timeout = graceful_timeout
+        if keep_alive_connections is None:
+            keep_alive_connections = workers - 1
+        self.keep_alive_connections = max(0, min(keep_alive_connections, workers - 1))
+        self._requests = queue.Queue(maxsize=queue_size)
+        self._stats_lock = threading.Lock()
+        self._active = 0
+        self._keep_alive = 0
+        self._stats = {'accepted': 0, 'rejected': 0, 'completed': 0, 'errors': 0, 'keep_alive_refused': 0}
+        self._drained = False
+        self._threads = [
+            threading.Thread(target=self._worker_loop, name=f'http-worker-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def process_request(self, request, client_address):
+        '''Encola la conexión para un worker o la rechaza si la cola está llena.'''
+        try:
+            self._requests.put_nowait((request, client_address))
+        except queue.Full:
+            with self._stats_lock:
+                self._stats['rejected'] += 1
+            self._reject(request)
+            return
+
+        with self._stats_lock:
+            self._stats['accepted'] += 1
+
+    def acquire_keep_alive(self) -> bool:
+        '''Reserva un lugar para mantener abierta una conexión; False si ya no quedan.'''
+        with self._stats_lock:
+            if self._keep_alive >= self.keep_alive_connections:
+                self._stats['keep_alive_refused'] += 1
+                return False
+            self._keep_alive += 1
+            return True
+
+    def release_keep_alive(self) -> None:
+        '''Libera el lugar de una conexión persistente que se cerró.'''
+        with self._stats_lock:
+            self._keep_alive -= 1
+
+    def _worker_loop(self):
+        while True:
+            item = self._requests.get()
+            if item is None:
+                break
+
+            request, client_address = item
+            with self._stats_lock:
+                self._active += 1
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                with self._stats_lock:
+                    self._stats['errors'] += 1
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                with self._stats_lock:
+                    self._active -= 1
+                    self._stats['completed'] += 1
+
+    def _reject(self, request):
+        '''Responde 503 sin pasar por el handler y cierra la conexión.'''
+        body = json.dumps({
+            'success': False,
+            'error': 'Servidor saturado, intente más tarde'
+        }, ensure_ascii=False).encode('utf-8')
+        response = (
+            b'HTTP/1.1 503 Service Unavailable\r\n'
+            b'Content-Type: application/json\r\n'
+            b'Retry-After: 1\r\n'
+            b'Connection: close\r\n'
+            b'Content-Length: ' + str(len(body)).encode('ascii') + b'\r\n\r\n' + body
+        )
+        try:
+            request.settimeout(0.5)
+            request.sendall(response)
+            # Descarta lo que el cliente ya envió para evitar un RST antes de leer la respuesta
+            request.setblocking(False)
+            request.recv(65536)
+        except (OSError, socket.timeout):
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    def drain(self, timeout: float = None) -> None:
+        '''Detiene los workers después de atender las conexiones ya encoladas.'''
+        if self._drained:
+            return
+        self._drained = True
+        for _ in self._threads:
+            self._requests.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def server_close(self):
+        super().server_close()
+        self.drain(timeout=self.graceful_timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        '''Retorna las estadísticas del pool de workers.'''
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats.update({
+                'workers': self.workers,
+                'active': self._active,
+                'keep_alive': self._keep_alive,
+                'keep_alive_connections': self.keep_alive_connections,
+                'queued': self._requests.qsize(),
+                'queue_size': self.queue_size,
+            })
+        return stats
+
@@ -0,0 +1,70 @@
+'''
+Codificacion incremental de respuestas JSON / NDJSON para streaming.
+'''
+
+from typing import Any, Callable, Dict, Iterable, Iterator
+
+from .fragments import ENVELOPE_PREFIX, FRAGMENT_SEPARATOR, envelope_suffix
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+# Tamaño aproximado de cada bloque escrito al socket
+CHUNK_SIZE = 64 * 1024
+
+
+def _close(iterable: Iterable) -> None:
+    '''Cierra el generador de origen: si el cliente abandona la respuesta se libera su cursor de inmediato.'''
+    close = getattr(iterable, 'close', None)
+    if close is not None:
+        close()
+
+
+def _buffered(pieces: Iterable[bytes], chunk_size: int) -> Iterator[bytes]:
+    '''Agrupa fragmentos pequeños en bloques de aproximadamente `chunk_size` bytes.'''
+    buffer = []
+    size = 0
+    try:
+        for piece in pieces:
+            buffer.append(piece)
+            size += len(piece)
+            if size >= chunk_size:
+                yield b''.join(buffer)
+                buffer = []
+                size = 0
+        if buffer:
+            yield b''.join(buffer)
+    finally:
+        _close(pieces)
+
+
+def encode_json_envelope(fragments: Iterable[bytes], chunk_size: int = CHUNK_SIZE,
+                         trailer: Callable[[], Dict[str, Any]] = None) -> Iterator[bytes]:
+    '''
+    Codifica los fragmentos JSON de los inmuebles dentro del sobre {'success', 'data', 'count'}
+    sin construir la lista completa. El resultado es idéntico a la respuesta normal; `count` y
+    los campos de `trailer()` van al final porque solo se conocen al terminar el recorrido.
+    '''
+    def pieces():
+        yield ENVELOPE_PREFIX
+        count = 0
+        try:
+            for fragment in fragments:
+                yield fragment if count == 0 else FRAGMENT_SEPARATOR + fragment
+                count += 1
+        finally:
+            _close(fragments)
+        yield envelope_suffix(count, trailer() if trailer else None)
+
+    return _buffered(pieces(), chunk_size)
+
+
+def encode_ndjson(fragments: Iterable[bytes], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    '''Codifica un objeto JSON por línea (application/x-ndjson).'''
+    def pieces():
+        try:
+            for fragment in fragments:
+                yield fragment + b'\n'
+        finally:
+            _close(fragments)
+
+    return _buffered(pieces(), chunk_size)
@@ -0,0 +1,148 @@
+'''
+Pruebas unitarias para el camino asíncrono (asyncio).
+'''
+
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+from domain import Property, PropertyFilter, PropertyState
+from infrastructure import PropertyRepositoryInterface, ExecutorPropertyRepository
+from application import AsyncPropertyService
+from presentation import PropertyController, AsyncPropertyMicroservice
+
+
+class TestAsyncPropertyService(unittest.IsolatedAsyncioTestCase):
+    '''Pruebas para AsyncPropertyService sobre ExecutorPropertyRepository.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.mock_repository = Mock(spec=PropertyRepositoryInterface)
+        self.service = AsyncPropertyService(ExecutorPropertyRepository(self.mock_repository))
+        self.controller = PropertyController(self.service)
+
+    async def test_get_properties_runs_blocking_repository(self):
+        '''Test que el repositorio bloqueante se consulta a través del executor.'''
+        # Arrange
+        mock_property = Property(
+            id=1,
+            address='Test Address',
+            city='Test City',
+            state=PropertyState.VENTA,
+            price=100000,
+            description=None,
+            year=2020
+        )
+        self.mock_repository.find_available_properties.return_value = [mock_property]
+
+        # Act
+        filters = PropertyFilter(year=2020)
+        result = await self.service.get_available_properties(filters)
+
+        # Assert
+        self.assertEqual(result, [mock_property])
+        self.mock_repository.find_available_properties.assert_called_once_with(filters)
+
+    async def test_validation_is_reused(self):
+        '''Test que la validación de PropertyService aplica en el camino asíncrono.'''
+        with self.assertRaises(ValueError):
+            await self.service.get_available_properties(PropertyFilter(year=1500))
+
+        self.mock_repository.find_available_properties.assert_not_called()
+
+    async def test_inverted_range_is_rejected(self):
+        '''Test que un rango con el mínimo mayor que el máximo es un error de validación.'''
+        with self.assertRaises(ValueError):
+            await self.service.get_available_properties(PropertyFilter(min_price=500, max_price=100))
+
+        self.mock_repository.find_available_properties.assert_not_called()
+
+    async def test_state_list_is_capped(self):
+        '''Test que la lista de estados tiene el mismo máximo de valores que la de ciudades.'''
+        with self.assertRaises(ValueError):
+            await self.service.get_available_properties(PropertyFilter(states=(PropertyState.VENTA,) * 21))
+
+        self.mock_repository.find_available_properties.assert_not_called()
+
+    async def test_controller_async_response(self):
+        '''Test que el controlador construye la misma respuesta en modo asíncrono.'''
+        self.mock_repository.find_available_properties.return_value = []
+
+        result = await self.controller.get_properties_async({'city': ['bogota']})
+
+        self.assertEqual(result, {'success': True, 'data': [], 'count': 0})
+
+    async def test_controller_async_validation_error(self):
+        '''Test que los errores de parseo se reportan igual que en modo síncrono.'''
+        result = await self.controller.get_properties_async({'year': ['abc']})
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['code'], 'VALIDATION_ERROR')
+
+
+class TestAsyncStreaming(unittest.IsolatedAsyncioTestCase):
+    '''Pruebas para el envío en streaming del servidor asyncio.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        # Solo se usa el executor; el resto del servicio requiere MySQL
+        self.server = AsyncPropertyMicroservice.__new__(AsyncPropertyMicroservice)
+        self.server.executor = ThreadPoolExecutor(1)
+        self.writer = Mock()
+        self.writer.drain = self._drain
+        self.closed = []
+
+    def tearDown(self):
+        self.server.executor.shutdown()
+
+    async def _drain(self):
+        pass
+
+    def _chunks(self):
+        try:
+            yield b'{"data":['
+            yield b''
+            yield b']}'
+        finally:
+            self.closed.append(True)
+
+    def _written(self) -> bytes:
+        return b''.join(call.args[0] for call in self.writer.write.call_args_list)
+
+    async def test_chunked_stream(self):
+        '''Test que los bloques se envían con Transfer-Encoding: chunked y el iterador se cierra.'''
+        # Act
+        keep_alive = await self.server._write_stream(self.writer, self._chunks(), True, True, 1,
+                                                     ['X-Sync-Token: abc'])
+
+        # Assert
+        written = self._written()
+        self.assertTrue(keep_alive)
+        self.assertIn(b'Transfer-Encoding: chunked', written)
+        self.assertIn(b'X-Sync-Token: abc', written)
+        self.assertTrue(written.endswith(b'\r\n\r\n9\r\n{"data":[\r\n2\r\n]}\r\n0\r\n\r\n'))
+        self.assertEqual(self.closed, [True])
+
+    async def test_unchunked_stream_closes_connection(self):
+        '''Test que para HTTP/1.0 el cuerpo va sin chunks y la conexión se cierra.'''
+        keep_alive = await self.server._write_stream(self.writer, self._chunks(), False, False, 1, [])
+
+        written = self._written()
+        self.assertFalse(keep_alive)
+        self.assertIn(b'Connection: close', written)
+        self.assertTrue(written.endswith(b'\r\n\r\n{"data":[]}'))
+
+    async def test_stream_error_closes_connection(self):
+        '''Test que un error a mitad del cuerpo corta la respuesta y la conexión.'''
+        def failing():
+            yield b'{"data":['
+            raise RuntimeError('Error al recorrer inmuebles')
+
+        keep_alive = await self.server._write_stream(self.writer, failing(), True, True, 1, [])
+
+        self.assertFalse(keep_alive)
+        self.assertNotIn(b'0\r\n\r\n', self._written())
+
+
+if __name__ == '__main__':
+    unittest.main()
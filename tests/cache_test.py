@@ -0,0 +1,160 @@
+'''
+Pruebas unitarias para el cache de resultados.
+'''
+
+import unittest
+from unittest.mock import Mock
+
+from domain import Property, PropertyFilter, PropertyState
+from infrastructure import PropertyRepositoryInterface
+from application import PropertyService, ResultCache
+from tests.fakes import FakeClock
+
+
+class TestResultCache(unittest.TestCase):
+    '''Pruebas para ResultCache.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.clock = FakeClock()
+
+    def test_entry_expires_after_ttl(self):
+        '''Test que una entrada vencida cuenta como fallo.'''
+        cache = ResultCache(ttl=10, clock=self.clock)
+        cache.set('a', 1)
+
+        self.clock.now = 9
+        self.assertEqual(cache.get('a'), 1)
+
+        self.clock.now = 10
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get_stats()['expirations'], 1)
+
+    def test_lru_eviction_by_entries(self):
+        '''Test que se desaloja la entrada menos usada al superar el máximo de entradas.'''
+        cache = ResultCache(max_entries=2, clock=self.clock)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+
+    def test_eviction_by_bytes(self):
+        '''Test que se respeta el total de bytes estimados.'''
+        cache = ResultCache(max_bytes=10, sizeof=lambda value: value, clock=self.clock)
+        cache.set('a', 6)
+        cache.set('b', 6)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get_stats()['bytes'], 6)
+
+    def test_invalidate(self):
+        '''Test de invalidación por llave y total.'''
+        cache = ResultCache(clock=self.clock)
+        cache.set('a', 1)
+        cache.set('b', 2)
+
+        cache.invalidate('a')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), 2)
+
+        cache.invalidate()
+        self.assertEqual(cache.get_stats()['entries'], 0)
+
+
+class TestPropertyServiceCache(unittest.TestCase):
+    '''Pruebas de PropertyService con cache de resultados.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.mock_repository = Mock(spec=PropertyRepositoryInterface)
+        self.mock_repository.find_available_properties.return_value = [
+            Property(id=1, address='Calle 1', city='Bogotá', state=PropertyState.VENTA, price=100, year=2020)
+        ]
+        self.cache = ResultCache(sizeof=PropertyService.estimate_size)
+        self.service = PropertyService(self.mock_repository, self.cache)
+
+    def test_second_call_is_served_from_cache(self):
+        '''Test que un filtro repetido no consulta el repositorio.'''
+        first = self.service.get_available_properties(PropertyFilter(city='Bogotá'))
+        second = self.service.get_available_properties(PropertyFilter(city='  bogotá '))
+
+        self.assertEqual(first, second)
+        self.mock_repository.find_available_properties.assert_called_once()
+        self.assertEqual(self.cache.get_stats()['hits'], 1)
+
+    def test_invalidate_cache(self):
+        '''Test que invalidar obliga a consultar de nuevo.'''
+        filters = PropertyFilter(state=PropertyState.VENTA)
+        self.service.get_available_properties(filters)
+
+        self.service.invalidate_cache(filters)
+        self.service.get_available_properties(filters)
+
+        self.assertEqual(self.mock_repository.find_available_properties.call_count, 2)
+
+    def test_filter_is_hashable(self):
+        '''Test que los filtros equivalentes comparten llave normalizada.'''
+        self.assertEqual(
+            hash(PropertyFilter(city='MEDELLÍN').normalized()),
+            hash(PropertyFilter(city='medellín').normalized())
+        )
+
+
+class _ImmediateExecutor:
+    '''Executor que corre la tarea en el mismo hilo.'''
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+class TestStaleWhileRevalidate(unittest.TestCase):
+    '''Pruebas de recarga en segundo plano de resultados obsoletos.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.clock = FakeClock()
+        self.mock_repository = Mock(spec=PropertyRepositoryInterface)
+        self.mock_repository.find_available_properties.side_effect = [['viejo'], ['nuevo']]
+        self.cache = ResultCache(ttl=10, stale_ttl=10, sizeof=len, clock=self.clock)
+        self.service = PropertyService(self.mock_repository, self.cache, _ImmediateExecutor())
+
+    def test_stale_value_is_served_and_refreshed(self):
+        '''Test que un valor vencido se entrega mientras se recarga.'''
+        filters = PropertyFilter(city='Bogota')
+        self.service.get_available_properties(filters)
+
+        self.clock.now = 15
+        stale = self.service.get_available_properties(filters)
+
+        self.assertEqual(stale, ['viejo'])
+        self.assertEqual(self.service.get_available_properties(filters), ['nuevo'])
+        self.assertEqual(self.cache.get_stats()['stale_hits'], 1)
+        self.assertEqual(self.service.get_cache_stats()['background_refresh']['completed'], 1)
+
+    def test_value_outside_stale_window_is_reloaded(self):
+        '''Test que fuera de la ventana de obsolescencia se consulta de forma síncrona.'''
+        filters = PropertyFilter()
+        self.service.get_available_properties(filters)
+
+        self.clock.now = 25
+
+        self.assertEqual(self.service.get_available_properties(filters), ['nuevo'])
+
+    def test_warm_up_and_describe(self):
+        '''Test que la precarga llena el cache y la vista administrativa lo lista.'''
+        self.service.warm_up([PropertyFilter(city='Bogota', state=PropertyState.VENTA)])
+
+        entries = self.service.describe_cache()['entries']
+
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]['key'], {'city': 'bogota', 'state': 'en_venta'})
+        self.assertIsNotNone(entries[0]['last_load_ms'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+'''
+Pruebas unitarias para el archivo de catálogo compartido (mmap).
+'''
+
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+from domain import Property, PropertyFilter, PropertyState
+from config import RepositoryConfig
+from infrastructure import CatalogSnapshot, MappedCatalog, MappedPropertyRepository, write_catalog_file
+from presentation.handlers import ensure_catalog_file
+
+
+class TestMappedCatalog(unittest.TestCase):
+    '''Pruebas para write_catalog_file y MappedCatalog.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'catalog.snapshot')
+        self.properties = [
+            Property(id=9, address='Cra 7', city='Medellín', state=PropertyState.PRE_VENTA, price=250, year=None),
+            Property(id=2, address='Calle 1', city='Bogotá', state=PropertyState.VENTA, price=100,
+                     description='Apartamento', year=2020),
+            Property(id=5, address='Calle 2', city='BOGOTÁ', state=PropertyState.VENDIDO, price=300, year=2020),
+        ]
+
+    def tearDown(self):
+        '''Elimina los archivos temporales.'''
+        self.directory.cleanup()
+
+    def test_round_trip_matches_in_memory_snapshot(self):
+        '''Test que el archivo responde lo mismo que el catálogo en memoria.'''
+        # Arrange
+        write_catalog_file(self.path, self.properties, generation=7)
+        snapshot = CatalogSnapshot.build(self.properties)
+
+        # Act
+        catalog = MappedCatalog(self.path)
+
+        # Assert
+        self.assertEqual(catalog.generation, 7)
+        for filters in (PropertyFilter(), PropertyFilter(city='bogotá'), PropertyFilter(year=2020, limit=1),
+                        PropertyFilter(city='bogotá', state=PropertyState.VENDIDO),
+                        PropertyFilter(after_id=2), PropertyFilter(year=2020, after_id=2),
+                        PropertyFilter(cities=('medellín', 'bogotá'), min_price=200),
+                        PropertyFilter(states=(PropertyState.PRE_VENTA, PropertyState.VENDIDO), max_year=2020),
+                        PropertyFilter(sort='price', descending=True, limit=2),
+                        PropertyFilter(sort='year', after_id=9, after_value=None)):
+            self.assertEqual(catalog.query(filters), snapshot.query(filters))
+
+    def test_corrupted_file_is_rejected(self):
+        '''Test que un archivo con checksum inválido no se carga.'''
+        write_catalog_file(self.path, self.properties, generation=1)
+        with open(self.path, 'r+b') as file:
+            file.seek(-1, os.SEEK_END)
+            last = file.read(1)
+            file.seek(-1, os.SEEK_END)
+            file.write(bytes([last[0] ^ 0xFF]))
+
+        with self.assertRaises(ValueError):
+            MappedCatalog(self.path)
+
+    def test_repository_reloads_replaced_file(self):
+        '''Test que el repositorio mapea el archivo nuevo cuando se reemplaza.'''
+        write_catalog_file(self.path, self.properties[:1], generation=1)
+        repository = MappedPropertyRepository(self.path, check_interval=0)
+
+        write_catalog_file(self.path, self.properties, generation=2)
+        result = repository.find_available_properties(PropertyFilter())
+
+        self.assertEqual([prop.id for prop in result], [2, 5, 9])
+        self.assertEqual(repository.get_stats()['generation'], 2)
+
+    def test_stale_file_is_reported_at_startup(self):
+        '''Test que un archivo válido pero antiguo se sirve con una advertencia de su generación y edad.'''
+        # Arrange
+        write_catalog_file(self.path, self.properties, generation=4)
+        written = time.time() - 3600
+        os.utime(self.path, (written, written))
+        db_connection = Mock()
+
+        # Act
+        with patch.object(RepositoryConfig, 'SNAPSHOT_PATH', self.path), \
+                self.assertLogs(level='WARNING') as logs:
+            ensure_catalog_file(db_connection)
+
+        # Assert
+        self.assertIn('generación 4', logs.output[0])
+        self.assertIn('snapshot watch', logs.output[0])
+        db_connection.get_connection.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+'''
+Pruebas unitarias para el feed de cambios de inmuebles.
+'''
+
+import unittest
+from datetime import datetime
+from unittest.mock import Mock
+
+from domain import PropertyFilter, PropertyState
+from infrastructure import MySQLChangeFeed
+from tests.fakes import FakeDatabase
+
+
+
+class TestMySQLChangeFeed(unittest.TestCase):
+    '''Pruebas para MySQLChangeFeed.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.cursor = Mock()
+        self.feed = MySQLChangeFeed(FakeDatabase(self.cursor))
+
+    def test_changes_since_position(self):
+        '''Test que los candidatos se eligen solo por historial o property.updated_at posteriores a la posición.'''
+        query, params = self.feed._build_query(PropertyFilter(city='bogota'),
+                                               ('2024-01-01 10:00:00', 40, '2024-01-01 10:00:00.5'))
+
+        self.assertIn('WHERE update_date > %s OR id > %s UNION SELECT id FROM property WHERE updated_at > %s', query)
+        self.assertNotIn('s.name IN', query)
+        self.assertNotIn('city_key', query)
+        self.assertEqual(params, ('2024-01-01 10:00:00', 40, '2024-01-01 10:00:00.5'))
+
+    def test_position_without_property_marker(self):
+        '''Test que una posición de dos elementos (token anterior) solo busca cambios de historial.'''
+        query, params = self.feed._build_query(PropertyFilter(), ('2024-01-01 10:00:00', 40))
+
+        self.assertNotIn('updated_at', query)
+        self.assertEqual(params, ('2024-01-01 10:00:00', 40))
+
+    def test_initial_sync_only_available(self):
+        '''Test que sin posición se recorren solo los inmuebles disponibles que cumplen el filtro.'''
+        query, params = self.feed._build_query(PropertyFilter(year=2020), None)
+
+        self.assertIn('s.name IN (%s, %s, %s)', query)
+        self.assertEqual(params, ('pre_venta', 'en_venta', 'vendido', 2020))
+
+    def test_properties_leaving_the_filter_are_removed(self):
+        '''Test que los inmuebles no disponibles o fuera del estado filtrado se entregan como baja.'''
+        # Arrange
+        self.cursor.fetchmany.side_effect = [[
+            (1, 'Calle 1', 'Bogotá', 100, None, 2020, 'en_venta'),
+            (2, 'Calle 2', 'Bogotá', 200, None, 2020, 'vendido'),
+            (3, 'Calle 3', 'Bogotá', 300, None, 2020, 'comprando'),
+        ], []]
+
+        # Act
+        changes = list(self.feed.iter_changes(PropertyFilter(state=PropertyState.VENTA), ('2024-01-01 10:00:00', 1)))
+
+        # Assert
+        self.assertEqual([(prop_id, prop is not None) for prop_id, prop in changes], [(1, True), (2, False), (3, False)])
+        self.assertEqual(changes[0][1].state, PropertyState.VENTA)
+        self.cursor.close.assert_called_once()
+
+    def test_properties_leaving_property_filters_are_removed(self):
+        '''Test que un inmueble cuyo precio o ciudad dejó de cumplir el filtro se entrega como baja.'''
+        # Arrange
+        self.cursor.fetchmany.side_effect = [[
+            (1, 'Calle 1', 'Bogotá', 100, None, 2020, 'en_venta'),
+            (2, 'Calle 2', 'Bogotá', 900, None, 2020, 'en_venta'),
+            (3, 'Calle 3', 'Cali', 100, None, 2020, 'en_venta'),
+        ], []]
+        filters = PropertyFilter(city='bogotá', max_price=500)
+
+        # Act
+        changes = list(self.feed.iter_changes(filters, ('2024-01-01 10:00:00', 1, '2024-01-01 10:00:00')))
+
+        # Assert
+        self.assertEqual([(prop_id, prop is not None) for prop_id, prop in changes], [(1, True), (2, False), (3, False)])
+
+    def test_current_position_includes_property_marker(self):
+        '''Test que la posición incluye la última modificación de property.'''
+        self.cursor.fetchone.return_value = (datetime(2024, 1, 2, 8, 0), 55, datetime(2024, 1, 2, 8, 30, 0, 123456))
+
+        position = self.feed.current_position()
+
+        self.assertEqual(position, ('2024-01-02 08:00:00', 55, '2024-01-02 08:30:00.123456'))
+
+
+if __name__ == '__main__':
+    unittest.main()
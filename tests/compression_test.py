@@ -0,0 +1,70 @@
+'''
+Pruebas unitarias para la compresión de respuestas.
+'''
+
+import gzip
+import unittest
+import zlib
+
+from presentation.compression import ResponseCompressor, negotiate_encoding
+
+
+class TestNegotiateEncoding(unittest.TestCase):
+    '''Pruebas para negotiate_encoding.'''
+
+    def test_prefers_highest_weight(self):
+        '''Test que se elige la codificación soportada con mayor q.'''
+        self.assertEqual(negotiate_encoding('gzip, deflate, br'), 'gzip')
+        self.assertEqual(negotiate_encoding('gzip;q=0.5, deflate'), 'deflate')
+        self.assertEqual(negotiate_encoding('br, *;q=0.1'), 'gzip')
+
+    def test_no_supported_encoding(self):
+        '''Test que sin codificaciones aceptadas la respuesta va sin comprimir.'''
+        self.assertIsNone(negotiate_encoding(''))
+        self.assertIsNone(negotiate_encoding('br'))
+        self.assertIsNone(negotiate_encoding('gzip;q=0, *;q=0'))
+
+
+class TestResponseCompressor(unittest.TestCase):
+    '''Pruebas para ResponseCompressor.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.compressor = ResponseCompressor(min_size=100, level=6)
+        self.body = b'{"success": true, "data": [' + b', '.join([b'{"id": 1, "city": "Bogot\xc3\xa1"}'] * 50) + b']}'
+
+    def test_compresses_and_reuses_result(self):
+        '''Test que el mismo cuerpo se comprime una sola vez por codificación.'''
+        # Act
+        first, encoding = self.compressor.compress(self.body, 'gzip')
+        second, _ = self.compressor.compress(self.body, 'gzip')
+        deflated, deflate = self.compressor.compress(self.body, 'deflate')
+
+        # Assert
+        self.assertEqual(encoding, 'gzip')
+        self.assertEqual(gzip.decompress(first), self.body)
+        self.assertIs(second, first)
+        self.assertEqual((deflate, zlib.decompress(deflated)), ('deflate', self.body))
+        stats = self.compressor.get_stats()
+        self.assertEqual((stats['compressed'], stats['hits'], stats['entries']), (2, 1, 2))
+
+    def test_small_body_is_not_compressed(self):
+        '''Test que las respuestas bajo el umbral van sin comprimir.'''
+        body, encoding = self.compressor.compress(b'{"status": "healthy"}', 'gzip')
+
+        self.assertEqual((body, encoding), (b'{"status": "healthy"}', None))
+
+    def test_cache_is_bounded_by_bytes(self):
+        '''Test que se desalojan las entradas más antiguas al superar el máximo de bytes.'''
+        size = len(gzip.compress(self.body, mtime=0))
+        compressor = ResponseCompressor(min_size=0, cache_max_bytes=size * 2 + 10)
+        for i in range(5):
+            compressor.compress(self.body + str(i).encode(), 'gzip')
+
+        stats = compressor.get_stats()
+        self.assertEqual((stats['entries'], stats['evictions']), (2, 3))
+        self.assertLessEqual(stats['bytes'], size * 2 + 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,378 @@
+'''
+Pruebas unitarias para PropertyController.
+'''
+
+import unittest
+from unittest.mock import Mock
+import json
+
+from domain import Property, PropertyState
+from application import PropertyService, ResultCache
+from infrastructure import PropertyRepositoryInterface, CatalogNotLoadedError
+from presentation import PropertyController
+from presentation.fragments import PropertyFragmentCache
+
+
+class TestPropertyControllerPagination(unittest.TestCase):
+    '''Pruebas de paginación por llave en PropertyController.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.mock_service = Mock(spec=PropertyService)
+        self.controller = PropertyController(self.mock_service)
+        self.properties = [
+            Property(id=i, address='Calle', city='Bogotá', state=PropertyState.VENTA, price=100, year=2020)
+            for i in (3, 7)
+        ]
+
+    def test_full_page_returns_next_cursor(self):
+        '''Test que una página llena entrega el cursor del último id.'''
+        self.mock_service.get_available_properties.return_value = self.properties
+
+        result = self.controller.get_properties({'limit': ['2']})
+        filters = self.controller._parse_filters({'limit': ['2'], 'cursor': [result['next_cursor']]})
+
+        self.assertEqual(filters.after_id, 7)
+        self.assertEqual(filters.limit, 2)
+
+    def test_partial_page_has_no_next_cursor(self):
+        '''Test que la última página no tiene cursor.'''
+        self.mock_service.get_available_properties.return_value = self.properties
+
+        result = self.controller.get_properties({'limit': ['5']})
+
+        self.assertIsNone(result['next_cursor'])
+
+    def test_response_without_limit_is_unchanged(self):
+        '''Test que sin límite la respuesta conserva su forma original.'''
+        self.mock_service.get_available_properties.return_value = self.properties
+
+        result = self.controller.get_properties({})
+
+        self.assertEqual(set(result), {'success', 'data', 'count'})
+
+    def test_multi_value_and_range_parameters(self):
+        '''Test que las listas separadas por comas o repetidas y los rangos llegan al filtro.'''
+        filters = self.controller._parse_filters({'city': ['bogota, cali', 'medellin'], 'state': ['vendido'],
+                                                  'min_price': ['100'], 'max_year': ['2020']})
+
+        self.assertEqual(filters.cities, ('bogota', 'cali', 'medellin'))
+        self.assertEqual((filters.city, filters.state, filters.states), (None, PropertyState.VENDIDO, None))
+        self.assertEqual((filters.min_price, filters.max_price, filters.max_year), (100, None, 2020))
+        with self.assertRaises(ValueError):
+            self.controller._parse_filters({'min_price': ['barato']})
+
+    def test_sorted_cursor_carries_sort_value(self):
+        '''Test que con sort el cursor lleva el valor de orden y solo sirve para el mismo orden.'''
+        self.mock_service.get_available_properties.return_value = self.properties
+
+        result = self.controller.get_properties({'limit': ['2'], 'sort': ['-year']})
+        filters = self.controller._parse_filters({'limit': ['2'], 'sort': ['-year'], 'cursor': [result['next_cursor']]})
+
+        self.assertEqual((filters.sort, filters.descending, filters.after_id, filters.after_value), ('year', True, 7, 2020))
+        with self.assertRaises(ValueError):
+            self.controller._parse_filters({'sort': ['price'], 'cursor': [result['next_cursor']]})
+        with self.assertRaises(ValueError):
+            self.controller._parse_filters({'sort': ['address']})
+
+    def test_invalid_cursor(self):
+        '''Test que un cursor manipulado es un error de validación.'''
+        result = self.controller.get_properties({'cursor': ['no-es-un-cursor']})
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['code'], 'VALIDATION_ERROR')
+
+
+class TestPropertyControllerBatch(unittest.TestCase):
+    '''Pruebas de POST /properties/batch en PropertyController.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.mock_service = Mock(spec=PropertyService)
+        self.controller = PropertyController(self.mock_service)
+        self.prop = Property(id=3, address='Calle', city='Bogotá', state=PropertyState.VENTA, price=100, year=2020)
+
+    def test_results_keyed_by_index(self):
+        '''Test que cada filtro tiene su resultado o su error en la posición del request.'''
+        # Arrange
+        self.mock_service.get_available_properties_batch.return_value = [[self.prop], ValueError('Año inválido')]
+        body = json.dumps({'filters': [{'city': 'bogota', 'fields': ['id', 'city']}, {'state': 'comprando'},
+                                       {'year': 3000}]}).encode()
+
+        # Act
+        result = self.controller.get_properties_batch(body)
+
+        # Assert
+        filters_list = self.mock_service.get_available_properties_batch.call_args.args[0]
+        self.assertEqual([filters.city for filters in filters_list], ['bogota', None])
+        self.assertEqual(result['results']['0']['data'], [{'id': 3, 'city': 'Bogotá'}])
+        self.assertEqual(result['results']['1']['code'], 'VALIDATION_ERROR')
+        self.assertEqual(result['results']['2']['code'], 'VALIDATION_ERROR')
+
+    def test_invalid_body(self):
+        '''Test que un cuerpo que no es un lote de filtros es un error de validación.'''
+        for body in (b'no-es-json', b'{"filtros": []}'):
+            result = self.controller.get_properties_batch(body)
+
+            self.assertEqual(result['code'], 'VALIDATION_ERROR')
+        self.mock_service.get_available_properties_batch.assert_not_called()
+
+
+class TestPropertyControllerSearch(unittest.TestCase):
+    '''Pruebas de GET /properties/search en PropertyController.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.mock_service = Mock(spec=PropertyService)
+        self.controller = PropertyController(self.mock_service)
+        self.prop = Property(id=3, address='Calle', city='Bogotá', state=PropertyState.VENTA, price=100, year=2020)
+
+    def test_results_carry_score(self):
+        '''Test que la búsqueda pasa el texto y los filtros al servicio y cada resultado lleva su puntaje.'''
+        # Arrange
+        self.mock_service.search_properties.return_value = [(self.prop, 1.234567)]
+
+        # Act
+        result = self.controller.search_properties({'q': ['balcón'], 'city': ['bogota'], 'fields': ['id']})
+
+        # Assert
+        query, filters = self.mock_service.search_properties.call_args.args
+        self.assertEqual((query, filters.city), ('balcón', 'bogota'))
+        self.assertEqual(result['data'], [{'id': 3, 'score': 1.2346}])
+        self.assertEqual(result['count'], 1)
+
+    def test_catalog_not_loaded_is_unavailable(self):
+        '''Test que antes de la primera carga del catálogo la búsqueda responde 503.'''
+        self.mock_service.search_properties.side_effect = CatalogNotLoadedError('El catálogo en memoria aún no ha sido cargado')
+
+        result = self.controller.search_properties({'q': ['balcón']})
+
+        self.assertEqual(result['code'], 'CATALOG_NOT_LOADED')
+        self.assertEqual(self.controller.status_code(result), 503)
+        self.assertEqual(self.controller.status_code({'success': True}), 200)
+
+
+class TestPropertyControllerStreaming(unittest.TestCase):
+    '''Pruebas de respuestas en streaming de PropertyController.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.mock_service = Mock(spec=PropertyService)
+        self.controller = PropertyController(self.mock_service)
+        self.properties = [
+            Property(id=i, address='Calle', city='Bogotá', state=PropertyState.VENTA, price=100, year=2020)
+            for i in (3, 7)
+        ]
+
+    def _stream(self, query_params, ndjson=False):
+        self.mock_service.stream_available_properties.return_value = iter(self.properties)
+        self.mock_service.get_available_properties.return_value = self.properties
+        error, chunks = self.controller.stream_properties(query_params, ndjson)
+        self.assertIsNone(error)
+        return b''.join(chunks)
+
+    def test_json_stream_matches_regular_response(self):
+        '''Test que el sobre en streaming es idéntico byte a byte a la respuesta normal.'''
+        for query_params in ({}, {'limit': ['2']}, {'limit': ['5']}):
+            body = self._stream(query_params)
+            expected = json.dumps(self.controller.get_properties(query_params), ensure_ascii=False)
+
+            self.assertEqual(body, expected.encode('utf-8'))
+
+    def test_stream_does_not_fill_fragment_cache(self):
+        '''Test que una exportación reutiliza los fragmentos cacheados pero no guarda los que faltan.'''
+        # Act
+        self._stream({}, ndjson=True)
+        exported = self.controller.fragment_cache.get_stats()
+        self.controller.get_properties_body({})
+        self._stream({}, ndjson=True)
+
+        # Assert
+        self.assertEqual((exported['entries'], exported['uncached']), (0, 2))
+        stats = self.controller.fragment_cache.get_stats()
+        self.assertEqual((stats['entries'], stats['hits'], stats['uncached']), (2, 2, 2))
+
+    def test_ndjson_stream(self):
+        '''Test que NDJSON entrega un inmueble por línea.'''
+        lines = self._stream({}, ndjson=True).decode('utf-8').splitlines()
+
+        self.assertEqual([json.loads(line)['id'] for line in lines], [3, 7])
+
+    def test_validation_error_before_streaming(self):
+        '''Test que los errores de validación se reportan antes de iniciar el cuerpo.'''
+        error, chunks = self.controller.stream_properties({'year': ['abc']})
+
+        self.assertEqual(error['code'], 'VALIDATION_ERROR')
+        self.assertEqual(list(chunks), [])
+        self.mock_service.stream_available_properties.assert_not_called()
+
+    def test_change_feed_with_token(self):
+        '''Test que el feed entrega altas y bajas, y el token siguiente decodifica a la posición leída.'''
+        # Arrange
+        since = self.controller._encode_cursor({'date': '2024-01-01 10:00:00', 'history_id': 40})
+        self.mock_service.stream_changes.return_value = (
+            ('2024-01-02 08:00:00', 55, '2024-01-02 08:30:00.123456'), iter([(3, self.properties[0]), (5, None)])
+        )
+
+        # Act
+        error, token, chunks = self.controller.stream_changes({'since': [since], 'fields': ['id,price']})
+        body = json.loads(b''.join(chunks))
+
+        # Assert
+        self.assertIsNone(error)
+        self.assertEqual(self.mock_service.stream_changes.call_args.args[1], ('2024-01-01 10:00:00', 40, None))
+        self.assertEqual(body['data'], [{'id': 3, 'price': 100}, {'id': 5, 'removed': True}])
+        self.assertEqual(body['next_token'], token)
+        self.assertEqual(self.controller._decode_sync_token(token),
+                         ('2024-01-02 08:00:00', 55, '2024-01-02 08:30:00.123456'))
+
+    def test_change_feed_invalid_token(self):
+        '''Test que un token manipulado es un error de validación.'''
+        bad = self.controller._encode_cursor({'date': 'ayer', 'history_id': 1})
+
+        for since in (bad, 'no-es-un-token'):
+            error, _, _ = self.controller.stream_changes({'since': [since]})
+
+            self.assertEqual(error['code'], 'VALIDATION_ERROR')
+        self.mock_service.stream_changes.assert_not_called()
+
+
+class TestPropertyControllerConditional(unittest.TestCase):
+    '''Pruebas del GET condicional (ETag / If-None-Match) en PropertyController.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.repository = Mock(spec=PropertyRepositoryInterface)
+        self.repository.get_catalog_version.return_value = '10-3'
+        self.repository.find_available_properties.return_value = [
+            Property(id=1, address='Calle', city='Bogotá', state=PropertyState.VENTA, price=100, year=2020)
+        ]
+        self.service = PropertyService(self.repository, ResultCache(ttl=60), version_ttl=0)
+        self.controller = PropertyController(self.service)
+
+    def test_matching_etag_skips_query(self):
+        '''Test que con el ETag vigente se responde 304 sin consultar ni serializar.'''
+        # Arrange
+        etag, body = self.controller.get_properties_conditional({'city': ['Bogotá']})
+        self.repository.find_available_properties.reset_mock()
+
+        # Act
+        not_modified = self.controller.get_properties_conditional({'city': ['bogotá ']}, f'W/{etag[:-1]}-gzip"')
+
+        # Assert
+        self.assertEqual(json.loads(body)['count'], 1)
+        self.assertEqual(not_modified, (f'W/{etag[:-1]}-gzip"', None))
+        self.repository.find_available_properties.assert_not_called()
+
+    def test_new_catalog_version_changes_etag(self):
+        '''Test que un cambio de versión invalida el ETag y recarga el resultado cacheado.'''
+        etag, _ = self.controller.get_properties_conditional({})
+        self.repository.get_catalog_version.return_value = '11-3'
+
+        # El cache aún tiene el resultado de la versión anterior: se entrega con su propio ETag
+        stale_etag, stale_body = self.controller.get_properties_conditional({}, '"otro"')
+        self.service.refresh_executor.shutdown(wait=True)
+        new_etag, body = self.controller.get_properties_conditional({}, etag)
+
+        self.assertEqual(stale_etag, etag)
+        self.assertIsNotNone(stale_body)
+        self.assertNotEqual(new_etag, etag)
+        self.assertIsNotNone(body)
+        self.assertEqual(self.repository.find_available_properties.call_count, 2)
+
+    def test_unknown_version_disables_etag(self):
+        '''Test que sin versión del catálogo la respuesta no lleva ETag.'''
+        self.repository.get_catalog_version.return_value = None
+
+        etag, body = self.controller.get_properties_conditional({}, '*')
+
+        self.assertIsNone(etag)
+        self.assertEqual(json.loads(body)['count'], 1)
+
+    def test_version_failure_uses_cached_version(self):
+        '''Test que si falla la lectura de la versión se responde con el resultado cacheado y su ETag.'''
+        # Arrange
+        etag, _ = self.controller.get_properties_conditional({})
+        self.repository.get_catalog_version.side_effect = RuntimeError('MySQL no responde')
+        self.repository.find_available_properties.reset_mock()
+
+        # Act
+        not_modified = self.controller.get_properties_conditional({}, etag)
+        other_etag, body = self.controller.get_properties_conditional({}, '"otro"')
+
+        # Assert
+        self.assertEqual(not_modified, (etag, None))
+        self.assertEqual(other_etag, etag)
+        self.assertEqual(json.loads(body)['count'], 1)
+        self.repository.find_available_properties.assert_not_called()
+
+    def test_version_read_only_with_if_none_match(self):
+        '''Test que sin If-None-Match un resultado cacheado se entrega sin consultar la versión.'''
+        self.controller.get_properties_conditional({})
+        self.repository.get_catalog_version.reset_mock()
+
+        etag, body = self.controller.get_properties_conditional({})
+
+        self.assertIsNotNone(etag)
+        self.assertIsNotNone(body)
+        self.repository.get_catalog_version.assert_not_called()
+
+
+class TestPropertyFragments(unittest.TestCase):
+    '''Pruebas del armado de respuestas con fragmentos JSON precodificados.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.mock_service = Mock(spec=PropertyService)
+        self.fragment_cache = PropertyFragmentCache()
+        self.controller = PropertyController(self.mock_service, self.fragment_cache)
+        self.properties = [
+            Property(id=1, address='Calle "1"', city='Bogotá', state=PropertyState.VENTA, price=100,
+                     description=None, year=2020),
+            Property(id=2, address='Cra 7', city='Medellín', state=PropertyState.PRE_VENTA, price=250,
+                     description='Ñandú\n', year=None),
+        ]
+
+    def test_body_is_byte_identical(self):
+        '''Test que el cuerpo armado con fragmentos es idéntico a json.dumps de la respuesta.'''
+        self.mock_service.get_available_properties.return_value = self.properties
+
+        for query_params in ({}, {'limit': ['2']}, {'limit': ['3']}, {'year': ['abc']}):
+            body = self.controller.get_properties_body(query_params)
+            expected = json.dumps(self.controller.get_properties(query_params), ensure_ascii=False)
+
+            self.assertEqual(body, expected.encode('utf-8'))
+
+    def test_fields_narrow_serialized_keys(self):
+        '''Test que `fields` se normaliza al orden de la respuesta y limita las llaves emitidas.'''
+        self.mock_service.get_available_properties.return_value = self.properties
+
+        body = self.controller.get_properties_body({'fields': ['price, id,city']})
+        filters = self.mock_service.get_available_properties.call_args.args[0]
+
+        self.assertEqual(filters.fields, ('id', 'city', 'price'))
+        self.assertEqual(json.loads(body)['data'][1], {'id': 2, 'city': 'Medellín', 'price': 250})
+        self.assertEqual(body, json.dumps(self.controller.get_properties({'fields': ['price, id,city']}),
+                                          ensure_ascii=False).encode('utf-8'))
+
+    def test_invalid_field(self):
+        '''Test que un campo desconocido es un error de validación.'''
+        result = self.controller.get_properties({'fields': ['id,password']})
+
+        self.assertEqual(result['code'], 'VALIDATION_ERROR')
+        self.assertIn('password', result['error'])
+
+    def test_fragment_is_reencoded_when_property_changes(self):
+        '''Test que un cambio de estado invalida el fragmento del inmueble.'''
+        self.fragment_cache.fragments(self.properties)
+        sold = Property(id=1, address='Calle "1"', city='Bogotá', state=PropertyState.VENDIDO, price=100, year=2020)
+
+        fragments = self.fragment_cache.fragments([sold, self.properties[1]])
+
+        self.assertEqual(json.loads(fragments[0])['state'], 'vendido')
+        stats = self.fragment_cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['invalidations']), (1, 2, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
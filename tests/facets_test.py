@@ -0,0 +1,91 @@
+'''
+Pruebas unitarias para los conteos por dimensión.
+'''
+
+import unittest
+
+from domain import PropertyFilter, PropertyState
+from infrastructure import CatalogFacets, CatalogSync, FacetCounts
+from tests.fakes import FakeCatalogSource, make_property
+
+
+class TestFacetCounts(unittest.TestCase):
+    '''Pruebas para FacetCounts.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.counts = FacetCounts([
+            make_property(1),
+            make_property(2, city='BOGOTÁ', state=PropertyState.VENDIDO),
+            make_property(3, city='Cali', year=2021),
+            make_property(4, city='Cali', year=None, state=PropertyState.PRE_VENTA),
+        ])
+
+    def test_each_dimension_ignores_its_own_filter(self):
+        '''Test que el conteo de una dimensión aplica los filtros de las demás, no el propio.'''
+        result = self.counts.counts(PropertyFilter(city='bogotá', state=PropertyState.VENTA))
+
+        self.assertEqual(result['total'], 1)
+        self.assertEqual(result['facets']['city'], [{'value': 'Bogotá', 'count': 1}, {'value': 'Cali', 'count': 1}])
+        self.assertEqual(result['facets']['state'], [{'value': 'en_venta', 'count': 1}, {'value': 'vendido', 'count': 1}])
+        self.assertEqual(result['facets']['year'], [{'value': 2020, 'count': 1}])
+
+    def test_year_range_and_multi_value_filters(self):
+        '''Test que los rangos de año y las listas se evalúan sobre las celdas.'''
+        result = self.counts.counts(PropertyFilter(cities=('cali', 'medellín'), min_year=2021))
+
+        self.assertEqual(result['total'], 1)
+        self.assertEqual(result['facets']['year'], [{'value': 2021, 'count': 1}, {'value': None, 'count': 1}])
+
+    def test_apply_moves_property_between_cells(self):
+        '''Test que un cambio resta la celda anterior del inmueble y un retiro la descuenta.'''
+        # Act
+        self.counts.apply([make_property(1, state=PropertyState.VENDIDO)], removed_ids=[3, 99])
+
+        # Assert
+        result = self.counts.counts(PropertyFilter())
+        self.assertEqual(result['total'], 3)
+        self.assertEqual(result['facets']['state'], [{'value': 'vendido', 'count': 2}, {'value': 'pre_venta', 'count': 1}])
+        self.assertEqual(len(self.counts), 3)
+
+
+class TestCatalogFacets(unittest.TestCase):
+    '''Pruebas para CatalogFacets.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.source = FakeCatalogSource([make_property(1), make_property(2)])
+        self.sync = CatalogSync(self.source)
+        self.facets = CatalogFacets(self.sync)
+        self.sync.reload()
+
+    def test_refresh_applies_only_changed_properties(self):
+        '''Test que después de la carga inicial solo se aplican los inmuebles cambiados.'''
+        # Arrange
+        del self.source.properties[2]
+        self.source.properties[3] = make_property(3, city='Cali')
+        self.source.marker = (2, 3, None)
+        self.source.changed = [2, 3]
+
+        # Act
+        self.sync.refresh()
+        result = self.facets.counts(PropertyFilter(city='cali'))
+
+        # Assert
+        self.assertEqual(result['total'], 1)
+        self.assertEqual(self.source.full_loads, 1)
+        self.assertEqual(self.facets.get_stats()['changed_properties'], 2)
+
+    def test_full_reload_replaces_counts(self):
+        '''Test que la recarga completa recoge cambios que no mueven la marca.'''
+        self.source.properties[1] = make_property(1, city='Cali')
+
+        self.sync.reload()
+        result = self.facets.counts(PropertyFilter(city='cali'))
+
+        self.assertEqual(result['total'], 1)
+        self.assertEqual(self.source.full_loads, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+'''
+Dobles de prueba compartidos por las pruebas unitarias.
+'''
+
+from contextlib import contextmanager
+from unittest.mock import Mock
+
+from domain import Property, PropertyState
+
+
+class FakeDatabase:
+    '''Conexión de base de datos falsa que entrega siempre el mismo cursor.'''
+
+    def __init__(self, cursor):
+        self.connection = Mock()
+        self.connection.cursor.return_value = cursor
+
+    @contextmanager
+    def get_connection(self):
+        yield self.connection
+
+
+class FakeClock:
+    '''Reloj controlado por el test.'''
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeCatalogSource:
+    '''Origen del catálogo (MySQLCatalogSource) controlado por el test, que cuenta las cargas completas.'''
+
+    def __init__(self, properties):
+        self.properties = {prop.id: prop for prop in properties}
+        self.marker = (1, 1, None)
+        self.changed = []
+        self.full_loads = 0
+
+    def current_marker(self):
+        return self.marker
+
+    def load_all(self):
+        self.full_loads += 1
+        return list(self.properties.values())
+
+    def changed_ids(self, since, until):
+        return self.changed
+
+    def load(self, ids):
+        return [self.properties[prop_id] for prop_id in ids if prop_id in self.properties]
+
+
+def make_property(prop_id, city='Bogotá', year=2020, state=PropertyState.VENTA, address='Calle', description=None):
+    '''Inmueble de prueba con precio fijo.'''
+    return Property(id=prop_id, address=address, city=city, state=state, price=100, year=year,
+                    description=description)
@@ -0,0 +1,451 @@
+'''
+Pruebas unitarias para la capa de infraestructura.
+'''
+
+import unittest
+import threading
+import time
+from datetime import datetime
+from unittest.mock import Mock
+
+from domain import Property, PropertyFilter, PropertyState
+from infrastructure import (
+    ConnectionPool, PoolExhaustedError, PropertyRepositoryInterface, CoalescingPropertyRepository,
+    MySQLPropertyRepository, LatestStatusProjection, ProjectionPropertyRepository, CatalogSchemaMigration
+)
+from tests.fakes import FakeDatabase
+
+
+class TestConnectionPool(unittest.TestCase):
+    '''Pruebas para ConnectionPool.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.connections = []
+
+        def factory():
+            connection = Mock()
+            connection.is_connected.return_value = True
+            self.connections.append(connection)
+            return connection
+
+        self.factory = factory
+
+    def test_reuses_released_connection(self):
+        '''Test que una conexión devuelta se reutiliza.'''
+        pool = ConnectionPool(self.factory, min_size=0, max_size=2)
+
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.connections), 1)
+        first.rollback.assert_called()
+
+    def test_fill_opens_min_size(self):
+        '''Test que fill abre el mínimo de conexiones.'''
+        pool = ConnectionPool(self.factory, min_size=2, max_size=4)
+
+        pool.fill()
+
+        stats = pool.get_stats()
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['idle'], 2)
+
+    def test_wait_timeout_when_exhausted(self):
+        '''Test que el pool agotado lanza error al vencer la espera.'''
+        pool = ConnectionPool(self.factory, min_size=0, max_size=1, wait_timeout=0.01)
+
+        with pool.connection():
+            with self.assertRaises(PoolExhaustedError):
+                pool.acquire()
+
+        self.assertEqual(pool.get_stats()['timeouts'], 1)
+
+    def test_unhealthy_connection_is_replaced(self):
+        '''Test que una conexión que falla el health check se reemplaza.'''
+        pool = ConnectionPool(self.factory, min_size=0, max_size=1)
+
+        with pool.connection() as first:
+            pass
+        first.is_connected.return_value = False
+
+        with pool.connection() as second:
+            pass
+
+        self.assertIsNot(first, second)
+        first.close.assert_called_once()
+        self.assertEqual(pool.get_stats()['failed_health_checks'], 1)
+
+    def test_expired_connection_is_replaced(self):
+        '''Test que una conexión que supera la vida máxima no se reutiliza.'''
+        pool = ConnectionPool(self.factory, min_size=0, max_size=1, max_lifetime=0.0001)
+
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+        self.assertIsNot(first, second)
+        first.close.assert_called_once()
+        self.assertEqual(pool.get_stats()['created'], 2)
+
+
+class TestCoalescingPropertyRepository(unittest.TestCase):
+    '''Pruebas para CoalescingPropertyRepository.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.release = threading.Event()
+        self.mock_repository = Mock(spec=PropertyRepositoryInterface)
+
+        def slow_query(filters):
+            self.release.wait(5)
+            return ['resultado']
+
+        self.mock_repository.find_available_properties.side_effect = slow_query
+        self.repository = CoalescingPropertyRepository(self.mock_repository)
+
+    def test_concurrent_identical_queries_run_once(self):
+        '''Test que las consultas concurrentes con el mismo filtro comparten una ejecución.'''
+        results = []
+        threads = [
+            threading.Thread(target=lambda city=city: results.append(
+                self.repository.find_available_properties(PropertyFilter(city=city))))
+            for city in ('Bogota', 'bogota', ' BOGOTA ')
+        ]
+        for thread in threads:
+            thread.start()
+
+        deadline = time.monotonic() + 5
+        while self.repository.get_stats()['calls'] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, [['resultado']] * 3)
+        self.mock_repository.find_available_properties.assert_called_once()
+        self.assertEqual(self.repository.get_stats()['coalesced'], 2)
+
+    def test_errors_are_propagated(self):
+        '''Test que el error de la consulta llega al llamador.'''
+        self.mock_repository.find_available_properties.side_effect = RuntimeError('DB Error')
+
+        with self.assertRaises(RuntimeError):
+            self.repository.find_available_properties(PropertyFilter())
+
+        self.assertEqual(self.repository.get_stats()['in_flight'], 0)
+
+
+class TestMySQLPropertyRepositoryQuery(unittest.TestCase):
+    '''Pruebas de construcción de consultas de MySQLPropertyRepository.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.repository = MySQLPropertyRepository(Mock())
+
+    def test_query_without_pagination(self):
+        '''Test que sin paginación la consulta no tiene LIMIT.'''
+        filters = PropertyFilter(city='bogota', state=PropertyState.VENTA)
+
+        query = self.repository._build_query(filters)
+
+        self.assertNotIn('LIMIT', query)
+        self.assertEqual(query.count('%s'), len(self.repository._build_params(filters)))
+
+    def test_keyset_pagination_pushdown(self):
+        '''Test que sin límite el cursor y los filtros de property se aplican dentro de la ventana del último estado.'''
+        filters = PropertyFilter(year=2020, after_id=40)
+
+        query = self.repository._build_query(filters)
+        params = self.repository._build_params(filters)
+
+        self.assertIn('WHERE property_id > %s AND property_id IN (SELECT pf.id FROM property pf WHERE pf.year = %s)', query)
+        self.assertIn('p.id > %s', query)
+        self.assertTrue(query.rstrip().endswith('ORDER BY p.id'))
+        self.assertEqual(params, (40, 2020, 2020, 40))
+
+    def test_limited_page_reads_latest_status_per_candidate(self):
+        '''Test que con límite el último estado se lee por inmueble y el cursor y el límite van en SQL.'''
+        filters = PropertyFilter(year=2020, limit=20, after_id=40)
+
+        query = self.repository._build_query(filters)
+        params = self.repository._build_params(filters)
+
+        self.assertIn('WHERE sh.property_id = p.id', query)
+        self.assertNotIn('ROW_NUMBER', query)
+        self.assertTrue(query.rstrip().endswith('ORDER BY p.id LIMIT %s'))
+        self.assertEqual(params, (2020, 40, 20))
+
+    def test_range_and_multi_value_filters(self):
+        '''Test que rangos y listas se compilan a comparaciones sobre columnas indexables.'''
+        filters = PropertyFilter(cities=('Bogotá ', 'cali'), states=(PropertyState.VENTA, PropertyState.VENDIDO),
+                                 min_price=100, max_year=2020)
+
+        query = self.repository._build_query(filters)
+        params = self.repository._build_params(filters)
+
+        self.assertIn('pf.city_key IN (%s, %s)', query)
+        self.assertIn('p.price >= %s', query)
+        self.assertIn('s.name IN (%s, %s)', query)
+        self.assertNotIn('LOWER(', query)
+        self.assertEqual(params, (2020, 100, 'bogotá', 'cali', 2020, 100, 'bogotá', 'cali', 'en_venta', 'vendido'))
+        self.assertEqual(query.count('%s'), len(params))
+
+    def test_sorted_keyset_pagination(self):
+        '''Test que el orden va sobre columnas indexadas, desempata por id y el último estado se lee por inmueble.'''
+        filters = PropertyFilter(sort='price', descending=True, limit=20, after_id=40, after_value=300)
+
+        query = self.repository._build_query(filters)
+        params = self.repository._build_params(filters)
+
+        self.assertIn('(p.price_key < %s OR (p.price_key = %s AND p.id < %s))', query)
+        self.assertNotIn('COALESCE', query)
+        self.assertNotIn('ROW_NUMBER', query)
+        self.assertIn('JOIN LATERAL', query)
+        self.assertTrue(query.rstrip().endswith('ORDER BY p.price_key DESC, p.id DESC LIMIT %s'))
+        self.assertEqual(params, (300, 300, 40, 20))
+
+    def test_year_cursor_without_value(self):
+        '''Test que un cursor sobre un año NULL continúa con los demás NULL y luego los años.'''
+        filters = PropertyFilter(sort='year', limit=5, after_id=7, after_value=None)
+
+        query = self.repository._build_query(filters)
+
+        self.assertIn('(p.year IS NOT NULL OR p.id > %s)', query)
+        self.assertEqual(self.repository._build_params(filters), (7, 5))
+        self.assertIsNot(query, self.repository._build_query(PropertyFilter(sort='year', limit=5, after_id=7,
+                                                                             after_value=2020)))
+
+    def test_query_shape_is_cached(self):
+        '''Test que filtros con los mismos campos presentes reutilizan el mismo SQL.'''
+        first = self.repository._build_query(PropertyFilter(city='bogota', limit=10))
+        second = self.repository._build_query(PropertyFilter(city='cali', limit=20))
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, self.repository._build_query(PropertyFilter(city='cali')))
+
+    def test_field_projection_pushdown(self):
+        '''Test que las columnas no pedidas en `fields` no se leen y cada proyección tiene su propia forma.'''
+        filters = PropertyFilter(city='bogota', fields=('id', 'city', 'price'))
+
+        query = self.repository._build_query(filters)
+
+        self.assertIn('NULL as address', query)
+        self.assertIn('NULL as description', query)
+        self.assertIn('p.price', query)
+        self.assertIn('p.address', self.repository._build_query(PropertyFilter(city='bogota')))
+        self.assertEqual(self.repository._build_params(filters), ('bogota', 'bogota'))
+    
+    def test_prepared_statement_reused_per_connection(self):
+        '''Test que cada conexión prepara una vez cada forma de consulta.'''
+        # Arrange
+        cursor = Mock()
+        cursor.fetchall.return_value = [(1, 'Calle', 'Bogotá', 100, None, 2020, 'en_venta')]
+        database = FakeDatabase(cursor)
+        repository = MySQLPropertyRepository(database)
+
+        # Act
+        repository.find_available_properties(PropertyFilter(city='bogota'))
+        result = repository.find_available_properties(PropertyFilter(city='cali'))
+
+        # Assert
+        self.assertEqual(result[0].id, 1)
+        database.connection.cursor.assert_called_once_with(prepared=True)
+        self.assertEqual(cursor.execute.call_args.args[1], ('cali', 'cali'))
+        stats = repository.get_statement_stats()
+        self.assertEqual((stats['prepared'], stats['reused'], stats['query_shapes']), (1, 1, 1))
+
+    def test_client_variations_share_query_shape(self):
+        '''Test que estados repetidos y el orden de `fields` no crean formas de consulta nuevas.'''
+        # Arrange
+        cursor = Mock()
+        cursor.fetchall.return_value = []
+        database = FakeDatabase(cursor)
+        repository = MySQLPropertyRepository(database)
+
+        # Act
+        for count in range(1, 6):
+            repository.find_available_properties(PropertyFilter(states=(PropertyState.VENTA,) * count))
+        repository.find_available_properties(PropertyFilter(fields=('id', 'city', 'price')))
+        repository.find_available_properties(PropertyFilter(fields=('price', 'id', 'city')))
+
+        # Assert
+        self.assertEqual(repository.get_statement_stats()['query_shapes'], 2)
+        self.assertEqual(database.connection.cursor.call_count, 2)
+        self.assertIn(('en_venta',), [call.args[1][-1:] for call in cursor.execute.call_args_list])
+
+    def test_least_used_statement_is_closed(self):
+        '''Test que al superar el máximo por conexión se cierra la sentencia menos usada.'''
+        # Arrange
+        cursors = [Mock(), Mock(), Mock()]
+        for cursor in cursors:
+            cursor.fetchall.return_value = []
+        database = FakeDatabase(None)
+        database.connection.cursor.side_effect = cursors
+        repository = MySQLPropertyRepository(database, max_statements=2)
+
+        # Act
+        repository.find_available_properties(PropertyFilter(city='bogota'))
+        repository.find_available_properties(PropertyFilter(year=2020))
+        repository.find_available_properties(PropertyFilter(city='cali'))
+        repository.find_available_properties(PropertyFilter(min_price=100))
+
+        # Assert
+        cursors[0].close.assert_not_called()
+        cursors[1].close.assert_called_once()
+        self.assertEqual(repository.get_statement_stats()['evicted'], 1)
+
+    def test_catalog_version_reads_primary_key_markers(self):
+        '''Test que la versión del catálogo combina los últimos ids de status_history y property y el último updated_at.'''
+        cursor = Mock()
+        cursor.fetchone.return_value = (120, 45, datetime(2024, 1, 2, 3, 4, 5, 6))
+        repository = MySQLPropertyRepository(FakeDatabase(cursor))
+
+        version = repository.get_catalog_version()
+
+        self.assertEqual(version, '120-45-20240102030405000006')
+        self.assertIn('MAX(id), 0) FROM status_history', cursor.execute.call_args.args[0])
+
+    def test_batch_shares_latest_status_scan(self):
+        '''Test que un lote se resuelve en una consulta con un solo cálculo del último estado.'''
+        # Arrange
+        cursor = Mock()
+        cursor.fetchall.return_value = [(0, 4, 'Calle 4', 'Bogotá', 100, None, 2020, 'en_venta'),
+                                        (2, 9, 'Calle 9', 'Cali', 300, None, 2021, 'vendido')]
+        repository = MySQLPropertyRepository(FakeDatabase(cursor))
+        filters_list = [PropertyFilter(city='bogota', limit=5), PropertyFilter(year=1990), PropertyFilter(city='cali')]
+
+        # Act
+        results = repository.find_available_properties_batch(filters_list)
+
+        # Assert
+        query, params = cursor.execute.call_args.args
+        self.assertEqual(query.count('ROW_NUMBER()'), 1)
+        self.assertEqual(query.count('UNION ALL'), 2)
+        self.assertEqual(params, ('bogota', 5, 1990, 'cali'))
+        self.assertEqual([[prop.id for prop in props] for props in results], [[4], [], [9]])
+
+    def test_bulk_row_mapping(self):
+        '''Test que las filas posicionales se mapean en lote y un estado inválido se reporta.'''
+        rows = [(1, None, 'Bogotá', 100, None, 2020, 'en_venta'), (2, 'Calle 2', 'Cali', None, 'Casa', None, 'vendido')]
+
+        properties = self.repository._map_rows(rows)
+
+        self.assertEqual(properties[0], Property(id=1, address='', city='Bogotá', state=PropertyState.VENTA,
+                                                 price=100, year=2020))
+        self.assertEqual((properties[1].price, properties[1].state), (0, PropertyState.VENDIDO))
+        with self.assertRaises(ValueError):
+            self.repository._map_rows(rows + [(3, 'Calle 3', 'Cali', 1, None, None, 'comprado')])
+
+
+
+class TestCatalogSchemaMigration(unittest.TestCase):
+    '''Pruebas para la verificación del esquema al iniciar.'''
+
+    def test_verify_reports_missing_columns(self):
+        '''Test que sin las columnas generadas el inicio falla indicando el paso de migración.'''
+        # Arrange - city_key existe, updated_at y price_key no; los índices existen
+        cursor = Mock()
+        cursor.fetchone.side_effect = [(1,), (0,), (0,)] + [(1,)] * len(CatalogSchemaMigration.INDEXES)
+
+        # Act
+        with self.assertRaises(RuntimeError) as context:
+            CatalogSchemaMigration(FakeDatabase(cursor)).verify()
+
+        # Assert
+        self.assertIn('property.updated_at, property.price_key', str(context.exception))
+        self.assertIn('python main.py migrate', str(context.exception))
+        self.assertFalse(any('ALTER' in call.args[0] for call in cursor.execute.call_args_list))
+
+    def test_verify_only_warns_missing_indexes(self):
+        '''Test que los índices faltantes no impiden iniciar.'''
+        cursor = Mock()
+        cursor.fetchone.side_effect = [(1,)] * 3 + [(0,)] * len(CatalogSchemaMigration.INDEXES)
+
+        with self.assertLogs(level='WARNING'):
+            CatalogSchemaMigration(FakeDatabase(cursor)).verify()
+
+
+class TestLatestStatusProjection(unittest.TestCase):
+    '''Pruebas para LatestStatusProjection y ProjectionPropertyRepository.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.cursor = Mock()
+        self.database = FakeDatabase(self.cursor)
+        self.now = 0.0
+        self.projection = LatestStatusProjection(self.database, refresh_interval=5, clock=lambda: self.now)
+
+    def test_refresh_only_recomputes_new_history(self):
+        '''Test que la actualización incremental parte de la marca de agua.'''
+        # Arrange - marca de agua 10, último id de status_history 15, 3 inmuebles afectados
+        self.cursor.fetchone.side_effect = [(10,), (15,), (3,)]
+
+        # Act
+        refreshed = self.projection.refresh()
+
+        # Assert
+        self.assertEqual(refreshed, 3)
+        upsert, params = self.cursor.execute.call_args_list[3].args
+        self.assertIn('ON DUPLICATE KEY UPDATE', upsert)
+        self.assertEqual(params, (10, 15))
+        self.assertEqual(self.cursor.execute.call_args_list[4].args[1], ('property_latest_status', 15))
+        self.database.connection.commit.assert_called_once()
+
+    def test_refresh_without_new_history_is_noop(self):
+        '''Test que sin filas nuevas no se escribe nada.'''
+        self.cursor.fetchone.side_effect = [(15,), (15,)]
+
+        self.assertEqual(self.projection.refresh(), 0)
+        self.assertEqual(self.cursor.execute.call_count, 2)
+        self.database.connection.commit.assert_not_called()
+
+    def test_refresh_rescans_window_below_mark(self):
+        '''Test que se vuelven a revisar las filas posteriores a la marca vigente hace `rescan_window` segundos.'''
+        # Arrange - marca 10 -> 15; luego sin filas nuevas por encima de 15
+        self.cursor.fetchone.side_effect = [(10,), (15,), (3,), (15,), (15,), (1,), (15,), (15,)]
+        self.projection.refresh()
+
+        # Act - dentro de la ventana se revisa desde 10 (una fila con id 12 confirmada tarde)
+        self.now = 5
+        rescanned = self.projection.refresh()
+        rescan_params = self.cursor.execute.call_args_list[-2].args[1]
+        self.cursor.execute.reset_mock()
+        self.now = 40
+        after_window = self.projection.refresh()
+
+        # Assert
+        self.assertEqual((rescanned, rescan_params), (1, (10, 15)))
+        self.assertEqual(after_window, 0)
+        self.assertEqual(self.cursor.execute.call_count, 2)
+
+    def test_refresh_if_due_respects_interval(self):
+        '''Test que la proyección se actualiza como máximo una vez por intervalo.'''
+        self.cursor.fetchone.side_effect = [(15,), (15,), (15,), (15,)]
+
+        self.projection.refresh_if_due()
+        self.now = 4
+        self.projection.refresh_if_due()
+        self.now = 5
+        self.projection.refresh_if_due()
+
+        self.assertEqual(self.projection.get_stats()['refreshes'], 2)
+
+    def test_repository_reads_projection(self):
+        '''Test que el repositorio consulta la proyección en lugar de la ventana sobre status_history.'''
+        repository = ProjectionPropertyRepository(self.database, self.projection)
+        filters = PropertyFilter(year=2020, limit=20, after_id=40)
+
+        query = repository._build_query(filters)
+
+        self.assertNotIn('ROW_NUMBER', query)
+        self.assertIn('property_latest_status latest_status', query)
+        self.assertEqual(repository._build_params(filters), (2020, 40, 20))
+
+
+if __name__ == '__main__':
+    unittest.main()
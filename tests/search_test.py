@@ -0,0 +1,109 @@
+'''
+Pruebas unitarias para la búsqueda por palabras.
+'''
+
+import unittest
+from unittest.mock import Mock
+
+from domain import PropertyFilter
+from application import PropertyService
+from infrastructure import CatalogSearch, CatalogSync, PropertyRepositoryInterface, SearchIndex, tokenize
+from tests.fakes import FakeCatalogSource, make_property
+
+
+class TestTokenize(unittest.TestCase):
+    '''Pruebas para la normalización del texto.'''
+
+    def test_folds_accents_case_and_stopwords(self):
+        '''Test que se ignoran tildes, mayúsculas, puntuación y palabras vacías.'''
+        self.assertEqual(tokenize('Apartamento en CHAPINERO, con balcón y año 2020'),
+                         ['apartamento', 'chapinero', 'balcon', 'ano', '2020'])
+
+
+class TestSearchIndex(unittest.TestCase):
+    '''Pruebas para SearchIndex.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.index = SearchIndex([
+            make_property(1, address='Cra 7 # 60-10 Chapinero', description='Apartamento con balcón y vista'),
+            make_property(2, address='Calle 100', description='Apartamento amplio, cerca a Chapinero'),
+            make_property(3, address='Calle 80', description='Casa con jardín'),
+            make_property(4, address='Cra 13 Chapinero', description='Apartamento con BALCON', city='Cali'),
+        ])
+
+    def _ids(self, query, filters=None, limit=10):
+        return [prop.id for prop, _ in self.index.search(tokenize(query), filters or PropertyFilter(), limit)]
+
+    def test_ranks_by_matched_terms(self):
+        '''Test que los inmuebles con más términos de la búsqueda van primero y los demás no aparecen.'''
+        self.assertEqual(self._ids('apartamento chapinero balcón'), [4, 1, 2])
+        self.assertEqual(self._ids('JARDIN'), [3])
+        self.assertEqual(self._ids('piscina'), [])
+
+    def test_combines_filters_and_limit(self):
+        '''Test que se aplican los filtros de PropertyFilter antes de seleccionar los mejores.'''
+        self.assertEqual(self._ids('apartamento chapinero balcón', PropertyFilter(city='bogotá')), [1, 2])
+        self.assertEqual(self._ids('apartamento chapinero balcón', limit=1), [4])
+
+    def test_apply_reindexes_changed_properties(self):
+        '''Test que un cambio retira los términos anteriores del inmueble y un retiro lo saca del índice.'''
+        # Act
+        self.index.apply([make_property(3, address='Calle 80', description='Casa con piscina')], removed_ids=[4, 99])
+
+        # Assert
+        self.assertEqual(self._ids('jardín'), [])
+        self.assertEqual(self._ids('piscina'), [3])
+        self.assertEqual(self._ids('balcón'), [1])
+        self.assertEqual(len(self.index), 3)
+
+
+class TestCatalogSearch(unittest.TestCase):
+    '''Pruebas para CatalogSearch.'''
+
+    def test_refresh_applies_only_changed_properties(self):
+        '''Test que después de la carga inicial solo se reindexan los inmuebles cambiados.'''
+        # Arrange
+        source = FakeCatalogSource([make_property(1, description='Casa'), make_property(2, description='Casa')])
+        sync = CatalogSync(source)
+        search = CatalogSearch(sync)
+        sync.reload()
+        self.assertEqual(len(search.search(['casa'], PropertyFilter(), 10)), 2)
+        source.properties[2] = make_property(2, description='Apartamento')
+        source.marker = (2, 2, None)
+        source.changed = [2]
+
+        # Act
+        sync.refresh()
+        result = search.search(['casa'], PropertyFilter(), 10)
+
+        # Assert
+        self.assertEqual([prop.id for prop, _ in result], [1])
+        self.assertEqual(source.full_loads, 1)
+        self.assertEqual(search.get_stats()['changed_properties'], 1)
+
+
+class TestPropertyServiceSearch(unittest.TestCase):
+    '''Pruebas de la búsqueda por palabras en PropertyService.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        index = SearchIndex([make_property(prop_id, description='Casa') for prop_id in range(1, 31)])
+        self.service = PropertyService(Mock(spec=PropertyRepositoryInterface), search=index)
+
+    def test_default_limit(self):
+        '''Test que sin limit se retornan los primeros DEFAULT_SEARCH_LIMIT resultados.'''
+        result = self.service.search_properties('casas o casa', PropertyFilter())
+
+        self.assertEqual(len(result), PropertyService.DEFAULT_SEARCH_LIMIT)
+
+    def test_rejects_invalid_searches(self):
+        '''Test que se rechaza una búsqueda sin palabras, demasiado larga o con cursor u orden.'''
+        for query, filters in (('de la', PropertyFilter()), ('casa ' * 50, PropertyFilter()),
+                               ('casa', PropertyFilter(after_id=3)), ('casa', PropertyFilter(sort='price'))):
+            with self.assertRaises(ValueError):
+                self.service.search_properties(query, filters)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,220 @@
+'''
+Pruebas unitarias para los servidores HTTP concurrentes.
+'''
+
+import unittest
+import gzip
+import http.client
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from unittest.mock import Mock
+
+from config import ServerConfig
+from presentation import BoundedThreadPoolHTTPServer, PropertyHTTPHandler
+from presentation.compression import ResponseCompressor
+
+
+class _BlockingHandler(BaseHTTPRequestHandler):
+    '''Handler que espera hasta que el test lo libere.'''
+
+    def do_GET(self):
+        self.server.release.wait(5)
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestBoundedThreadPoolHTTPServer(unittest.TestCase):
+    '''Pruebas para BoundedThreadPoolHTTPServer.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.server = BoundedThreadPoolHTTPServer(('127.0.0.1', 0), _BlockingHandler, workers=1, queue_size=1)
+        self.server.release = threading.Event()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        '''Libera los workers y cierra el servidor.'''
+        self.server.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _open(self):
+        client = socket.create_connection(self.server.server_address, timeout=5)
+        client.sendall(b'GET / HTTP/1.0\r\n\r\n')
+        return client
+
+    def _wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_rejects_with_503_when_queue_is_full(self):
+        '''Test que la conexión excedente recibe 503 de inmediato.'''
+        # Arrange - un request ocupa el worker y otro la cola
+        busy = self._open()
+        self._wait_for(lambda: self.server.get_stats()['active'] == 1)
+        queued = self._open()
+        self._wait_for(lambda: self.server.get_stats()['queued'] == 1)
+
+        # Act
+        rejected = self._open()
+        response = rejected.recv(1024)
+
+        # Assert
+        self.assertTrue(response.startswith(b'HTTP/1.1 503'))
+        self.assertEqual(self.server.get_stats()['rejected'], 1)
+
+        self.server.release.set()
+        self.assertTrue(busy.recv(1024).startswith(b'HTTP/1.0 200'))
+        self.assertTrue(queued.recv(1024).startswith(b'HTTP/1.0 200'))
+        for client in (busy, queued, rejected):
+            client.close()
+
+    def test_close_waits_graceful_timeout(self):
+        '''Test que al cerrar se espera a los requests en curso hasta el tiempo configurado.'''
+        server = BoundedThreadPoolHTTPServer(('127.0.0.1', 0), _BlockingHandler, workers=1, graceful_timeout=12)
+        server.drain = Mock()
+
+        server.server_close()
+
+        server.drain.assert_called_once_with(timeout=12)
+        BoundedThreadPoolHTTPServer.drain(server, timeout=1)
+
+
+class TestPropertyHTTPHandlerKeepAlive(unittest.TestCase):
+    '''Pruebas de conexiones persistentes en PropertyHTTPHandler.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.server = BoundedThreadPoolHTTPServer(('127.0.0.1', 0), PropertyHTTPHandler, workers=2)
+        self.server.property_controller = Mock()
+        self.server.property_controller.get_properties_conditional.return_value = (
+            None, b'{"success": true, "data": [], "count": 0}'
+        )
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.connection = http.client.HTTPConnection(*self.server.server_address, timeout=5)
+
+    def tearDown(self):
+        '''Cierra la conexión y el servidor.'''
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _get(self, path):
+        self.connection.request('GET', path)
+        response = self.connection.getresponse()
+        return response, response.read()
+
+    def test_reuses_connection_with_content_length(self):
+        '''Test que dos requests comparten el mismo socket.'''
+        response, body = self._get('/properties')
+        first_socket = self.connection.sock
+
+        self.assertEqual(int(response.getheader('Content-Length')), len(body))
+        self.assertEqual(json.loads(body)['count'], 0)
+
+        response, _ = self._get('/health')
+
+        self.assertEqual(response.status, 200)
+        self.assertIs(self.connection.sock, first_socket)
+
+    def test_negotiates_gzip(self):
+        '''Test que /properties se comprime cuando el cliente acepta gzip.'''
+        self.server.response_compressor = ResponseCompressor(min_size=10)
+
+        self.connection.request('GET', '/properties', headers={'Accept-Encoding': 'gzip'})
+        response = self.connection.getresponse()
+        body = response.read()
+
+        self.assertEqual(response.getheader('Content-Encoding'), 'gzip')
+        self.assertEqual(response.getheader('Vary'), 'Accept-Encoding')
+        self.assertEqual(json.loads(gzip.decompress(body))['count'], 0)
+        self.assertIsNone(self._get('/properties')[0].getheader('Content-Encoding'))
+
+    def test_not_modified_keeps_connection(self):
+        '''Test que un ETag vigente recibe 304 sin cuerpo y la conexión se reutiliza.'''
+        self.server.property_controller.get_properties_conditional.return_value = ('"abc"', None)
+
+        self.connection.request('GET', '/properties', headers={'If-None-Match': '"abc"'})
+        response = self.connection.getresponse()
+        body = response.read()
+
+        self.assertEqual((response.status, body), (304, b''))
+        self.assertEqual(response.getheader('ETag'), '"abc"')
+        self.assertIn('max-age=', response.getheader('Cache-Control'))
+        self.server.property_controller.get_properties_conditional.assert_called_with({}, '"abc"')
+        self.assertEqual(self._get('/health')[0].status, 200)
+
+    def test_streams_chunked_ndjson(self):
+        '''Test que con Accept: application/x-ndjson la respuesta va en chunks y la conexión se reutiliza.'''
+        chunks = (chunk for chunk in [b'{"id": 1}\n', b'{"id": 2}\n'])
+        self.server.property_controller.stream_properties.return_value = (None, chunks)
+
+        self.connection.request('GET', '/properties', headers={'Accept': 'application/x-ndjson'})
+        response = self.connection.getresponse()
+        body = response.read()
+
+        self.assertEqual(response.getheader('Transfer-Encoding'), 'chunked')
+        self.assertEqual(response.getheader('Content-Type'), 'application/x-ndjson')
+        self.assertEqual(body, b'{"id": 1}\n{"id": 2}\n')
+        self.assertEqual(self._get('/health')[0].status, 200)
+
+    def test_closes_after_max_requests(self):
+        '''Test que la conexión se cierra al alcanzar el máximo de requests.'''
+        for _ in range(ServerConfig.KEEP_ALIVE_MAX_REQUESTS - 1):
+            response, _ = self._get('/health')
+            self.assertIsNone(response.getheader('Connection'))
+
+        response, _ = self._get('/health')
+
+        self.assertEqual(response.getheader('Connection'), 'close')
+
+    def test_idle_connections_leave_a_free_worker(self):
+        '''Test que con dos workers solo una conexión queda abierta y /health no espera a las inactivas.'''
+        # Arrange - la primera conexión ocupa el único lugar persistente
+        self.assertIsNone(self._get('/health')[0].getheader('Connection'))
+        other = http.client.HTTPConnection(*self.server.server_address, timeout=5)
+        other.request('GET', '/health')
+        response = other.getresponse()
+        response.read()
+
+        # Act - con ambas conexiones inactivas, un cliente nuevo se atiende de inmediato
+        started = time.monotonic()
+        fresh = http.client.HTTPConnection(*self.server.server_address, timeout=5)
+        fresh.request('GET', '/health')
+        status = fresh.getresponse().status
+        elapsed = time.monotonic() - started
+
+        # Assert
+        self.assertEqual(response.getheader('Connection'), 'close')
+        self.assertEqual(status, 200)
+        self.assertLess(elapsed, 1)
+        self.assertEqual(self.server.get_stats()['keep_alive'], 1)
+        for connection in (other, fresh):
+            connection.close()
+
+    def test_closed_connection_releases_keep_alive(self):
+        '''Test que al cerrarse una conexión persistente otra puede ocupar su lugar.'''
+        self._get('/health')
+        self.connection.close()
+        self.connection = http.client.HTTPConnection(*self.server.server_address, timeout=5)
+        deadline = time.monotonic() + 5
+        while self.server.get_stats()['keep_alive'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        response, _ = self._get('/health')
+
+        self.assertIsNone(response.getheader('Connection'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+'''
+Pruebas unitarias para el catálogo en memoria.
+'''
+
+import time
+import unittest
+from unittest.mock import Mock
+
+from domain import PropertyFilter, PropertyState
+from infrastructure import (
+    CatalogFacets, CatalogSearch, CatalogSnapshot, CatalogSync, CatalogNotLoadedError, SnapshotPropertyRepository
+)
+from tests.fakes import FakeCatalogSource, make_property
+
+
+class TestCatalogSnapshot(unittest.TestCase):
+    '''Pruebas para CatalogSnapshot.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.snapshot = CatalogSnapshot.build([
+            make_property(5, city='Medellín'),
+            make_property(1),
+            make_property(3, year=2021),
+            make_property(4, state=PropertyState.VENDIDO),
+        ])
+
+    def _ids(self, snapshot, **filters):
+        return [prop.id for prop in snapshot.query(PropertyFilter(**filters))]
+
+    def test_query_intersects_indexes(self):
+        '''Test que los filtros se resuelven intersectando los índices.'''
+        self.assertEqual(self._ids(self.snapshot, city='  BOGOTÁ '), [1, 3, 4])
+        self.assertEqual(self._ids(self.snapshot, city='bogotá', year=2020, state=PropertyState.VENTA), [1])
+        self.assertEqual(self._ids(self.snapshot, city='Cali'), [])
+
+    def test_city_key_ignores_surrounding_spaces(self):
+        '''Test que una ciudad guardada con espacios se indexa como la columna city_key de MySQL.'''
+        snapshot = CatalogSnapshot.build([make_property(1, city=' Cali '), make_property(2, city='CALI')])
+
+        self.assertEqual(self._ids(snapshot, city='cali'), [1, 2])
+        self.assertEqual(self._ids(snapshot, cities=('cali', 'bogotá')), [1, 2])
+
+    def test_multi_value_and_range_filters(self):
+        '''Test que las listas unen los índices y los rangos se evalúan antes de paginar.'''
+        self.assertEqual(self._ids(self.snapshot, cities=('medellín', 'CALI')), [5])
+        self.assertEqual(self._ids(self.snapshot, states=(PropertyState.VENTA, PropertyState.VENDIDO), min_year=2021), [3])
+        self.assertEqual(self._ids(self.snapshot, max_year=2020, limit=2, after_id=1), [4, 5])
+        self.assertEqual(self._ids(self.snapshot, city='bogotá', cities=('cali',)), [])
+
+    def test_sorted_top_n_with_keyset_cursor(self):
+        '''Test que el orden por año desempata por id y el cursor retoma por (valor, id), con NULL primero.'''
+        snapshot = CatalogSnapshot.build([make_property(1, year=2021), make_property(2, year=None), make_property(3, year=2019),
+                                          make_property(4, year=2021), make_property(5, year=None)])
+
+        self.assertEqual(self._ids(snapshot, sort='year'), [2, 5, 3, 1, 4])
+        self.assertEqual(self._ids(snapshot, sort='year', descending=True, limit=3), [4, 1, 3])
+        self.assertEqual(self._ids(snapshot, sort='year', limit=2, after_id=5, after_value=None), [3, 1])
+        self.assertEqual(self._ids(snapshot, sort='year', descending=True, after_id=3, after_value=2019), [5, 2])
+        self.assertEqual(self._ids(snapshot, sort='year', limit=2, after_id=1, after_value=2021), [4])
+
+    def test_pagination_matches_sql_order(self):
+        '''Test que el cursor y el límite siguen el orden por id.'''
+        self.assertEqual(self._ids(self.snapshot, limit=2), [1, 3])
+        self.assertEqual(self._ids(self.snapshot, limit=2, after_id=3), [4, 5])
+        self.assertEqual(self._ids(self.snapshot, year=2020, limit=1, after_id=1), [4])
+
+    def test_apply_updates_indexes_without_touching_previous_snapshot(self):
+        '''Test que una actualización crea una nueva foto y mueve el inmueble de índice.'''
+        updated = self.snapshot.apply([make_property(1, city='Cali'), make_property(9)], removed_ids=[4])
+
+        self.assertEqual(updated.generation, self.snapshot.generation + 1)
+        self.assertEqual(self._ids(updated, city='cali'), [1])
+        self.assertEqual(self._ids(updated, city='bogotá'), [3, 9])
+        self.assertNotIn(PropertyState.VENDIDO, updated.by_state)
+        self.assertEqual(self._ids(self.snapshot, city='bogotá'), [1, 3, 4])
+
+    def test_apply_without_effective_changes_keeps_snapshot(self):
+        '''Test que un lote sin cambios reales (baja de un inmueble ausente, inmueble igual) no copia la foto.'''
+        unchanged = self.snapshot.apply([self.snapshot.properties[1]], removed_ids=[99])
+
+        self.assertIs(unchanged, self.snapshot)
+
+
+class TestSnapshotPropertyRepository(unittest.TestCase):
+    '''Pruebas para SnapshotPropertyRepository.'''
+
+    def setUp(self):
+        '''Configuración previa a cada test.'''
+        self.source = FakeCatalogSource([make_property(1), make_property(2)])
+        self.sync = CatalogSync(self.source)
+        self.repository = SnapshotPropertyRepository(self.sync)
+        self.sync.reload()
+
+    def test_refresh_applies_only_changed_properties(self):
+        '''Test que la actualización trae los inmuebles cambiados y retira los no disponibles.'''
+        # Arrange - el inmueble 2 dejó de estar disponible y se creó el 3
+        del self.source.properties[2]
+        self.source.properties[3] = make_property(3)
+        self.source.marker = (2, 3, None)
+        self.source.changed = [2, 3]
+
+        # Act
+        changed = self.sync.refresh()
+
+        # Assert
+        self.assertEqual(changed, 2)
+        result = self.repository.find_available_properties(PropertyFilter())
+        self.assertEqual([prop.id for prop in result], [1, 3])
+        self.assertEqual(self.repository.get_stats()['generation'], 2)
+
+    def test_refresh_without_changes_keeps_snapshot(self):
+        '''Test que sin cambios en la marca no se publica una nueva foto.'''
+        self.assertEqual(self.sync.refresh(), 0)
+        self.assertEqual(self.repository.get_stats()['generation'], 1)
+
+    def test_full_reload_changes_version(self):
+        '''Test que una recarga completa cambia la versión aunque la marca no se mueva.'''
+        version = self.repository.get_catalog_version()
+
+        self.sync.reload()
+
+        self.assertNotEqual(self.repository.get_catalog_version(), version)
+
+
+class TestCatalogSync(unittest.TestCase):
+    '''Pruebas para CatalogSync.'''
+
+    def test_views_share_loads_and_changes(self):
+        '''Test que la foto, los conteos y la búsqueda se cargan con una sola lectura del catálogo y reciben los mismos cambios.'''
+        # Arrange
+        source = FakeCatalogSource([make_property(1, description='Casa'), make_property(2, description='Casa')])
+        sync = CatalogSync(source)
+        repository = SnapshotPropertyRepository(sync)
+        facets = CatalogFacets(sync)
+        search = CatalogSearch(sync)
+        sync.reload()
+        del source.properties[2]
+        source.marker = (2, 2, None)
+        source.changed = [2]
+
+        # Act
+        sync.refresh()
+
+        # Assert
+        self.assertEqual(source.full_loads, 1)
+        self.assertEqual([prop.id for prop in repository.find_available_properties(PropertyFilter())], [1])
+        self.assertEqual(facets.counts(PropertyFilter())['total'], 1)
+        self.assertEqual([prop.id for prop, _ in search.search(['casa'], PropertyFilter(), 10)], [1])
+
+    def test_view_not_loaded(self):
+        '''Test que una vista sin la carga inicial responde con un error en lugar de consultar MySQL.'''
+        source = FakeCatalogSource([make_property(1)])
+        facets = CatalogFacets(CatalogSync(source))
+
+        with self.assertRaises(CatalogNotLoadedError):
+            facets.counts(PropertyFilter())
+        self.assertEqual(source.full_loads, 0)
+
+    def test_initial_load_retries_in_background(self):
+        '''Test que `start` no espera la carga inicial y la reintenta si MySQL no responde.'''
+        # Arrange
+        source = FakeCatalogSource([make_property(1)])
+        source.load_all = Mock(side_effect=[RuntimeError('Error al cargar el catálogo'), [make_property(1)]])
+        sync = CatalogSync(source, refresh_interval=0.01)
+        facets = CatalogFacets(sync)
+
+        # Act
+        sync.start()
+        deadline = time.monotonic() + 5
+        while sync.marker is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        sync.stop()
+
+        # Assert
+        self.assertEqual(facets.counts(PropertyFilter())['total'], 1)
+        self.assertEqual(sync.get_stats()['errors'], 1)
+        self.assertEqual(source.load_all.call_count, 2)
+
+    def test_unexpected_error_keeps_polling(self):
+        '''Test que un error inesperado al mapear un lote se registra y la actualización sigue.'''
+        # Arrange
+        source = FakeCatalogSource([make_property(1)])
+        sync = CatalogSync(source, refresh_interval=0.01)
+        facets = CatalogFacets(sync)
+        sync.reload()
+        source.marker = (2, 2, None)
+        source.changed = [2]
+        source.load = Mock(side_effect=[ValueError('Estado inválido'), [make_property(2)]])
+
+        # Act
+        with self.assertLogs(level='ERROR'):
+            sync.start()
+            deadline = time.monotonic() + 5
+            while sync.marker != source.marker and time.monotonic() < deadline:
+                time.sleep(0.01)
+            sync.stop()
+
+        # Assert
+        self.assertEqual(facets.counts(PropertyFilter())['total'], 2)
+        self.assertEqual(sync.get_stats()['errors'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()